@@ -13,6 +13,27 @@ from sklearn.preprocessing import LabelEncoder
 import warnings
 import random
 from branca.element import Element
+from src.geometry import DEFAULT_BOUNDARY_PATH, load_geometry_metadata, normalize_bairro_name
+from src.spatial_smoothing import empirical_bayes_rates
+from src.scan_statistic import build_case_cube, detect_space_time_clusters
+from src.near_repeat import near_repeat_from_dataframe
+from src.risk_grid import build_risk_grid, load_risk_grid, score_route
+from src.safer_neighborhoods import NearestNeighborhoodIndex, build_hourly_rate_table
+from src.count_tensor import build_count_tensor, load_count_tensor
+from src.rollups import (GRANULARITIES, appended_days, build_rollups, load_rollups, update_rollups,
+                         year_over_year_table)
+from src.crime_store import PERIOD_EXPRESSIONS, open_crime_store
+from src.distribution_uncertainty import load_distribution_intervals
+from src.streaming import FeedWorker
+from src.anomaly_detection import anomalies_from_dataframe
+from src.heavy_hitters import top_k
+from src.watchlist import Outbox, WatchlistEngine, load_subscriptions
+from src.geofences import GeofenceIndex, load_geofences
+from src.refresher import (BackgroundRefresher, current_version_directory, new_version_directory,
+                           prune_version_directories, publish_version_directory, source_fingerprint)
+import os
+import shutil
+import threading
 warnings.filterwarnings('ignore')
 
 # Configuração da página
@@ -53,13 +74,15 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+CRIME_DATA_PATH = 'c:/Users/haneg/TESTE/ALERTA-POA-/data/crime_data.csv'
+# Intervalo (s) entre verificações de nova versão dos dados pelo atualizador em segundo plano
+DATA_REFRESH_SECONDS = 30
+
 # Função para carregar dados
-@st.cache_data
-def load_data():
-    """Carrega os dados de criminalidade"""
+def load_data(path=CRIME_DATA_PATH):
+    """Carrega os dados de criminalidade (sem chamadas st.*: roda na thread do atualizador)"""
     try:
-        df = pd.read_csv('c:/Users/haneg/TESTE/ALERTA-POA-/data/crime_data.csv')
-        st.sidebar.success("✅ Dados carregados com sucesso")
+        df = pd.read_csv(path)
         
         # Renomear colunas para compatibilidade com o código existente se necessário
         if 'data' in df.columns:
@@ -94,9 +117,17 @@ def load_data():
         
         return df
     except FileNotFoundError:
-        st.error("Arquivo de dados não encontrado.")
         return pd.DataFrame()
 
+@st.cache_resource
+def load_geometry():
+    """Carrega metadados geométricos pré-computados dos bairros (centróides, bboxes, adjacência)"""
+    try:
+        return load_geometry_metadata()
+    except FileNotFoundError:
+        st.sidebar.warning("⚠️ Metadados geométricos não encontrados. Execute: python -m src.geometry")
+        return None
+
 # Thresholds de segurança baseados em padrões internacionais
 # Baseado em dados da ONU, NeighborhoodScout e padrões internacionais de criminalidade
 SAFETY_THRESHOLDS = {
@@ -115,12 +146,45 @@ POPULACAO_BAIRROS = {
     "Centro": 40000, "Azenha": 15000, "Auxiliadora": 25000, "Independência": 30000
 }
 
+def get_risk_grid(df, _geometry, directory):
+    """Gera e abre a grade de risco (célula x hora) no diretório da versão dos dados"""
+    if df.empty:
+        return None
+    path = os.path.join(directory, 'risk_grid.npy')
+    build_risk_grid(df, _geometry, output_path=path)
+    return load_risk_grid(path)
+
+def get_neighborhood_index(df, _geometry):
+    """Índice de bairros próximos com níveis de segurança por hora pré-computados"""
+    if df.empty or _geometry is None:
+        return None
+    population_by_key = {normalize_bairro_name(b): p for b, p in POPULACAO_BAIRROS.items()}
+    population = np.array([population_by_key.get(key, 30000) for key in _geometry.keys])
+    return NearestNeighborhoodIndex(_geometry, build_hourly_rate_table(df, _geometry, population),
+                                    thresholds=[SAFETY_THRESHOLDS[k] for k in ('muito_seguro', 'seguro', 'perigoso')])
+
 def calculate_crime_rate_per_100k(crimes_count, population):
     """Calcula taxa de criminalidade por 100.000 habitantes"""
     if population == 0:
         return 0
     return (crimes_count / population) * 100000
 
+@st.cache_data
+def compute_smoothed_rates(bairros_stats, _geometry):
+    """Calcula taxas por 100k suavizadas (Bayes empírico espacial), cacheadas por dados e filtros"""
+    counts = np.zeros(len(_geometry))
+    for bairro, count in bairros_stats.items():
+        index = _geometry.index_of(bairro)
+        if index >= 0:
+            counts[index] += count
+    
+    # Bairros sem estimativa usam a população padrão, como no mapa
+    population_by_key = {normalize_bairro_name(b): p for b, p in POPULACAO_BAIRROS.items()}
+    population = np.array([population_by_key.get(key, 30000) for key in _geometry.keys])
+    
+    rates = empirical_bayes_rates(counts, population, _geometry.adjacency_matrix())
+    return dict(zip(_geometry.keys.tolist(), rates.tolist()))
+
 def classify_safety_level(crime_rate):
     """Classifica nível de segurança baseado na taxa de criminalidade"""
     if crime_rate < SAFETY_THRESHOLDS['muito_seguro']:
@@ -152,9 +216,97 @@ def get_safety_label(safety_level):
     }
     return labels.get(safety_level, 'Indefinido')
 
+def get_count_tensor(df, directory):
+    """Tensor (data x bairro x tipo) memory-mapped no diretório da versão dos dados"""
+    path = os.path.join(directory, 'count_tensor')
+    build_count_tensor(df, path)
+    return load_count_tensor(path)
+
+def get_rollups(tensor, directory):
+    """Agregações dia/semana/mês/trimestre/ano pré-computadas a partir do tensor
+
+    Se o CSV só ganhou dias novos desde a versão publicada, parte das agregações dela
+    e soma apenas esses dias; caso contrário reconstrói todos os níveis.
+    """
+    path = os.path.join(directory, 'rollups')
+    previous = current_version_directory()
+    new_days = appended_days(tensor, os.path.join(previous, 'rollups')) if previous else None
+    if new_days is None:
+        build_rollups(tensor, path)
+    elif len(new_days.dates) == 0:
+        shutil.copytree(os.path.join(previous, 'rollups'), path)
+    else:
+        update_rollups(new_days, os.path.join(previous, 'rollups'), output_dir=path)
+    return load_rollups(path)
+
+@st.cache_resource
+def get_crime_store():
+    """Banco SQLite opcional (python -m src.crime_store); None se não foi gerado"""
+    try:
+        return open_crime_store()
+    except FileNotFoundError:
+        return None
+
+def get_distribution_intervals(df):
+    """Intervalos de credibilidade das contagens distribuídas (python -m src.distribution_uncertainty)
+
+    Apenas lê a tabela pré-computada; None se não existir ou estiver desatualizada.
+    """
+    table = load_distribution_intervals(df=df)
+    if table is None or table.empty:
+        return None
+    return {normalize_bairro_name(row['bairro']): row for row in table.to_dict(orient='records')}
+
+@st.cache_resource
+def get_feed_worker():
+    """Feed de ocorrências (data/incident_feed.csv) acompanhado em segundo plano, um por processo
+
+    Ocorrências novas com coordenadas são cruzadas com as cercas de data/geofences.json e
+    publicadas na caixa de saída, esteja ou não alguma sessão exibindo o feed ao vivo.
+    """
+    fences = load_geofences()
+    on_events = None
+    if fences:
+        geofences, outbox = GeofenceIndex(fences), Outbox()
+        on_events = lambda events: outbox.publish(geofences.notifications(pd.DataFrame(events)))
+    return FeedWorker(on_events=on_events).start()
+
+@st.cache_resource
+def get_watchlist():
+    """Assinaturas de data/watchlist.json compiladas no índice invertido; None se não houver"""
+    subscriptions = load_subscriptions()
+    if not subscriptions:
+        return None
+    # 'versao': última versão dos dados avaliada; 'enviadas': notificações publicadas nela
+    return {'engine': WatchlistEngine(subscriptions), 'outbox': Outbox(), 'lock': threading.Lock(),
+            'versao': None, 'enviadas': 0}
+
+def dispatch_watchlist(watchlist, version):
+    """Avalia todas as assinaturas (última semana e nível de risco) uma vez por versão dos dados
+
+    Chamada pelo atualizador logo após cada troca de versão, nunca pelas execuções do painel.
+    """
+    df = version.get('df')
+    if watchlist is None or df is None or df.empty:
+        return 0
+    with watchlist['lock']:
+        if version.number == watchlist['versao']:
+            return watchlist['enviadas']
+        recent = df[df['Data Registro'] > df['Data Registro'].max() - timedelta(days=7)]
+        risk_levels = {
+            bairro: classify_safety_level(calculate_crime_rate_per_100k(count, POPULACAO_BAIRROS.get(bairro, 30000)))
+            for bairro, count in version['bairros_stats'].items()
+        }
+        sent = watchlist['outbox'].publish(watchlist['engine'].evaluate(recent, risk_levels))
+        watchlist['versao'], watchlist['enviadas'] = version.number, sent
+        return sent
+
+def format_interval(interval):
+    """Texto curto 'inferior–superior' de um intervalo de credibilidade"""
+    return f"{interval['inferior']:.0f}–{interval['superior']:.0f}"
+
 # Função para carregar estatísticas dos bairros
-@st.cache_data
-def load_neighborhood_stats(df):
+def load_neighborhood_stats(df, tensor=None):
     if df.empty:
         # Dados simulados se não houver dados
         return {
@@ -164,9 +316,9 @@ def load_neighborhood_stats(df):
             "Farroupilha": 13, "Rio Branco": 9, "Partenon": 25, "Sarandi": 24
         }
     
-    # Calcular estatísticas dos bairros diretamente dos dados
-    bairros_stats = df.groupby('Bairro').size().to_dict()
-    return bairros_stats
+    # Calcular estatísticas dos bairros como redução do tensor de contagens
+    bairros_stats = tensor.by_bairro() if tensor is not None else df['Bairro'].value_counts()
+    return {bairro: int(count) for bairro, count in bairros_stats.items() if count > 0}
 
 def calculate_risk_score(df, bairros_stats):
     """Calcula score de risco baseado em múltiplos fatores"""
@@ -192,7 +344,56 @@ def calculate_risk_score(df, bairros_stats):
     
     return min(100, max(0, risk_score))
 
-def generate_alerts(df, bairros_stats, risk_score):
+def detect_emerging_clusters(df, _geometry):
+    """Detecta aglomerados espaço-temporais emergentes (janelas que terminam no último dia)"""
+    if df.empty or _geometry is None:
+        return []
+    counts, dates = build_case_cube(df, _geometry)
+    return detect_space_time_clusters(counts, dates, _geometry, prospective=True, n_permutations=199)
+
+def compute_near_repeat(df):
+    """Tabela de Knox (repetição próxima) para as ocorrências georreferenciadas"""
+    if 'latitude' not in df.columns or df[['latitude', 'longitude']].dropna().shape[0] < 30:
+        return None
+    return near_repeat_from_dataframe(df, n_permutations=99)
+
+def detect_count_anomalies(df):
+    """Séries (bairro, tipo) acima do normal na última semana (EWMA/CUSUM vetorizado)"""
+    return anomalies_from_dataframe(df)
+
+def default_filters(df):
+    """Filtros iniciais da barra lateral: os 5 primeiros tipos de crime e todos os períodos"""
+    return list(df['Descricao do Fato'].unique()[:5]), list(df['Periodo do Dia'].unique())
+
+def filter_key(crimes, periods):
+    """Chave canônica (independe da ordem de seleção) de um par de filtros"""
+    return tuple(sorted(map(str, crimes))), tuple(sorted(map(str, periods)))
+
+def apply_filters(df, crimes, periods):
+    return df[df['Descricao do Fato'].isin(crimes) & df['Periodo do Dia'].isin(periods)]
+
+def analyze_subset(df, geometry):
+    """Análises caras de um recorte: aglomerados, anomalias, previsão e repetição próxima"""
+    return {
+        'clusters': detect_emerging_clusters(df, geometry),
+        'anomalies': detect_count_anomalies(df),
+        'forecast': create_prediction_model(df),
+        'near_repeat': compute_near_repeat(df)
+    }
+
+@st.cache_data(max_entries=32, show_spinner="Analisando os filtros selecionados...")
+def get_filtered_analyses(version_number, filters, _dataset):
+    """Análises de um recorte sem pré-cálculo, em cache por (versão dos dados, filtros)"""
+    crimes, periods = filters
+    return analyze_subset(apply_filters(_dataset['df'], crimes, periods), _dataset.get('geometry'))
+
+def analyses_for(dataset, crimes, periods):
+    """Pré-calculadas pelo atualizador (filtro inicial e conjunto completo) ou do cache por versão"""
+    key = filter_key(crimes, periods)
+    precomputed = dataset.get('analyses', {}).get(key)
+    return precomputed if precomputed is not None else get_filtered_analyses(dataset.number, key, dataset)
+
+def generate_alerts(df, bairros_stats, risk_score, clusters=None, live_alerts=None, anomalies=None):
     """Gera alertas baseados nos dados"""
     alerts = []
     
@@ -216,13 +417,36 @@ def generate_alerts(df, bairros_stats, risk_score):
             'message': f'Risco atual: {risk_score:.1f}%. Período relativamente seguro.'
         })
     
-    # Top 3 bairros mais perigosos
-    top_dangerous = sorted(bairros_stats.items(), key=lambda x: x[1], reverse=True)[:3]
-    alerts.append({
-        'level': 'medium',
-        'title': '⚠️ BAIRROS DE MAIOR RISCO',
-        'message': f"Evite: {', '.join([b[0] for b in top_dangerous])}"
-    })
+    # Aglomerados emergentes significativos (estatística de varredura espaço-temporal)
+    significant = [c for c in (clusters or []) if c['significativo']]
+    for cluster in significant[:2]:
+        alerts.append({
+            'level': 'high',
+            'title': '📍 AGLOMERADO EMERGENTE',
+            'message': f"{cluster['observado']} ocorrências em {', '.join(cluster['bairros'][:3])} "
+                       f"entre {cluster['inicio']:%d/%m} e {cluster['fim']:%d/%m} "
+                       f"({cluster['risco_relativo']:.1f}x o esperado, p={cluster['p_valor']:.3f})"
+        })
+    
+    # Séries bairro x tipo acima da linha de base EWMA/CUSUM no último período
+    if anomalies is not None:
+        for anomaly in anomalies.head(2).to_dict(orient='records'):
+            alerts.append({
+                'level': 'high' if anomaly['z'] >= 5 else 'medium',
+                'title': '📈 ANOMALIA',
+                'message': f"{anomaly['tipo_crime']} em {anomaly['bairro']}: {anomaly['observado']} ocorrências "
+                           f"entre {anomaly['inicio']:%d/%m} e {anomaly['fim']:%d/%m}, "
+                           f"{anomaly['z']:.1f}σ acima do normal (esperado {anomaly['esperado']:.1f})"
+            })
+    
+    # Sem aglomerados significativos: top 3 bairros mais perigosos
+    if not significant:
+        top_dangerous = top_k(bairros_stats, 3)
+        alerts.append({
+            'level': 'medium',
+            'title': '⚠️ BAIRROS DE MAIOR RISCO',
+            'message': f"Evite: {', '.join([b[0] for b in top_dangerous])}"
+        })
     
     # Horário mais perigoso
     if not df.empty:
@@ -233,6 +457,10 @@ def generate_alerts(df, bairros_stats, risk_score):
             'message': f'Maior incidência entre {dangerous_hour}h-{dangerous_hour+1}h'
         })
     
+    # Limites cruzados no feed ao vivo (src/streaming.py)
+    for alert in (live_alerts or [])[:3]:
+        alerts.append({key: alert[key] for key in ('level', 'title', 'message')})
+    
     return alerts
 
 def create_prediction_model(df):
@@ -283,88 +511,7 @@ def create_prediction_model(df):
     
     return future_dates, predictions
 
-# Dados geográficos simplificados dos bairros (polígonos aproximados)
-# Baseado em coordenadas aproximadas dos limites dos bairros de Porto Alegre
-BAIRROS_POLYGONS = {
-    "Centro Histórico": [[-30.0200, -51.2350], [-30.0200, -51.2200], [-30.0350, -51.2200], [-30.0350, -51.2350]],
-    "Cidade Baixa": [[-30.0350, -51.2200], [-30.0350, -51.2100], [-30.0400, -51.2100], [-30.0400, -51.2200]],
-    "Bom Fim": [[-30.0300, -51.2150], [-30.0300, -51.2050], [-30.0380, -51.2050], [-30.0380, -51.2150]],
-    "Menino Deus": [[-30.0450, -51.2250], [-30.0450, -51.2150], [-30.0550, -51.2150], [-30.0550, -51.2250]],
-    "Moinhos de Vento": [[-30.0200, -51.2150], [-30.0200, -51.2050], [-30.0300, -51.2050], [-30.0300, -51.2150]],
-    "Floresta": [[-30.0150, -51.2450], [-30.0150, -51.2350], [-30.0250, -51.2350], [-30.0250, -51.2450]],
-    "Santana": [[-30.0350, -51.2350], [-30.0350, -51.2250], [-30.0450, -51.2250], [-30.0450, -51.2350]],
-    "Petrópolis": [[-30.0450, -51.2450], [-30.0450, -51.2350], [-30.0550, -51.2350], [-30.0550, -51.2450]],
-    "Mont Serrat": [[-30.0550, -51.2550], [-30.0550, -51.2450], [-30.0650, -51.2450], [-30.0650, -51.2550]],
-    "Farroupilha": [[-30.0250, -51.2150], [-30.0250, -51.2050], [-30.0350, -51.2050], [-30.0350, -51.2150]],
-    "Praia de Belas": [[-30.0350, -51.2450], [-30.0350, -51.2350], [-30.0450, -51.2350], [-30.0450, -51.2450]],
-    "Rio Branco": [[-30.0050, -51.2250], [-30.0050, -51.2150], [-30.0150, -51.2150], [-30.0150, -51.2250]],
-    "Partenon": [[-30.0400, -51.2050], [-30.0400, -51.1950], [-30.0500, -51.1950], [-30.0500, -51.2050]],
-    "Sarandi": [[-30.0100, -51.2350], [-30.0100, -51.2250], [-30.0200, -51.2250], [-30.0200, -51.2350]],
-    "Lomba do Pinheiro": [[-30.1200, -51.1200], [-30.1200, -51.1100], [-30.1300, -51.1100], [-30.1300, -51.1200]],
-    "Restinga": [[-30.1500, -51.1000], [-30.1500, -51.0900], [-30.1600, -51.0900], [-30.1600, -51.1000]],
-    "Rubem Berta": [[-29.9800, -51.1800], [-29.9800, -51.1700], [-29.9900, -51.1700], [-29.9900, -51.1800]],
-    "Cavalhada": [[-30.0800, -51.2400], [-30.0800, -51.2300], [-30.0900, -51.2300], [-30.0900, -51.2400]],
-    "Cristal": [[-30.0700, -51.2200], [-30.0700, -51.2100], [-30.0800, -51.2100], [-30.0800, -51.2200]],
-    "Ipanema": [[-30.0900, -51.2500], [-30.0900, -51.2400], [-30.1000, -51.2400], [-30.1000, -51.2500]],
-    "Nonoai": [[-30.0600, -51.1900], [-30.0600, -51.1800], [-30.0700, -51.1800], [-30.0700, -51.1900]],
-    "Vila Nova": [[-30.0500, -51.1800], [-30.0500, -51.1700], [-30.0600, -51.1700], [-30.0600, -51.1800]],
-    "Tristeza": [[-30.1100, -51.2300], [-30.1100, -51.2200], [-30.1200, -51.2200], [-30.1200, -51.2300]],
-    "Camaquã": [[-30.1000, -51.2200], [-30.1000, -51.2100], [-30.1100, -51.2100], [-30.1100, -51.2200]],
-    "Belém Novo": [[-30.1300, -51.2500], [-30.1300, -51.2400], [-30.1400, -51.2400], [-30.1400, -51.2500]],
-    "Glória": [[-30.0100, -51.2100], [-30.0100, -51.2000], [-30.0200, -51.2000], [-30.0200, -51.2100]],
-    "Auxiliadora": [[-30.0150, -51.2000], [-30.0150, -51.1900], [-30.0250, -51.1900], [-30.0250, -51.2000]],
-    "Higienópolis": [[-30.0250, -51.2000], [-30.0250, -51.1900], [-30.0350, -51.1900], [-30.0350, -51.2000]],
-    "Independência": [[-30.0350, -51.2000], [-30.0350, -51.1900], [-30.0450, -51.1900], [-30.0450, -51.2000]],
-    "Azenha": [[-30.0450, -51.2000], [-30.0450, -51.1900], [-30.0550, -51.1900], [-30.0550, -51.2000]],
-    "Marcílio Dias": [[-30.0550, -51.2000], [-30.0550, -51.1900], [-30.0650, -51.1900], [-30.0650, -51.2000]],
-    "Navegantes": [[-29.9900, -51.2100], [-29.9900, -51.2000], [-30.0000, -51.2000], [-30.0000, -51.2100]],
-    "Humaitá": [[-29.9800, -51.2000], [-29.9800, -51.1900], [-29.9900, -51.1900], [-29.9900, -51.2000]],
-    "Anchieta": [[-29.9700, -51.1900], [-29.9700, -51.1800], [-29.9800, -51.1800], [-29.9800, -51.1900]],
-    "Passo da Areia": [[-29.9600, -51.1800], [-29.9600, -51.1700], [-29.9700, -51.1700], [-29.9700, -51.1800]],
-    "São Geraldo": [[-29.9500, -51.1700], [-29.9500, -51.1600], [-29.9600, -51.1600], [-29.9600, -51.1700]],
-    "Jardim Botânico": [[-30.0700, -51.1800], [-30.0700, -51.1700], [-30.0800, -51.1700], [-30.0800, -51.1800]],
-    "Três Figueiras": [[-30.0600, -51.1700], [-30.0600, -51.1600], [-30.0700, -51.1600], [-30.0700, -51.1700]],
-    "Chácara das Pedras": [[-30.0500, -51.1600], [-30.0500, -51.1500], [-30.0600, -51.1500], [-30.0600, -51.1600]],
-    "Boa Vista": [[-30.0400, -51.1500], [-30.0400, -51.1400], [-30.0500, -51.1400], [-30.0500, -51.1500]],
-    "Jardim Lindóia": [[-30.0300, -51.1400], [-30.0300, -51.1300], [-30.0400, -51.1300], [-30.0400, -51.1400]],
-    "Jardim do Salso": [[-30.0200, -51.1300], [-30.0200, -51.1200], [-30.0300, -51.1200], [-30.0300, -51.1300]],
-    "Jardim Carvalho": [[-30.0100, -51.1200], [-30.0100, -51.1100], [-30.0200, -51.1100], [-30.0200, -51.1200]],
-    "Vila Assunção": [[-30.0000, -51.1100], [-30.0000, -51.1000], [-30.0100, -51.1000], [-30.0100, -51.1100]],
-    "Pedra Redonda": [[-29.9900, -51.1000], [-29.9900, -51.0900], [-30.0000, -51.0900], [-30.0000, -51.1000]],
-    "Serraria": [[-29.9800, -51.0900], [-29.9800, -51.0800], [-29.9900, -51.0800], [-29.9900, -51.0900]],
-    "Jardim Sabará": [[-29.9700, -51.0800], [-29.9700, -51.0700], [-29.9800, -51.0700], [-29.9800, -51.0800]],
-    "Mário Quintana": [[-29.9600, -51.0700], [-29.9600, -51.0600], [-29.9700, -51.0600], [-29.9700, -51.0700]],
-    "Coronel Aparício Borges": [[-29.9500, -51.0600], [-29.9500, -51.0500], [-29.9600, -51.0500], [-29.9600, -51.0600]],
-    "Lami": [[-30.1400, -51.2600], [-30.1400, -51.2500], [-30.1500, -51.2500], [-30.1500, -51.2600]],
-    "Chapéu do Sol": [[-30.1300, -51.2400], [-30.1300, -51.2300], [-30.1400, -51.2300], [-30.1400, -51.2400]],
-    "Ponta Grossa": [[-30.1200, -51.2300], [-30.1200, -51.2200], [-30.1300, -51.2200], [-30.1300, -51.2300]],
-    "Teresópolis": [[-30.0800, -51.1600], [-30.0800, -51.1500], [-30.0900, -51.1500], [-30.0900, -51.1600]],
-    "Medianeira": [[-30.0900, -51.1500], [-30.0900, -51.1400], [-30.1000, -51.1400], [-30.1000, -51.1500]],
-    "Santa Tereza": [[-30.0700, -51.1500], [-30.0700, -51.1400], [-30.0800, -51.1400], [-30.0800, -51.1500]],
-    "Morro Santana": [[-30.0600, -51.1400], [-30.0600, -51.1300], [-30.0700, -51.1300], [-30.0700, -51.1400]],
-    "Protásio Alves": [[-30.0500, -51.1300], [-30.0500, -51.1200], [-30.0600, -51.1200], [-30.0600, -51.1300]],
-    "Jardim Itu": [[-30.0400, -51.1200], [-30.0400, -51.1100], [-30.0500, -51.1100], [-30.0500, -51.1200]],
-    "Vila Ipiranga": [[-30.0300, -51.1100], [-30.0300, -51.1000], [-30.0400, -51.1000], [-30.0400, -51.1100]],
-    "Agronomia": [[-30.0200, -51.1000], [-30.0200, -51.0900], [-30.0300, -51.0900], [-30.0300, -51.1000]],
-    "Jardim São Pedro": [[-30.0100, -51.0900], [-30.0100, -51.0800], [-30.0200, -51.0800], [-30.0200, -51.0900]],
-    "Bom Jesus": [[-30.0000, -51.0800], [-30.0000, -51.0700], [-30.0100, -51.0700], [-30.0100, -51.0800]],
-    "Guarujá": [[-29.9900, -51.0700], [-29.9900, -51.0600], [-30.0000, -51.0600], [-30.0000, -51.0700]],
-    "Espírito Santo": [[-29.9800, -51.0600], [-29.9800, -51.0500], [-29.9900, -51.0500], [-29.9900, -51.0600]],
-    "São João": [[-29.9700, -51.0500], [-29.9700, -51.0400], [-29.9800, -51.0400], [-29.9800, -51.0500]],
-    "Parque dos Maias": [[-29.9600, -51.0400], [-29.9600, -51.0300], [-29.9700, -51.0300], [-29.9700, -51.0400]],
-    "Ilhas": [[-29.9500, -51.0300], [-29.9500, -51.0200], [-29.9600, -51.0200], [-29.9600, -51.0300]],
-    "Arquipélago": [[-29.9400, -51.0200], [-29.9400, -51.0100], [-29.9500, -51.0100], [-29.9500, -51.0200]],
-    "Hípica": [[-30.0800, -51.2000], [-30.0800, -51.1900], [-30.0900, -51.1900], [-30.0900, -51.2000]],
-    "Aberta dos Morros": [[-30.1000, -51.1800], [-30.1000, -51.1700], [-30.1100, -51.1700], [-30.1100, -51.1800]],
-    "Serafina Corrêa": [[-30.1100, -51.1600], [-30.1100, -51.1500], [-30.1200, -51.1500], [-30.1200, -51.1600]],
-    "Cascata": [[-30.1200, -51.1400], [-30.1200, -51.1300], [-30.1300, -51.1300], [-30.1300, -51.1400]],
-    "Passo das Pedras": [[-29.9400, -51.1600], [-29.9400, -51.1500], [-29.9500, -51.1500], [-29.9500, -51.1600]],
-    "Sarandi": [[-30.0100, -51.2350], [-30.0100, -51.2250], [-30.0200, -51.2250], [-30.0200, -51.2350]],
-    "Mathias Velho": [[-29.9300, -51.1500], [-29.9300, -51.1400], [-29.9400, -51.1400], [-29.9400, -51.1500]],
-    "Farrapos": [[-29.9800, -51.2200], [-29.9800, -51.2100], [-29.9900, -51.2100], [-29.9900, -51.2200]]
-}
-
-def create_advanced_map(bairros_stats):
+def create_advanced_map(bairros_stats, geometry=None, smoothed_rates=None, intervals=None):
     """Cria mapa avançado com coloração por bairros baseada em níveis de segurança"""
     m = folium.Map(
         location=[-30.0346, -51.2087],
@@ -373,9 +520,16 @@ def create_advanced_map(bairros_stats):
         prefer_canvas=True
     )
     
+    # Enquadrar a cidade a partir das bounding boxes pré-computadas
+    if geometry is not None and len(geometry) > 0:
+        m.fit_bounds([
+            [float(geometry.bboxes[:, 0].min()), float(geometry.bboxes[:, 1].min())],
+            [float(geometry.bboxes[:, 2].max()), float(geometry.bboxes[:, 3].max())]
+        ])
+    
     # Carregar dados GeoJSON dos bairros
     try:
-        with open('data/GeoJSON', 'r', encoding='utf-8') as f:
+        with open(DEFAULT_BOUNDARY_PATH, 'r', encoding='utf-8') as f:
             geojson_data = json.load(f)
     except Exception as e:
         st.error(f"Erro ao carregar dados geográficos: {e}")
@@ -402,8 +556,15 @@ def create_advanced_map(bairros_stats):
         # Calcular taxa de criminalidade por 100k habitantes
         crime_rate = calculate_crime_rate_per_100k(crimes_count, population)
         
+        # Taxa suavizada (quando disponível) define o nível pela escala por 100k
+        smoothed_rate = None
+        if smoothed_rates is not None:
+            smoothed_rate = smoothed_rates.get(normalize_bairro_name(bairro_geojson))
+        
         # Classificar nível de segurança com lógica melhorada
-        if crimes_count == 0:
+        if smoothed_rate is not None:
+            safety_level = classify_safety_level(smoothed_rate)
+        elif crimes_count == 0:
             safety_level = 'muito_seguro'
         elif crimes_count <= avg_crimes * 0.5:
             safety_level = 'seguro'
@@ -416,6 +577,18 @@ def create_advanced_map(bairros_stats):
         color = get_safety_color(safety_level)
         safety_label = get_safety_label(safety_level)
         
+        smoothed_html = ""
+        tooltip_rate = crime_rate
+        if smoothed_rate is not None:
+            smoothed_html = f"<p><b>Taxa suavizada:</b> {smoothed_rate:.1f}/100k</p>"
+            tooltip_rate = smoothed_rate
+        
+        interval_html = ""
+        interval = intervals.get(normalize_bairro_name(bairro_geojson)) if intervals else None
+        if interval is not None:
+            interval_html = (f"<p><b>Estimativa distribuída:</b> {interval['estimado']:.0f} "
+                             f"(IC 90%: {format_interval(interval)})</p>")
+        
         # Criar popup com informações detalhadas
         popup_html = f"""
         <div style="font-family: Arial; width: 200px;">
@@ -425,6 +598,8 @@ def create_advanced_map(bairros_stats):
             <p><b>Crimes Registrados:</b> {crimes_count}</p>
             <p><b>Taxa por 100k hab:</b> {crime_rate:.1f}</p>
             <p><b>População Estimada:</b> {population:,}</p>
+            {smoothed_html}
+            {interval_html}
         </div>
         """
         
@@ -432,7 +607,7 @@ def create_advanced_map(bairros_stats):
         folium.GeoJson(
             feature,
             popup=folium.Popup(popup_html, max_width=250),
-            tooltip=f"{bairro}: {safety_label} ({crime_rate:.1f}/100k)",
+            tooltip=f"{bairro}: {safety_label} ({tooltip_rate:.1f}/100k)",
             style_function=lambda x, color=color: {
                 'fillColor': color,
                 'color': 'white',  # Bordas brancas para maior contraste
@@ -459,28 +634,39 @@ def create_advanced_map(bairros_stats):
     
     return m
 
-def export_report(df, bairros_stats, risk_score):
-    """Gera relatório em formato texto"""
+def export_report(df, bairros_stats, risk_score, store=None, tipos=None):
+    """Gera relatório em formato texto (agregados consultados no banco quando disponível)"""
+    if store is not None:
+        total = store.count(tipos=tipos)
+        first_date, last_date = store.date_range(tipos=tipos)
+        top_bairros = list(store.counts_by('bairro', limit=5, tipos=tipos).items())
+        most_common = store.mode('tipo_crime', tipos=tipos) or 'N/A'
+    else:
+        total = len(df)
+        first_date = df['Data Registro'].min() if not df.empty else None
+        last_date = df['Data Registro'].max() if not df.empty else None
+        top_bairros = top_k(bairros_stats, 5)
+        most_common = df['Descricao do Fato'].mode()[0] if len(df) > 0 else 'N/A'
+    
     report = f"""
 # RELATÓRIO DE SEGURANÇA PÚBLICA - PORTO ALEGRE
 Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}
 
 ## RESUMO EXECUTIVO
-- Total de assaltos analisados: {len(df)}
+- Total de assaltos analisados: {total}
 - Risco atual: {risk_score:.1f}%
-- Período analisado: {df['Data Registro'].min().strftime('%d/%m/%Y') if not df.empty else 'N/A'} a {df['Data Registro'].max().strftime('%d/%m/%Y') if not df.empty else 'N/A'}
+- Período analisado: {first_date.strftime('%d/%m/%Y') if first_date is not None else 'N/A'} a {last_date.strftime('%d/%m/%Y') if last_date is not None else 'N/A'}
 
 ## TOP 5 BAIRROS MAIS PERIGOSOS
 """
     
-    top_bairros = sorted(bairros_stats.items(), key=lambda x: x[1], reverse=True)[:5]
     for i, (bairro, count) in enumerate(top_bairros, 1):
         report += f"{i}. {bairro}: {count} assaltos\n"
     
     if not df.empty:
         report += f"""
 ## ANÁLISE TEMPORAL
-- Tipo de crime mais comum: {df['Descricao do Fato'].mode()[0] if len(df) > 0 else 'N/A'}
+- Tipo de crime mais comum: {most_common}
 - Período mais perigoso: {df['Periodo do Dia'].mode()[0] if len(df) > 0 else 'N/A'}
 - Horário de maior risco: {df.groupby('Hora').size().idxmax()}h
 
@@ -493,46 +679,165 @@ Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}
     
     return report
 
+def build_dataset():
+    """Dados e estruturas derivadas de uma versão, construídos pelo atualizador em segundo plano
+
+    Agregações, grade de risco, índice de bairros e intervalos do mapa são calculados aqui,
+    assim como aglomerados, anomalias, previsão e repetição próxima para o filtro inicial da
+    barra lateral e para o conjunto completo; as execuções do painel só os leem.
+    Os artefatos em disco vão para um diretório próprio da versão, publicado ao final.
+    """
+    df = load_data()
+    if df.empty:
+        return {'df': df, 'bairros_stats': load_neighborhood_stats(df), 'erro': "Arquivo de dados não encontrado."}
+    try:
+        geometry = load_geometry_metadata()
+    except FileNotFoundError:
+        geometry = None
+    directory = new_version_directory(source_fingerprint([CRIME_DATA_PATH]))
+    tensor = get_count_tensor(df, directory)
+    initial = filter_key(*default_filters(df))
+    full = filter_key(df['Descricao do Fato'].unique(), df['Periodo do Dia'].unique())
+    analyses = {initial: analyze_subset(apply_filters(df, *initial), geometry)}
+    if full != initial:
+        analyses[full] = analyze_subset(df, geometry)
+    dataset = {
+        'df': df,
+        'directory': directory,
+        'geometry': geometry,
+        'tensor': tensor,
+        'rollups': get_rollups(tensor, directory),
+        'bairros_stats': load_neighborhood_stats(df, tensor),
+        'risk_grid': get_risk_grid(df, geometry, directory),
+        'neighborhood_index': get_neighborhood_index(df, geometry),
+        'distribution_intervals': get_distribution_intervals(df),
+        'analyses': analyses
+    }
+    publish_version_directory(directory)
+    prune_version_directories(protect=[directory])
+    return dataset
+
+@st.cache_resource
+def get_dataset_refresher():
+    """Atualizador único por processo: observa o CSV e troca a versão dos dados em segundo plano
+
+    Cada versão nova dispara uma única avaliação das listas de observação.
+    """
+    watchlist = get_watchlist()
+    return BackgroundRefresher([CRIME_DATA_PATH], build_dataset, interval=DATA_REFRESH_SECONDS,
+                               on_swap=lambda version: dispatch_watchlist(watchlist, version)).start()
+
 def main():
     st.title("🚨 Alerta POA - Sistema Avançado de Segurança")
     st.markdown("### Análise Preditiva e Alertas em Tempo Real")
     
-    # Carregar dados
-    df = load_data()
-    bairros_stats = load_neighborhood_stats(df)
+    # Carregar dados: versão atual (só a primeira execução espera a carga inicial)
+    refresher = get_dataset_refresher()
+    feed = get_feed_worker()          # feed ao vivo e cercas seguem em segundo plano; aqui só lemos
+    dataset = refresher.handle.wait()
+    df = dataset.get('df', pd.DataFrame())
+    bairros_stats = dataset.get('bairros_stats') or load_neighborhood_stats(df)
+    geometry = load_geometry()
+    if dataset.get('erro'):
+        st.error(dataset['erro'])
+    else:
+        st.sidebar.success(f"✅ Dados carregados (versão {dataset.number}, {dataset.loaded_at:%d/%m %H:%M})")
+    if refresher.last_error is not None:
+        st.sidebar.warning(f"⚠️ Falha ao atualizar os dados; mantendo a versão {dataset.number}: {refresher.last_error}")
     
     # Calcular risco atual
     risk_score = calculate_risk_score(df, bairros_stats)
     
+    # Notificações das listas de observação (data/watchlist.json -> data/alert_outbox.jsonl),
+    # publicadas pelo atualizador a cada versão
+    watchlist = get_watchlist()
+    sent = watchlist['enviadas'] if watchlist is not None and watchlist['versao'] == dataset.number else 0
+    
     # Sidebar
     st.sidebar.header("🔍 Controles")
+    if sent:
+        st.sidebar.caption(f"📬 {sent} notificações enviadas às listas de observação")
     
     # Filtros
     if not df.empty:
-        crime_types = df['Descricao do Fato'].unique()
+        default_crimes, default_periods = default_filters(df)
         selected_crimes = st.sidebar.multiselect(
             "Filtrar por Tipo de Crime",
-            crime_types,
-            default=crime_types[:5]
+            df['Descricao do Fato'].unique(),
+            default=default_crimes
         )
         
-        periods = df['Periodo do Dia'].unique()
         selected_periods = st.sidebar.multiselect(
             "Filtrar por Período",
-            periods,
-            default=periods
+            df['Periodo do Dia'].unique(),
+            default=default_periods
         )
         
         # Aplicar filtros
-        filtered_df = df[
-            (df['Descricao do Fato'].isin(selected_crimes)) &
-            (df['Periodo do Dia'].isin(selected_periods))
-        ]
+        filtered_df = apply_filters(df, selected_crimes, selected_periods)
+        analyses = analyses_for(dataset, selected_crimes, selected_periods)
     else:
         filtered_df = df
+        analyses = {'clusters': [], 'anomalies': None, 'forecast': (None, None), 'near_repeat': None}
+    
+    # Banco analítico (python -m src.crime_store), só se importado do CSV atual: responde
+    # ranking, métricas, tendência e relatório no SQLite em vez de reagrupar as linhas
+    store = get_crime_store()
+    if store is not None and not store.source_matches(CRIME_DATA_PATH):
+        store = None        # banco de outra origem ou anterior à versão atual dos dados
+    # O banco e as agregações não guardam a hora simulada: com filtro de período usam-se as linhas filtradas
+    all_periods = not df.empty and set(selected_periods) == set(df['Periodo do Dia'].unique())
+    period_store = store if all_periods else None
+    
+    use_smoothing = st.sidebar.checkbox(
+        "Suavizar taxas no mapa",
+        value=False,
+        help="Bayes empírico espacial: aproxima a taxa de bairros pequenos da média dos vizinhos "
+             "(usa os filtros selecionados)"
+    )
+    
+    use_live_feed = st.sidebar.checkbox(
+        "📡 Feed ao vivo",
+        value=False,
+        help="Acompanha data/incident_feed.csv e alerta quando um bairro cruza o limite "
+             "de ocorrências na janela deslizante"
+    )
+    
+    with st.sidebar.expander("🧭 Risco de Trajeto"):
+        route_text = st.text_area(
+            "Coordenadas do trajeto (uma 'latitude, longitude' por linha)",
+            value="-30.0277, -51.2287\n-30.0346, -51.2177\n-30.0392, -51.2065"
+        )
+        departure = st.time_input("Horário de partida", value=datetime.now().time())
+        if st.button("Calcular risco do trajeto"):
+            try:
+                route = [tuple(float(v) for v in line.split(',')) for line in route_text.splitlines() if line.strip()]
+                risk_grid = dataset.get('risk_grid')
+                if risk_grid is None:
+                    st.warning("Grade de risco indisponível.")
+                else:
+                    result = score_route(route, departure.hour + departure.minute / 60, risk_grid)
+                    st.metric("Risco acumulado", f"{result['risco_acumulado']:.2f}")
+                    st.metric("Risco de pico", f"{result['risco_pico'] * 100:.0f}%")
+                    st.caption(f"{result['distancia_m'] / 1000:.1f} km, ~{result['duracao_min']:.0f} min a pé. "
+                               f"Pico às {int(result['pico_hora']):02d}h em "
+                               f"({result['pico_latitude']:.4f}, {result['pico_longitude']:.4f})")
+            except ValueError:
+                st.error("Formato inválido: use 'latitude, longitude' em cada linha.")
     
     # Gerar alertas
-    alerts = generate_alerts(filtered_df, bairros_stats, risk_score)
+    clusters = analyses['clusters']
+    live_alerts = feed.alerts() if use_live_feed else None
+    if use_live_feed:
+        with st.sidebar.expander(f"📡 Mais frequentes no feed ({feed.monitor.window_label})", expanded=True):
+            live_bairros, live_tipos = feed.top('bairro', 5), feed.top('tipo_crime', 3)
+            if not live_bairros:
+                st.caption("Nenhuma ocorrência recente no feed.")
+            for i, (bairro, count) in enumerate(live_bairros, 1):
+                st.write(f"{i}. **{bairro}**: {count}")
+            if live_tipos:
+                st.caption("Tipos: " + ", ".join(f"{tipo} ({count})" for tipo, count in live_tipos))
+    alerts = generate_alerts(filtered_df, bairros_stats, risk_score, clusters, live_alerts, analyses['anomalies'])
     
     # Seção de alertas
     st.subheader("🚨 Alertas de Segurança")
@@ -592,23 +897,48 @@ def main():
     
     with col1:
         st.subheader("🗺️ Mapa de Risco Interativo")
-        advanced_map = create_advanced_map(bairros_stats)
+        smoothed_rates = None
+        map_stats = bairros_stats
+        if use_smoothing and geometry is not None and not filtered_df.empty:
+            map_stats = filtered_df.groupby('Bairro').size().to_dict()
+            smoothed_rates = compute_smoothed_rates(map_stats, geometry)
+        intervals = dataset.get('distribution_intervals')
+        advanced_map = create_advanced_map(map_stats, geometry, smoothed_rates, intervals)
         map_data = st_folium(advanced_map, width=700, height=500)
+        
+        # Clique no mapa: bairros mais próximos com o nível de segurança desta hora
+        neighborhood_index = dataset.get('neighborhood_index')
+        if neighborhood_index is not None and map_data and map_data.get('last_clicked'):
+            clicked = map_data['last_clicked']
+            nearby = neighborhood_index.nearest(clicked['lat'], clicked['lng'], datetime.now().hour, k=5)
+            st.markdown("**📍 Bairros mais próximos do ponto selecionado (agora):**")
+            for item in nearby:
+                st.markdown(f"- {item['bairro']} — {item['distancia_m'] / 1000:.1f} km — "
+                            f"<span style='color:{get_safety_color(item['nivel'])}'>"
+                            f"{get_safety_label(item['nivel'])}</span>", unsafe_allow_html=True)
     
     with col2:
         st.subheader("📊 Métricas em Tempo Real")
         
         # Métricas principais
         st.metric("🎯 Risco Atual", f"{risk_score:.1f}%")
-        st.metric("📍 Total de Assaltos", len(filtered_df))
+        if period_store is not None:
+            total = period_store.count(tipos=selected_crimes)
+            most_common = period_store.mode('tipo_crime', tipos=selected_crimes)
+        else:
+            total = len(filtered_df)
+            most_common = filtered_df['Descricao do Fato'].mode()[0] if not filtered_df.empty else None
+        st.metric("📍 Total de Assaltos", total)
         
-        if not filtered_df.empty:
-            most_common = filtered_df['Descricao do Fato'].mode()[0]
+        if most_common is not None:
             st.metric("🔝 Tipo Mais Comum", most_common)
         
         # Top 5 bairros perigosos
         st.subheader("🏘️ Ranking de Risco")
-        top_bairros = sorted(bairros_stats.items(), key=lambda x: x[1], reverse=True)[:5]
+        if store is not None:
+            top_bairros = list(store.counts_by('bairro', limit=5).items())
+        else:
+            top_bairros = top_k(bairros_stats, 5)
         
         for i, (bairro, count) in enumerate(top_bairros, 1):
             if count > 20:
@@ -617,12 +947,17 @@ def main():
                 emoji = "🟡"
             else:
                 emoji = "🟢"
-            st.write(f"{emoji} {i}. **{bairro}**: {count}")
+            interval = intervals.get(normalize_bairro_name(bairro)) if intervals else None
+            if interval is not None:
+                st.write(f"{emoji} {i}. **{bairro}**: {count} registros (estimativa distribuída: "
+                         f"{interval['estimado']:.0f}, IC 90%: {format_interval(interval)})")
+            else:
+                st.write(f"{emoji} {i}. **{bairro}**: {count}")
     
     # Análise preditiva
     st.subheader("🔮 Análise Preditiva")
     
-    future_dates, predictions = create_prediction_model(filtered_df)
+    future_dates, predictions = analyses['forecast']
     
     if future_dates and predictions is not None:
         col3, col4 = st.columns(2)
@@ -683,23 +1018,116 @@ def main():
             st.plotly_chart(fig_heatmap, use_container_width=True)
         
         with col6:
-            # Tendência mensal
-            monthly_data = filtered_df.groupby(filtered_df['Data Registro'].dt.to_period('M')).size()
+            # Tendência na granularidade escolhida
+            granularity_labels = {'dia': 'Dia', 'semana': 'Semana', 'mes': 'Mês', 'trimestre': 'Trimestre', 'ano': 'Ano'}
+            granularity = st.radio(
+                "Granularidade",
+                list(GRANULARITIES),
+                index=2,
+                format_func=granularity_labels.get,
+                horizontal=True
+            )
+            if period_store is not None and granularity in PERIOD_EXPRESSIONS:
+                counts = period_store.counts_by_period(granularity, tipos=selected_crimes)
+                index = pd.PeriodIndex(counts.index, freq=GRANULARITIES[granularity])
+                yoy = year_over_year_table(pd.Series(counts.to_numpy(), index=index))
+            elif all_periods:
+                yoy = dataset['rollups'].year_over_year(granularity, tipos=selected_crimes)
+            else:
+                freq = GRANULARITIES[granularity]
+                counts = filtered_df.groupby(filtered_df['Data Registro'].dt.to_period(freq)).size()
+                yoy = pd.DataFrame({'valor': counts, 'valor_ano_anterior': np.nan, 'variacao_pct': np.nan})
             fig_monthly = px.line(
-                x=monthly_data.index.astype(str),
-                y=monthly_data.values,
-                title="Tendência Mensal de Assaltos",
-                labels={'x': 'Mês', 'y': 'Número de Assaltos'}
+                x=yoy.index.astype(str),
+                y=yoy['valor'].values,
+                title=f"Tendência de Assaltos por {granularity_labels[granularity]}",
+                labels={'x': granularity_labels[granularity], 'y': 'Número de Assaltos'}
             )
             fig_monthly.update_traces(line_color='red')
             fig_monthly.update_layout(height=400)
             st.plotly_chart(fig_monthly, use_container_width=True)
+            
+            # Variação do último período frente ao mesmo período do ano anterior
+            latest = yoy.dropna(subset=['variacao_pct']).tail(1)
+            if not latest.empty:
+                st.metric(
+                    f"Último período vs ano anterior ({latest.index[0]})",
+                    int(latest['valor'].iloc[0]),
+                    f"{latest['variacao_pct'].iloc[0]:+.1f}%",
+                    delta_color="inverse"
+                )
+        
+        with st.expander("⚖️ Comparação de Períodos"):
+            rollups = dataset['rollups']
+            last_day = rollups.last_date.date()
+            col_a, col_b = st.columns(2)
+            with col_a:
+                period_a = st.date_input(
+                    "Período A (referência)",
+                    value=(last_day - timedelta(days=394), last_day - timedelta(days=365))
+                )
+            with col_b:
+                period_b = st.date_input(
+                    "Período B (comparado)",
+                    value=(last_day - timedelta(days=29), last_day)
+                )
+            compare_by = st.radio("Comparar por", ['bairro', 'tipo'],
+                                  format_func={'bairro': 'Bairro', 'tipo': 'Tipo de Crime'}.get,
+                                  horizontal=True)
+            if len(period_a) == 2 and len(period_b) == 2:
+                comparison = rollups.compare(period_a, period_b, by=compare_by, tipos=selected_crimes)
+                movers = comparison.head(15)
+                fig_movers = px.bar(
+                    movers.iloc[::-1],
+                    x='variacao',
+                    y=compare_by,
+                    orientation='h',
+                    color='variacao',
+                    color_continuous_scale='RdYlGn_r',
+                    color_continuous_midpoint=0,
+                    title="Maiores Variações (B - A)",
+                    labels={'variacao': 'Variação', compare_by: ''}
+                )
+                fig_movers.update_layout(height=450)
+                st.plotly_chart(fig_movers, use_container_width=True)
+                st.dataframe(
+                    comparison.rename(columns={
+                        'periodo_a': 'Período A', 'periodo_b': 'Período B',
+                        'variacao': 'Variação', 'variacao_pct': 'Variação (%)'
+                    }).style.format({'Variação (%)': '{:+.1f}%'}, na_rep='—'),
+                    use_container_width=True
+                )
+            else:
+                st.info("Selecione data inicial e final para os dois períodos.")
+        
+        with st.expander("🔁 Repetição Próxima (Near-Repeat)"):
+            near_repeat = analyses['near_repeat']
+            if near_repeat is None:
+                st.info("Poucas ocorrências georreferenciadas para o teste de Knox.")
+            else:
+                knox_pivot = near_repeat.pivot(index='distancia', columns='tempo', values='razao_knox')
+                fig_knox = px.imshow(
+                    knox_pivot,
+                    labels=dict(x="Intervalo de Tempo", y="Distância", color="Razão de Knox"),
+                    title="Razão de Knox (observado / esperado)",
+                    color_continuous_scale='RdYlGn_r',
+                    color_continuous_midpoint=1.0,
+                    text_auto='.2f'
+                )
+                fig_knox.update_layout(height=400)
+                st.plotly_chart(fig_knox, use_container_width=True)
+                significant = near_repeat[(near_repeat['p_valor'] < 0.05) & (near_repeat['razao_knox'] > 1)]
+                if not significant.empty:
+                    st.caption("Faixas com excesso significativo (p < 0,05): " + ", ".join(
+                        f"{row.distancia} / {row.tempo}" for row in significant.itertuples()
+                    ))
     
     # Exportar relatório
     st.subheader("📄 Exportar Relatório")
     
     if st.button("📊 Gerar Relatório Completo"):
-        report = export_report(filtered_df, bairros_stats, risk_score)
+        report = export_report(filtered_df, bairros_stats, risk_score, period_store,
+                               selected_crimes if period_store else None)
         st.download_button(
             label="📥 Baixar Relatório",
             data=report,
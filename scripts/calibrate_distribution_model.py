@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Calibração dos Pesos do Modelo de Distribuição
+
+Ajusta os pesos finais (bairro x tipo de crime) do modelo de distribuição aos
+números oficiais conhecidos: as regras de contagem de validation_rules.py e os
+números da SSP-RS em update_crime_data_2024_2025.py.
+
+Cada número vira uma linha de um sistema linear: o valor previsto é a soma,
+nos bairros e tipos do número, de (total municipal do tipo na janela) x peso.
+Os pesos são estimados por máxima verossimilhança de Poisson com atualizações
+multiplicativas (EM), que mantêm os pesos não negativos, e uma priori que puxa
+cada peso para o valor atual das tabelas: pesos sem nenhum número que os
+informe ficam como estão. A execução parte da última calibração salva
+(warm start) e termina em frações de segundo.
+
+Uso (a partir da pasta scripts):
+    python calibrate_distribution_model.py [forca_priori]
+"""
+
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from crime_distribution_model import (CALIBRATED_MODEL_DIR, MUNICIPAL_SAMPLE_SEED, CrimeDistributionModel,
+                                      load_compiled_distribution_model, model_tables_checksum)
+from model_artifact import load_model_artifact, write_model_artifact
+from update_crime_data_2024_2025 import create_updated_data
+from validation_rules import VALIDATION_RULES, normalize_text
+
+# Peso da priori relativo à informação dos dados em cada peso (0.1 = dados valem 10x)
+DEFAULT_PRIOR_STRENGTH = 0.1
+DEFAULT_MAX_ITERATIONS = 2000
+DEFAULT_TOLERANCE = 1e-9
+
+# Nome usado para números consolidados da cidade inteira
+CITY_WIDE_NEIGHBORHOOD = 'Porto Alegre (Geral)'
+
+
+def _figure_key(figure):
+    """(janela, bairros, tipos) normalizados: o mesmo número citado por duas fontes tem a mesma chave"""
+    bairros = None if figure.get('bairros') is None else tuple(sorted(normalize_text(b) for b in figure['bairros']))
+    tipos = figure.get('tipos') or figure.get('tipos_contem') or []
+    return figure['inicio'], figure['fim'], bairros, tuple(sorted(normalize_text(t) for t in tipos))
+
+
+def collect_figures():
+    """Números oficiais no formato das regras: bairros, tipos, janela e valor esperado
+
+    Um número que aparece nas regras e nos dados da SSP-RS (mesma janela, bairros e
+    tipos) entra uma única vez, na forma da regra, para não pesar em dobro no ajuste.
+    """
+    figures = [
+        {key: rule.get(key) for key in ('id', 'descricao', 'bairros', 'tipos_contem', 'inicio', 'fim', 'esperado', 'fonte')}
+        for rule in VALIDATION_RULES if rule.get('tipo', 'contagem') == 'contagem'
+    ]
+    # Números da SSP-RS acumulados no ano até a data do registro
+    for row in create_updated_data().to_dict(orient='records'):
+        date = pd.Timestamp(row['data'])
+        city_wide = row['bairro'] == CITY_WIDE_NEIGHBORHOOD
+        figures.append({
+            'id': f"{normalize_text(row['bairro'])}_{normalize_text(row['tipo_crime'])}_{date:%Y%m%d}".replace(' ', '_'),
+            'descricao': f"{row['tipo_crime']} - {row['bairro']} (até {date:%d/%m/%Y})",
+            'bairros': None if city_wide else [row['bairro']],
+            'tipos': [row['tipo_crime']],
+            'inicio': f"{date.year}-01-01",
+            'fim': date.strftime('%Y-%m-%d'),
+            'esperado': float(row['quantidade']),
+            'fonte': row['fonte']
+        })
+    unique = {}
+    for figure in figures:
+        unique.setdefault(_figure_key(figure), figure)
+    return list(unique.values())
+
+
+def build_design_matrix(figures, model, municipal_data):
+    """Matriz (número x peso) com os totais municipais de cada tipo na janela de cada número
+
+    Números sem peso correspondente (tipo fora do modelo ou janela sem dados) são descartados.
+    """
+    bairros = [normalize_text(b) for b in model.labels['bairro']]
+    tipos = model.labels['tipo_crime']
+    tipo_keys = [normalize_text(t) for t in tipos]
+    bairro_position = {b: i for i, b in enumerate(bairros)}
+
+    dates = pd.to_datetime(municipal_data['data']).to_numpy()
+    municipal_tipo = municipal_data['tipo_crime'].map({t: i for i, t in enumerate(tipos)}).fillna(-1).to_numpy(dtype=int)
+    quantities = municipal_data['quantidade'].to_numpy(dtype=np.float64)
+
+    rows, used = [], []
+    for figure in figures:
+        window = (dates >= np.datetime64(figure['inicio'])) & (dates <= np.datetime64(figure['fim'])) & (municipal_tipo >= 0)
+        totals = np.bincount(municipal_tipo[window], weights=quantities[window], minlength=len(tipos))
+
+        bairro_mask = np.zeros(len(bairros))
+        if figure.get('bairros') is None:
+            bairro_mask[:] = 1.0
+        else:
+            for name in figure['bairros']:
+                if normalize_text(name) in bairro_position:
+                    bairro_mask[bairro_position[normalize_text(name)]] = 1.0
+        if figure.get('tipos') is not None:
+            wanted = {normalize_text(t) for t in figure['tipos']}
+            tipo_mask = np.array([1.0 if key in wanted else 0.0 for key in tipo_keys])
+        else:
+            patterns = [normalize_text(p) for p in figure.get('tipos_contem') or []]
+            tipo_mask = np.array([1.0 if not patterns or any(p in key for p in patterns) else 0.0 for key in tipo_keys])
+
+        row = np.outer(bairro_mask, tipo_mask * totals).ravel()
+        if row.any():
+            rows.append(row)
+            used.append(figure)
+    matrix = np.array(rows) if rows else np.zeros((0, len(bairros) * len(tipos)))
+    return matrix, used
+
+
+def fit_poisson_weights(matrix, targets, prior, prior_strength=DEFAULT_PRIOR_STRENGTH,
+                        initial=None, max_iterations=DEFAULT_MAX_ITERATIONS, tolerance=DEFAULT_TOLERANCE):
+    """Pesos não negativos por verossimilhança de Poisson com priori, via atualizações multiplicativas
+
+    targets pode ter uma coluna por cenário (ajuste em lote); retorna (pesos, iterações).
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    batched = targets.ndim == 2
+    targets = targets if batched else targets[:, None]
+    prior = np.asarray(prior, dtype=np.float64)[:, None]
+
+    exposure = matrix.sum(axis=0)[:, None]
+    # Força da priori proporcional à informação de cada peso; pesos sem dados ficam na priori
+    strength = prior_strength * np.where(exposure > 0, exposure, 1.0)
+    weights = np.broadcast_to(prior if initial is None else np.asarray(initial, dtype=np.float64).reshape(len(prior), -1),
+                              (len(prior), targets.shape[1])).copy()
+    weights = np.maximum(weights, 1e-12)
+
+    previous = np.inf
+    for iteration in range(1, max_iterations + 1):
+        predicted = np.maximum(matrix @ weights, 1e-300)
+        weights = (weights * (matrix.T @ (targets / predicted)) + strength * prior) / (exposure + strength)
+        predicted = np.maximum(matrix @ weights, 1e-300)
+        loss = float(np.sum(predicted - targets * np.log(predicted)))
+        if abs(previous - loss) <= tolerance * max(1.0, abs(loss)):
+            break
+        previous = loss
+    return (weights if batched else weights[:, 0]), iteration
+
+
+def figure_report(figures, matrix, before, after):
+    """Tabela por número: esperado, previsto antes e depois da calibração"""
+    expected = np.array([f['esperado'] for f in figures], dtype=np.float64)
+    report = pd.DataFrame({
+        'id': [f['id'] for f in figures],
+        'esperado': expected,
+        'antes': matrix @ before,
+        'depois': matrix @ after
+    })
+    report['erro_antes_pct'] = (report['antes'] - expected) / expected * 100
+    report['erro_depois_pct'] = (report['depois'] - expected) / expected * 100
+    return report
+
+
+def calibrate(prior_strength=DEFAULT_PRIOR_STRENGTH, output_dir=CALIBRATED_MODEL_DIR, municipal_data=None):
+    """Executa a calibração e salva o modelo calibrado no formato do modelo compilado"""
+    base_model = CrimeDistributionModel(use_calibrated=False)
+    compiled = load_compiled_distribution_model(base_model.all_neighborhoods)
+    if municipal_data is None:
+        # Mesma amostra que o estágio de distribuição reparte (crime_distribution_model.main)
+        municipal_data = base_model.create_sample_municipal_data(MUNICIPAL_SAMPLE_SEED)
+
+    population = np.asarray(compiled['fator_populacional'], dtype=np.float64)
+    prior = (np.asarray(compiled['pesos_crime'], dtype=np.float64) * population[:, None]).ravel()
+    matrix, figures = build_design_matrix(collect_figures(), compiled, municipal_data)
+    targets = np.array([f['esperado'] for f in figures], dtype=np.float64)
+
+    # Warm start a partir da última calibração com as mesmas dimensões
+    initial = None
+    try:
+        previous = load_model_artifact(output_dir)
+        if previous.labels == compiled.labels:
+            initial = (np.asarray(previous['pesos_crime']) * np.asarray(previous['fator_populacional'])[:, None]).ravel()
+    except (FileNotFoundError, ValueError):
+        pass
+
+    weights, iterations = fit_poisson_weights(matrix, targets, prior, prior_strength, initial)
+    report = figure_report(figures, matrix, prior, weights)
+
+    crime_weights = weights.reshape(len(population), -1) / population[:, None]
+    write_model_artifact(
+        output_dir,
+        {'zona': np.asarray(compiled['zona']), 'fator_populacional': population, 'pesos_crime': crime_weights},
+        compiled.labels,
+        {
+            'fonte_checksum': model_tables_checksum(),
+            'calibrado': True,
+            'forca_priori': prior_strength,
+            'iteracoes': iterations,
+            'warm_start': initial is not None,
+            'figuras': report.round(4).to_dict(orient='records'),
+            'calibrado_em': datetime.now().isoformat()
+        }
+    )
+    return report, iterations
+
+
+def main():
+    """Função principal"""
+    prior_strength = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRIOR_STRENGTH
+    print("🎯 CALIBRAÇÃO DO MODELO DE DISTRIBUIÇÃO")
+    print("=" * 50)
+
+    report, iterations = calibrate(prior_strength)
+    print(f"📊 Números oficiais usados: {len(report)}")
+    print(f"🔁 Iterações: {iterations}")
+    print(report.round(1).to_string(index=False))
+    print(f"\n📉 Erro absoluto médio: {report['erro_antes_pct'].abs().mean():.1f}% -> "
+          f"{report['erro_depois_pct'].abs().mean():.1f}%")
+    print(f"💾 Modelo calibrado salvo em: {CALIBRATED_MODEL_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,225 @@ Aplica modelo baseado na pesquisa UFRGS aos dados municipais
 import pandas as pd
 import numpy as np
 import json
+import hashlib
 from datetime import datetime, timedelta
 import os
 from typing import Dict, List, Tuple
 
+from model_artifact import load_model_artifact, write_model_artifact
+
+# Pasta do modelo compilado (arrays .npy + manifesto), ao lado do JSON do modelo
+COMPILED_MODEL_DIR = "compiled_distribution_model"
+
+# Pasta do modelo calibrado aos números oficiais (calibrate_distribution_model.py)
+CALIBRATED_MODEL_DIR = "calibrated_distribution_model"
+
+# Zona padrão para bairros não mapeados (assume zona norte)
+DEFAULT_ZONE = "Norte"
+
+# Peso de crime para tipos fora da tabela de zonas
+DEFAULT_CRIME_WEIGHT = 0.5
+
+# Semente da amostra municipal simulada: distribuição, calibração e varredura usam a mesma amostra
+MUNICIPAL_SAMPLE_SEED = 0
+
+# População total estimada de Porto Alegre (~1.5M), base dos fatores populacionais
+TOTAL_ESTIMATED_POPULATION = 1500000
+
+# Mapeamento simplificado por zona
+ZONE_MAPPING = {
+    # Centro
+    "Centro": ["Centro Histórico", "Cidade Baixa", "Floresta", "Marcílio Dias", 
+              "Menino Deus", "Praia de Belas", "Santa Cecília", "Azenha"],
+
+    # Norte
+    "Norte": ["Anchieta", "Auxiliadora", "Bom Fim", "Farroupilha", "Higienópolis", 
+             "Independência", "Moinhos de Vento", "Mont'Serrat", "Rio Branco", "Santana",
+             "Jardim Lindóia", "Jardim São Pedro", "Mapa", "Mathias Velho", "Passo d'Areia", 
+             "Petrópolis", "Rubem Berta", "São Geraldo", "São João", "Sarandi", "Vila Ipiranga"],
+
+    # Sul
+    "Sul": ["Aberta dos Morros", "Belém Novo", "Belém Velho", "Campo Novo", "Cavalhada", 
+           "Chapéu do Sol", "Coronel Aparício Borges", "Espírito Santo", "Guarujá", 
+           "Hípica", "Ipanema", "Lageado", "Lami", "Nonoai", "Pedra Redonda", 
+           "Ponta Grossa", "Restinga", "Serraria", "Sétimo Céu", "Tristeza", 
+           "Vila Assunção", "Vila Conceição", "Vila Nova"],
+
+    # Leste
+    "Leste": ["Agronomia", "Bela Vista", "Boa Vista", "Camaquã", "Cascata", "Cristal", 
+             "Glória", "Jardim Botânico", "Jardim do Salso", "Lomba do Pinheiro", 
+             "Mário Quintana", "Medianeira", "Partenon", "Santo Antônio", "São José", 
+             "Três Figueiras", "Vila João Pessoa", "Volta do Guerino"],
+
+    # Oeste
+    "Oeste": ["Arquipélago", "Humaitá", "Ilha da Pintada", "Ilha do Pavão", "Navegantes"]
+}
+
+# Bairro -> zona (primeira zona em que o bairro aparece)
+NEIGHBORHOOD_ZONES = {}
+for _zone, _neighborhoods in ZONE_MAPPING.items():
+    for _neighborhood in _neighborhoods:
+        NEIGHBORHOOD_ZONES.setdefault(_neighborhood, _zone)
+
+# Pesos de crime por zona baseados na pesquisa UFRGS
+ZONE_CRIME_WEIGHTS = {
+    "Norte": {
+        "Homicídio": 0.7,
+        "Roubo": 0.6,
+        "Roubo de veículo": 0.6,
+        "Furto": 0.5,
+        "Lesão corporal": 0.6,
+        "Tráfico de drogas": 0.7,
+        "Ameaça": 0.6
+    },
+    "Centro": {
+        "Homicídio": 0.3,
+        "Roubo": 0.8,
+        "Roubo de veículo": 0.8,
+        "Furto": 0.9,
+        "Lesão corporal": 0.7,
+        "Tráfico de drogas": 0.5,
+        "Ameaça": 0.6
+    },
+    "Sul": {
+        "Homicídio": 0.7,
+        "Roubo": 0.4,
+        "Roubo de veículo": 0.4,
+        "Furto": 0.4,
+        "Lesão corporal": 0.5,
+        "Tráfico de drogas": 0.6,
+        "Ameaça": 0.5
+    },
+    "Leste": {
+        "Homicídio": 0.4,
+        "Roubo": 0.7,
+        "Roubo de veículo": 0.7,
+        "Furto": 0.6,
+        "Lesão corporal": 0.5,
+        "Tráfico de drogas": 0.5,
+        "Ameaça": 0.5
+    },
+    "Oeste": {
+        "Homicídio": 0.5,
+        "Roubo": 0.5,
+        "Roubo de veículo": 0.5,
+        "Furto": 0.5,
+        "Lesão corporal": 0.5,
+        "Tráfico de drogas": 0.5,
+        "Ameaça": 0.5
+    }
+}
+
+# Estimativas baseadas em dados do IBGE e conhecimento local
+POPULATION_ESTIMATES = {
+    # Bairros centrais (alta densidade)
+    "Centro Histórico": 40000,
+    "Cidade Baixa": 12000,
+    "Menino Deus": 35000,
+    "Floresta": 13000,
+    "Santana": 45000,
+    "Azenha": 8000,
+
+    # Bairros nobres (média-alta densidade)
+    "Moinhos de Vento": 25000,
+    "Auxiliadora": 30000,
+    "Bom Fim": 20000,
+    "Independência": 15000,
+    "Higienópolis": 18000,
+    "Mont'Serrat": 12000,
+    "Rio Branco": 10000,
+    "Três Figueiras": 22000,
+    "Jardim Botânico": 8000,
+
+    # Bairros populosos
+    "Restinga": 60000,
+    "Lomba do Pinheiro": 55000,
+    "Partenon": 40000,
+    "Sarandi": 35000,
+    "Rubem Berta": 30000,
+    "Cavalhada": 45000,
+    "Tristeza": 25000,
+    "Ipanema": 20000,
+
+    # Outros bairros (estimativa média)
+    "default": 15000
+}
+
+
+def model_tables_checksum() -> str:
+    """Checksum das tabelas de zonas, pesos e população (detecta artefato desatualizado)"""
+    tables = [ZONE_MAPPING, ZONE_CRIME_WEIGHTS, POPULATION_ESTIMATES,
+              DEFAULT_ZONE, DEFAULT_CRIME_WEIGHT, TOTAL_ESTIMATED_POPULATION]
+    return hashlib.sha256(json.dumps(tables, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def compile_distribution_model(neighborhoods: List[str], output_dir: str = COMPILED_MODEL_DIR) -> str:
+    """Compila zonas, fatores populacionais e a matriz (bairro x tipo) de pesos em arrays"""
+    bairros = sorted(set(neighborhoods) | set(NEIGHBORHOOD_ZONES))
+    zones = list(ZONE_MAPPING)
+    crime_types = list(dict.fromkeys(t for weights in ZONE_CRIME_WEIGHTS.values() for t in weights))
+    
+    zone_of = [NEIGHBORHOOD_ZONES.get(b, DEFAULT_ZONE) for b in bairros]
+    population = [POPULATION_ESTIMATES.get(b, POPULATION_ESTIMATES["default"]) for b in bairros]
+    weights = [[ZONE_CRIME_WEIGHTS.get(z, ZONE_CRIME_WEIGHTS[DEFAULT_ZONE]).get(t, DEFAULT_CRIME_WEIGHT) for t in crime_types]
+               for z in zone_of]
+    
+    arrays = {
+        'zona': np.array([zones.index(z) for z in zone_of], dtype=np.int8),
+        'fator_populacional': np.array(population, dtype=np.float64) / TOTAL_ESTIMATED_POPULATION,
+        'pesos_crime': np.array(weights, dtype=np.float64).reshape(len(bairros), len(crime_types))
+    }
+    metadata = {
+        'fonte_checksum': model_tables_checksum(),
+        'zona_padrao': DEFAULT_ZONE,
+        'peso_padrao': DEFAULT_CRIME_WEIGHT
+    }
+    return write_model_artifact(output_dir, arrays, {'bairro': bairros, 'zona': zones, 'tipo_crime': crime_types}, metadata)
+
+
+def load_compiled_distribution_model(neighborhoods: List[str] = (), output_dir: str = COMPILED_MODEL_DIR):
+    """Abre o modelo compilado, recompilando se faltar, estiver corrompido ou desatualizado"""
+    try:
+        model = load_model_artifact(output_dir)
+        known = set(model.labels['bairro'])
+        if model.metadata.get('fonte_checksum') == model_tables_checksum() and known.issuperset(neighborhoods):
+            return model
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    print(f"🔧 Compilando modelo de distribuição em {output_dir}...")
+    compile_distribution_model(list(neighborhoods), output_dir)
+    return load_model_artifact(output_dir)
+
+
+def load_calibrated_distribution_model(neighborhoods: List[str] = (), output_dir: str = CALIBRATED_MODEL_DIR):
+    """Modelo calibrado, se existir e tiver sido calibrado a partir das tabelas atuais (senão None)"""
+    try:
+        model = load_model_artifact(output_dir)
+    except (FileNotFoundError, ValueError):
+        return None
+    if model.metadata.get('fonte_checksum') != model_tables_checksum() or not set(model.labels['bairro']).issuperset(neighborhoods):
+        return None
+    return model
+
+
+def classify_zones(neighborhoods: pd.Series, model=None) -> pd.Series:
+    """Zona de cada bairro da série, via modelo compilado (zona padrão para desconhecidos)"""
+    model = model or load_compiled_distribution_model()
+    position = pd.Index(model.labels['bairro']).get_indexer(neighborhoods)
+    zones = np.asarray(model.labels['zona'], dtype=object)[model['zona'][np.maximum(position, 0)]]
+    return pd.Series(np.where(position >= 0, zones, DEFAULT_ZONE), index=neighborhoods.index)
+
+
 class CrimeDistributionModel:
-    def __init__(self, model_file="ufrgs_distribution_model.json"):
+    def __init__(self, model_file="ufrgs_distribution_model.json", use_calibrated=True):
         self.model_file = model_file
         self.distribution_model = self.load_distribution_model()
         self.all_neighborhoods = self.get_all_poa_neighborhoods()
+        self.compiled_model = load_calibrated_distribution_model(self.all_neighborhoods) if use_calibrated else None
+        if self.compiled_model is not None:
+            print(f"🎯 Usando pesos calibrados de {CALIBRATED_MODEL_DIR}")
+        else:
+            self.compiled_model = load_compiled_distribution_model(self.all_neighborhoods)
         
     def load_distribution_model(self):
         """Carrega o modelo de distribuição criado"""
@@ -93,176 +303,58 @@ class CrimeDistributionModel:
     
     def classify_neighborhood_by_zone(self, neighborhood: str) -> str:
         """Classifica bairro por zona geográfica"""
-        # Mapeamento simplificado por zona
-        zone_mapping = {
-            # Centro
-            "Centro": ["Centro Histórico", "Cidade Baixa", "Floresta", "Marcílio Dias", 
-                      "Menino Deus", "Praia de Belas", "Santa Cecília", "Azenha"],
-            
-            # Norte
-            "Norte": ["Anchieta", "Auxiliadora", "Bom Fim", "Farroupilha", "Higienópolis", 
-                     "Independência", "Moinhos de Vento", "Mont'Serrat", "Rio Branco", "Santana",
-                     "Jardim Lindóia", "Jardim São Pedro", "Mapa", "Mathias Velho", "Passo d'Areia", 
-                     "Petrópolis", "Rubem Berta", "São Geraldo", "São João", "Sarandi", "Vila Ipiranga"],
-            
-            # Sul
-            "Sul": ["Aberta dos Morros", "Belém Novo", "Belém Velho", "Campo Novo", "Cavalhada", 
-                   "Chapéu do Sol", "Coronel Aparício Borges", "Espírito Santo", "Guarujá", 
-                   "Hípica", "Ipanema", "Lageado", "Lami", "Nonoai", "Pedra Redonda", 
-                   "Ponta Grossa", "Restinga", "Serraria", "Sétimo Céu", "Tristeza", 
-                   "Vila Assunção", "Vila Conceição", "Vila Nova"],
-            
-            # Leste
-            "Leste": ["Agronomia", "Bela Vista", "Boa Vista", "Camaquã", "Cascata", "Cristal", 
-                     "Glória", "Jardim Botânico", "Jardim do Salso", "Lomba do Pinheiro", 
-                     "Mário Quintana", "Medianeira", "Partenon", "Santo Antônio", "São José", 
-                     "Três Figueiras", "Vila João Pessoa", "Volta do Guerino"],
-            
-            # Oeste
-            "Oeste": ["Arquipélago", "Humaitá", "Ilha da Pintada", "Ilha do Pavão", "Navegantes"]
-        }
-        
-        for zone, neighborhoods in zone_mapping.items():
-            if neighborhood in neighborhoods:
-                return zone
-        
-        # Default para bairros não mapeados
-        return "Norte"  # Assume zona norte como padrão
+        return NEIGHBORHOOD_ZONES.get(neighborhood, DEFAULT_ZONE)
     
     def get_crime_weights_by_zone(self, zone: str) -> Dict[str, float]:
         """Retorna pesos de crime por zona baseados na pesquisa UFRGS"""
-        zone_weights = {
-            "Norte": {
-                "Homicídio": 0.7,
-                "Roubo": 0.6,
-                "Roubo de veículo": 0.6,
-                "Furto": 0.5,
-                "Lesão corporal": 0.6,
-                "Tráfico de drogas": 0.7,
-                "Ameaça": 0.6
-            },
-            "Centro": {
-                "Homicídio": 0.3,
-                "Roubo": 0.8,
-                "Roubo de veículo": 0.8,
-                "Furto": 0.9,
-                "Lesão corporal": 0.7,
-                "Tráfico de drogas": 0.5,
-                "Ameaça": 0.6
-            },
-            "Sul": {
-                "Homicídio": 0.7,
-                "Roubo": 0.4,
-                "Roubo de veículo": 0.4,
-                "Furto": 0.4,
-                "Lesão corporal": 0.5,
-                "Tráfico de drogas": 0.6,
-                "Ameaça": 0.5
-            },
-            "Leste": {
-                "Homicídio": 0.4,
-                "Roubo": 0.7,
-                "Roubo de veículo": 0.7,
-                "Furto": 0.6,
-                "Lesão corporal": 0.5,
-                "Tráfico de drogas": 0.5,
-                "Ameaça": 0.5
-            },
-            "Oeste": {
-                "Homicídio": 0.5,
-                "Roubo": 0.5,
-                "Roubo de veículo": 0.5,
-                "Furto": 0.5,
-                "Lesão corporal": 0.5,
-                "Tráfico de drogas": 0.5,
-                "Ameaça": 0.5
-            }
-        }
-        
-        return zone_weights.get(zone, zone_weights["Norte"])
+        return ZONE_CRIME_WEIGHTS.get(zone, ZONE_CRIME_WEIGHTS[DEFAULT_ZONE])
     
     def estimate_population_factor(self, neighborhood: str) -> float:
         """Estima fator populacional do bairro"""
-        # Estimativas baseadas em dados do IBGE e conhecimento local
-        population_estimates = {
-            # Bairros centrais (alta densidade)
-            "Centro Histórico": 40000,
-            "Cidade Baixa": 12000,
-            "Menino Deus": 35000,
-            "Floresta": 13000,
-            "Santana": 45000,
-            "Azenha": 8000,
-            
-            # Bairros nobres (média-alta densidade)
-            "Moinhos de Vento": 25000,
-            "Auxiliadora": 30000,
-            "Bom Fim": 20000,
-            "Independência": 15000,
-            "Higienópolis": 18000,
-            "Mont'Serrat": 12000,
-            "Rio Branco": 10000,
-            "Três Figueiras": 22000,
-            "Jardim Botânico": 8000,
-            
-            # Bairros populosos
-            "Restinga": 60000,
-            "Lomba do Pinheiro": 55000,
-            "Partenon": 40000,
-            "Sarandi": 35000,
-            "Rubem Berta": 30000,
-            "Cavalhada": 45000,
-            "Tristeza": 25000,
-            "Ipanema": 20000,
-            
-            # Outros bairros (estimativa média)
-            "default": 15000
-        }
-        
-        population = population_estimates.get(neighborhood, population_estimates["default"])
+        population = POPULATION_ESTIMATES.get(neighborhood, POPULATION_ESTIMATES["default"])
         
         # Calcular fator proporcional (assumindo população total de ~1.5M)
-        total_estimated_population = 1500000
-        return population / total_estimated_population
+        return population / TOTAL_ESTIMATED_POPULATION
     
     def distribute_municipal_crimes(self, municipal_data: pd.DataFrame) -> pd.DataFrame:
         """Distribui crimes municipais por bairros usando o modelo"""
-        distributed_data = []
+        if municipal_data.empty:
+            return pd.DataFrame()
+        model = self.compiled_model
         
-        for _, row in municipal_data.iterrows():
-            crime_type = row['tipo_crime']
-            total_crimes = row['quantidade']
-            date = row['data']
-            
-            # Distribuir por todos os bairros
-            for neighborhood in self.all_neighborhoods:
-                zone = self.classify_neighborhood_by_zone(neighborhood)
-                crime_weights = self.get_crime_weights_by_zone(zone)
-                population_factor = self.estimate_population_factor(neighborhood)
-                
-                # Calcular peso final
-                crime_weight = crime_weights.get(crime_type, 0.5)
-                final_weight = crime_weight * population_factor
-                
-                # Calcular quantidade distribuída
-                distributed_crimes = int(total_crimes * final_weight)
-                
-                if distributed_crimes > 0:
-                    distributed_data.append({
-                        'data': date,
-                        'bairro': neighborhood,
-                        'tipo_crime': crime_type,
-                        'quantidade': distributed_crimes,
-                        'zona': zone,
-                        'fonte': 'SSP-RS (distribuído)',
-                        'peso_crime': crime_weight,
-                        'fator_populacional': population_factor,
-                        'peso_final': final_weight
-                    })
+        # Linhas do modelo compilado para cada bairro distribuído (na ordem da lista)
+        bairro_index = np.array([model.index('bairro', n) for n in self.all_neighborhoods])
+        zones = np.asarray(model.labels['zona'], dtype=object)[model['zona'][bairro_index]]
+        population_factor = model['fator_populacional'][bairro_index]
+        
+        # Matriz (registro municipal x bairro) de pesos; tipos fora da tabela usam o peso padrão
+        tipo_index = np.array([model.index('tipo_crime', t) for t in municipal_data['tipo_crime']])
+        weights = model['pesos_crime'][bairro_index][:, np.maximum(tipo_index, 0)].T
+        crime_weight = np.where(tipo_index[:, None] >= 0, weights, DEFAULT_CRIME_WEIGHT)
+        final_weight = crime_weight * population_factor
+        
+        # Calcular quantidade distribuída (truncada, como int())
+        totals = municipal_data['quantidade'].to_numpy(dtype=np.float64)[:, None]
+        distributed_crimes = np.trunc(totals * final_weight).astype(np.int64)
+        rows, columns = np.nonzero(distributed_crimes > 0)
+        if len(rows) == 0:
+            return pd.DataFrame()
         
-        return pd.DataFrame(distributed_data)
+        return pd.DataFrame({
+            'data': municipal_data['data'].to_numpy()[rows],
+            'bairro': np.asarray(self.all_neighborhoods, dtype=object)[columns],
+            'tipo_crime': municipal_data['tipo_crime'].to_numpy()[rows],
+            'quantidade': distributed_crimes[rows, columns],
+            'zona': zones[columns],
+            'fonte': 'SSP-RS (distribuído)',
+            'peso_crime': crime_weight[rows, columns],
+            'fator_populacional': population_factor[columns],
+            'peso_final': final_weight[rows, columns]
+        })
     
-    def create_sample_municipal_data(self) -> pd.DataFrame:
-        """Cria dados municipais de exemplo para teste"""
+    def create_sample_municipal_data(self, seed=MUNICIPAL_SAMPLE_SEED) -> pd.DataFrame:
+        """Cria dados municipais de exemplo para teste (mesma amostra para a mesma semente)"""
+        rng = np.random.RandomState(seed)
         # Dados de exemplo baseados em padrões típicos
         sample_data = []
         
@@ -290,7 +382,7 @@ class CrimeDistributionModel:
                 elif current_date.month in [6, 7, 8]:  # Inverno - menos crimes
                     month_factor = 0.8
                 
-                base_crimes = np.random.randint(ranges["min"], ranges["max"])
+                base_crimes = rng.randint(ranges["min"], ranges["max"])
                 monthly_crimes = int(base_crimes * month_factor)
                 
                 sample_data.append({
@@ -18,6 +18,77 @@ from datetime import datetime, timedelta
 import random
 import os
 
+# Mapeamento baseado na localização geográfica conhecida
+ZONAS = {
+    'Norte': [
+        'Anchieta', 'Auxiliadora', 'Bom Jesus', 'Farrapos', 'Floresta', 'Higienópolis',
+        'Humaitá', 'Jardim Botânico', 'Jardim Itu', 'Jardim Lindóia', 'Jardim São Pedro',
+        'Mário Quintana', 'Navegantes', 'Passo da Areia', 'Rio Branco', 'Rubem Berta',
+        'Santa Maria Goretti', 'Santa Rosa de Lima', 'Santa Tereza', 'São Geraldo',
+        'São João', 'Sarandi', 'Vila Ipiranga', 'Vila dos Comerciários', 'Vila Farrapos'
+    ],
+    'Sul': [
+        'Aberta dos Morros', 'Belém Novo', 'Belém Velho', 'Campo Novo', 'Camaquã',
+        'Cavalhada', 'Chapéu do Sol', 'Cristal', 'Espírito Santo', 'Guarujá',
+        'Hípica', 'Ipanema', 'Lageado', 'Lami', 'Lomba do Pinheiro', 'Nonoai',
+        'Pedra Redonda', 'Ponta Grossa', 'Restinga', 'Serraria', 'Teresópolis',
+        'Tristeza', 'Vila Assunção', 'Vila Conceição', 'Vila Nova', 'Boa Vista do Sul'
+    ],
+    'Leste': [
+        'Agronomia', 'Bela Vista', 'Boa Vista', 'Bom Fim', 'Coronel Aparício Borges',
+        'Farroupilha', 'Jardim Carvalho', 'Jardim do Salso', 'Jardim Europa',
+        'Moinhos de Vento', 'Mont\'Serrat', 'Partenon', 'Petrópolis', 'Santana',
+        'São Sebastião', 'Três Figueiras', 'Vila Jardim', 'Alto Petrópolis'
+    ],
+    'Oeste': [
+        'Arquipélago', 'Chácara das Pedras', 'Extrema', 'Glória', 'Ilha da Pintada',
+        'Ilha do Pavão', 'Jardim Isabel', 'Menino Deus', 'Passo das Pedras',
+        'Protásio Alves', 'Vila Berta', 'Chácara do Banco', 'Dois Irmãos'
+    ],
+    'Centro': [
+        'Azenha', 'Centro Histórico', 'Cidade Baixa', 'Independência',
+        'Marcílio Dias', 'Praia de Belas', 'Floresta'
+    ]
+}
+
+# Fatores baseados em conhecimento geral dos bairros
+FATORES_ESPECIAIS = {
+    'Centro Histórico': 2.5,  # Alto fluxo de pessoas
+    'Cidade Baixa': 1.8,      # Área universitária e boêmia
+    'Moinhos de Vento': 1.5,  # Área comercial
+    'Bom Fim': 1.6,           # Área universitária
+    'Restinga': 2.0,          # Grande população
+    'Rubem Berta': 1.8,       # Grande população
+    'Sarandi': 1.7,           # Grande população
+    'Lomba do Pinheiro': 1.6, # Grande população
+    'Partenon': 1.4,          # População média-alta
+    'Vila Jardim': 1.3,       # População média
+}
+
+# Fatores por zona
+FATORES_ZONA = {
+    'Centro': 1.5,
+    'Norte': 1.2,
+    'Sul': 1.0,
+    'Leste': 1.1,
+    'Oeste': 0.9
+}
+
+# Pesos médios de cada tipo de crime por zona, baseados no modelo UFRGS
+ZONE_CRIME_WEIGHTS = {
+    'Centro': {'Homicídio': 0.05, 'Roubo': 0.15, 'Roubo de veículo': 0.15, 'Furto': 0.20, 'Lesão corporal': 0.15, 'Ameaça': 0.10, 'Tráfico de drogas': 0.05, 'Sequestro': 0.02, 'Estelionato': 0.03, 'Extorsão': 0.02, 'Outros': 0.08},
+    'Norte': {'Homicídio': 0.08, 'Roubo': 0.12, 'Roubo de veículo': 0.18, 'Furto': 0.15, 'Lesão corporal': 0.20, 'Ameaça': 0.12, 'Tráfico de drogas': 0.08, 'Sequestro': 0.01, 'Estelionato': 0.02, 'Extorsão': 0.01, 'Outros': 0.03},
+    'Sul': {'Homicídio': 0.06, 'Roubo': 0.10, 'Roubo de veículo': 0.15, 'Furto': 0.18, 'Lesão corporal': 0.18, 'Ameaça': 0.15, 'Tráfico de drogas': 0.06, 'Sequestro': 0.01, 'Estelionato': 0.03, 'Extorsão': 0.02, 'Outros': 0.06},
+    'Leste': {'Homicídio': 0.04, 'Roubo': 0.14, 'Roubo de veículo': 0.16, 'Furto': 0.22, 'Lesão corporal': 0.16, 'Ameaça': 0.12, 'Tráfico de drogas': 0.04, 'Sequestro': 0.01, 'Estelionato': 0.04, 'Extorsão': 0.02, 'Outros': 0.05},
+    'Oeste': {'Homicídio': 0.03, 'Roubo': 0.12, 'Roubo de veículo': 0.14, 'Furto': 0.20, 'Lesão corporal': 0.18, 'Ameaça': 0.14, 'Tráfico de drogas': 0.05, 'Sequestro': 0.01, 'Estelionato': 0.05, 'Extorsão': 0.02, 'Outros': 0.06}
+}
+
+# Fração da média de crimes por bairro atual usada como base de um bairro faltante
+BASE_BAIRROS_FALTANTES = 0.7
+
+# Tipos gerados para bairros faltantes mesmo quando ausentes dos dados atuais
+TIPOS_SEMPRE_GERADOS = ['Ameaça', 'Tráfico de drogas', 'Sequestro', 'Estelionato', 'Extorsão', 'Outros']
+
 def load_official_neighborhoods():
     """
     Carrega a lista oficial dos 94 bairros de Porto Alegre.
@@ -109,40 +180,7 @@ def classify_neighborhood_zone(bairro):
     """
     Classifica um bairro por zona geográfica.
     """
-    # Mapeamento baseado na localização geográfica conhecida
-    zonas = {
-        'Norte': [
-            'Anchieta', 'Auxiliadora', 'Bom Jesus', 'Farrapos', 'Floresta', 'Higienópolis',
-            'Humaitá', 'Jardim Botânico', 'Jardim Itu', 'Jardim Lindóia', 'Jardim São Pedro',
-            'Mário Quintana', 'Navegantes', 'Passo da Areia', 'Rio Branco', 'Rubem Berta',
-            'Santa Maria Goretti', 'Santa Rosa de Lima', 'Santa Tereza', 'São Geraldo',
-            'São João', 'Sarandi', 'Vila Ipiranga', 'Vila dos Comerciários', 'Vila Farrapos'
-        ],
-        'Sul': [
-            'Aberta dos Morros', 'Belém Novo', 'Belém Velho', 'Campo Novo', 'Camaquã',
-            'Cavalhada', 'Chapéu do Sol', 'Cristal', 'Espírito Santo', 'Guarujá',
-            'Hípica', 'Ipanema', 'Lageado', 'Lami', 'Lomba do Pinheiro', 'Nonoai',
-            'Pedra Redonda', 'Ponta Grossa', 'Restinga', 'Serraria', 'Teresópolis',
-            'Tristeza', 'Vila Assunção', 'Vila Conceição', 'Vila Nova', 'Boa Vista do Sul'
-        ],
-        'Leste': [
-            'Agronomia', 'Bela Vista', 'Boa Vista', 'Bom Fim', 'Coronel Aparício Borges',
-            'Farroupilha', 'Jardim Carvalho', 'Jardim do Salso', 'Jardim Europa',
-            'Moinhos de Vento', 'Mont\'Serrat', 'Partenon', 'Petrópolis', 'Santana',
-            'São Sebastião', 'Três Figueiras', 'Vila Jardim', 'Alto Petrópolis'
-        ],
-        'Oeste': [
-            'Arquipélago', 'Chácara das Pedras', 'Extrema', 'Glória', 'Ilha da Pintada',
-            'Ilha do Pavão', 'Jardim Isabel', 'Menino Deus', 'Passo das Pedras',
-            'Protásio Alves', 'Vila Berta', 'Chácara do Banco', 'Dois Irmãos'
-        ],
-        'Centro': [
-            'Azenha', 'Centro Histórico', 'Cidade Baixa', 'Independência',
-            'Marcílio Dias', 'Praia de Belas', 'Floresta'
-        ]
-    }
-    
-    for zona, bairros in zonas.items():
+    for zona, bairros in ZONAS.items():
         if bairro in bairros:
             return zona
     
@@ -158,33 +196,10 @@ def estimate_population_factor(bairro, zona):
     """
     Estima fator populacional para um bairro.
     """
-    # Fatores baseados em conhecimento geral dos bairros
-    fatores_especiais = {
-        'Centro Histórico': 2.5,  # Alto fluxo de pessoas
-        'Cidade Baixa': 1.8,      # Área universitária e boêmia
-        'Moinhos de Vento': 1.5,  # Área comercial
-        'Bom Fim': 1.6,           # Área universitária
-        'Restinga': 2.0,          # Grande população
-        'Rubem Berta': 1.8,       # Grande população
-        'Sarandi': 1.7,           # Grande população
-        'Lomba do Pinheiro': 1.6, # Grande população
-        'Partenon': 1.4,          # População média-alta
-        'Vila Jardim': 1.3,       # População média
-    }
-    
-    if bairro in fatores_especiais:
-        return fatores_especiais[bairro]
+    if bairro in FATORES_ESPECIAIS:
+        return FATORES_ESPECIAIS[bairro]
     
-    # Fatores por zona
-    fatores_zona = {
-        'Centro': 1.5,
-        'Norte': 1.2,
-        'Sul': 1.0,
-        'Leste': 1.1,
-        'Oeste': 0.9
-    }
-    
-    return fatores_zona.get(zona, 1.0)
+    return FATORES_ZONA.get(zona, 1.0)
 
 def generate_missing_neighborhoods_data(current_df, model, official_neighborhoods):
     """
@@ -221,22 +236,13 @@ def generate_missing_neighborhoods_data(current_df, model, official_neighborhood
         pop_factor = estimate_population_factor(bairro, zona)
         
         # Calcular número de crimes para este bairro
-        base_crimes = int(avg_crimes_per_neighborhood * pop_factor * 0.7)  # 70% da média
-        
-        # Distribuir crimes por tipo baseado no modelo UFRGS
-        # Usar pesos médios por zona baseados no modelo
-        zone_crime_weights = {
-            'Centro': {'Homicídio': 0.05, 'Roubo': 0.15, 'Roubo de veículo': 0.15, 'Furto': 0.20, 'Lesão corporal': 0.15, 'Ameaça': 0.10, 'Tráfico de drogas': 0.05, 'Sequestro': 0.02, 'Estelionato': 0.03, 'Extorsão': 0.02, 'Outros': 0.08},
-            'Norte': {'Homicídio': 0.08, 'Roubo': 0.12, 'Roubo de veículo': 0.18, 'Furto': 0.15, 'Lesão corporal': 0.20, 'Ameaça': 0.12, 'Tráfico de drogas': 0.08, 'Sequestro': 0.01, 'Estelionato': 0.02, 'Extorsão': 0.01, 'Outros': 0.03},
-            'Sul': {'Homicídio': 0.06, 'Roubo': 0.10, 'Roubo de veículo': 0.15, 'Furto': 0.18, 'Lesão corporal': 0.18, 'Ameaça': 0.15, 'Tráfico de drogas': 0.06, 'Sequestro': 0.01, 'Estelionato': 0.03, 'Extorsão': 0.02, 'Outros': 0.06},
-            'Leste': {'Homicídio': 0.04, 'Roubo': 0.14, 'Roubo de veículo': 0.16, 'Furto': 0.22, 'Lesão corporal': 0.16, 'Ameaça': 0.12, 'Tráfico de drogas': 0.04, 'Sequestro': 0.01, 'Estelionato': 0.04, 'Extorsão': 0.02, 'Outros': 0.05},
-            'Oeste': {'Homicídio': 0.03, 'Roubo': 0.12, 'Roubo de veículo': 0.14, 'Furto': 0.20, 'Lesão corporal': 0.18, 'Ameaça': 0.14, 'Tráfico de drogas': 0.05, 'Sequestro': 0.01, 'Estelionato': 0.05, 'Extorsão': 0.02, 'Outros': 0.06}
-        }
+        base_crimes = int(avg_crimes_per_neighborhood * pop_factor * BASE_BAIRROS_FALTANTES)
         
-        weights = zone_crime_weights.get(zona, zone_crime_weights['Leste'])
+        # Distribuir crimes por tipo baseado no modelo UFRGS (pesos médios por zona)
+        weights = ZONE_CRIME_WEIGHTS.get(zona, ZONE_CRIME_WEIGHTS['Leste'])
         
         for crime_type, weight in weights.items():
-            if crime_type in crime_types.index or crime_type in ['Ameaça', 'Tráfico de drogas', 'Sequestro', 'Estelionato', 'Extorsão', 'Outros']:
+            if crime_type in crime_types.index or crime_type in TIPOS_SEMPRE_GERADOS:
                 # Número de crimes deste tipo para este bairro
                 num_crimes = max(1, int(base_crimes * weight * random.uniform(0.5, 1.5)))
                 
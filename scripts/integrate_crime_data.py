@@ -3,14 +3,201 @@
 """
 Integração de Dados de Criminalidade
 Integra dados distribuídos com dataset atual do projeto
+
+Modo em blocos (--chunksize N): processa as entradas em blocos de tamanho
+limitado, grava partes ordenadas em disco e faz a ordenação final por
+intercalação externa (heapq.merge), acumulando as estatísticas de validação
+em uma única passada. Permite cargas de vários anos em máquinas pequenas.
 """
 
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import sys
+import csv
 import json
-from typing import Dict, List, Tuple
+import heapq
+import shutil
+import tempfile
+from collections import Counter
+from itertools import groupby
+from typing import Dict, Iterator, List, Tuple
+
+from crime_distribution_model import DEFAULT_ZONE, NEIGHBORHOOD_ZONES, classify_zones
+
+AGGREGATION_KEYS = ['data', 'bairro', 'tipo_crime', 'zona', 'fonte']
+COMMON_COLUMNS = ['data', 'bairro', 'tipo_crime', 'quantidade', 'zona', 'fonte']
+SORT_COLUMNS = ['data', 'bairro', 'tipo_crime']
+DEFAULT_CHUNK_SIZE = 100000
+
+# Colunas das partes agregadas parciais (uma linha por grupo x período do dia)
+PARTIAL_COLUMNS = AGGREGATION_KEYS + ['periodo_dia', 'quantidade', 'lat_soma', 'lat_n', 'lon_soma', 'lon_n', 'n']
+
+
+def aggregate_groups(df: pd.DataFrame, keys: List[str], sum_columns: List[str] = (),
+                     mean_columns: List[str] = (), mode_columns: List[str] = ()) -> pd.DataFrame:
+    """
+    Agregação vetorizada por grupo: somas, médias e modas de todos os grupos de uma vez.
+    
+    As chaves viram códigos inteiros (factorize ordenado) combinados em um único
+    código por grupo; somas e médias saem de np.bincount e a moda do argmax de
+    uma matriz (grupo x categoria). Resultado equivalente a
+    groupby(keys).agg(sum / mean / lambda x: x.mode().iloc[0]), na mesma ordem.
+    """
+    n = len(df)
+    codes, cardinalities, uniques, valid = [], [], [], np.ones(n, dtype=bool)
+    for key in keys:
+        key_codes, key_uniques = pd.factorize(df[key], sort=True)
+        valid &= key_codes >= 0          # chaves nulas são descartadas, como no groupby
+        codes.append(key_codes)
+        cardinalities.append(max(len(key_uniques), 1))
+        uniques.append(key_uniques)
+    
+    # Código combinado em base mista preserva a ordem lexicográfica das chaves
+    if np.prod([float(c) for c in cardinalities]) < 2 ** 62:
+        packed = np.zeros(n, dtype=np.int64)
+        for key_codes, cardinality in zip(codes, cardinalities):
+            packed = packed * cardinality + key_codes
+        group_codes, group = np.unique(packed[valid], return_inverse=True)
+        key_codes = np.array(np.unravel_index(group_codes, cardinalities)) if len(keys) else np.empty((0, 0))
+    else:
+        stacked = np.column_stack(codes)[valid]
+        group_rows, group = np.unique(stacked, axis=0, return_inverse=True)
+        key_codes = group_rows.T
+    group = group.ravel()
+    n_groups = int(group.max()) + 1 if len(group) else 0
+    
+    result = pd.DataFrame({key: uniques[i].take(key_codes[i]) for i, key in enumerate(keys)})
+    
+    for column in sum_columns:
+        values = df[column].to_numpy()[valid]
+        totals = np.bincount(group, weights=np.nan_to_num(values.astype(np.float64)), minlength=n_groups)
+        result[column] = totals.astype(values.dtype) if np.issubdtype(values.dtype, np.integer) else totals
+    
+    for column in mean_columns:
+        values = df[column].to_numpy(dtype=np.float64)[valid]
+        present = ~np.isnan(values)
+        totals = np.bincount(group[present], weights=values[present], minlength=n_groups)
+        counts = np.bincount(group[present], minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[column] = np.where(counts > 0, totals / counts, np.nan)
+    
+    for column in mode_columns:
+        categories, labels = pd.factorize(df[column].to_numpy()[valid], sort=True)
+        present = categories >= 0
+        n_labels = max(len(labels), 1)
+        matrix = np.bincount(group[present] * n_labels + categories[present],
+                             minlength=n_groups * n_labels).reshape(n_groups, n_labels)
+        # argmax devolve a primeira categoria empatada = a menor, como mode().iloc[0]
+        best = matrix.argmax(axis=1)
+        modes = pd.Series(np.asarray(labels, dtype=object)[best] if len(labels) else [None] * n_groups, dtype=object)
+        result[column] = modes.where(matrix.max(axis=1) > 0, None).to_numpy()
+    
+    return result
+
+
+class MonthNeighborhoodKeys:
+    """Chaves (bairro, ano-mês) empacotadas em int64 para anti-join entre fontes
+    
+    O bairro vira um código estável (vocabulário compartilhado entre blocos) nos
+    32 bits altos e o mês, contado desde 1970, nos 32 bits baixos. A checagem de
+    sobreposição é uma busca binária nas chaves ordenadas (searchsorted).
+    """
+
+    def __init__(self):
+        self._bairro_codes = {}
+        self._pending = []
+        self._keys = np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def _months(dates: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        months = pd.to_datetime(dates, errors='coerce').to_numpy(dtype='datetime64[M]')
+        return months.astype(np.int64), ~np.isnat(months)
+
+    def _pack(self, bairro_codes: np.ndarray, months: np.ndarray) -> np.ndarray:
+        return (bairro_codes.astype(np.int64) << 32) | (months & 0xFFFFFFFF)
+
+    def add(self, df: pd.DataFrame):
+        """Registra as chaves presentes em um bloco de dados atuais"""
+        for bairro in df['bairro'].dropna().unique():
+            self._bairro_codes.setdefault(bairro, len(self._bairro_codes))
+        codes = df['bairro'].map(self._bairro_codes)
+        months, valid = self._months(df['data'])
+        valid &= codes.notna().to_numpy()
+        self._pending.append(self._pack(codes.to_numpy()[valid], months[valid]))
+
+    @property
+    def keys(self) -> np.ndarray:
+        if self._pending:
+            self._keys = np.unique(np.concatenate([self._keys] + self._pending))
+            self._pending = []
+        return self._keys
+
+    @property
+    def neighborhood_count(self) -> int:
+        return len(self._bairro_codes)
+
+    @property
+    def month_count(self) -> int:
+        return len(np.unique(self.keys & 0xFFFFFFFF))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def contains(self, df: pd.DataFrame) -> np.ndarray:
+        """Máscara das linhas cujo (bairro, mês) já existe nas chaves registradas"""
+        keys = self.keys
+        codes = df['bairro'].map(self._bairro_codes)
+        months, valid = self._months(df['data'])
+        valid &= codes.notna().to_numpy()
+        found = np.zeros(len(df), dtype=bool)
+        if len(keys) and valid.any():
+            packed = self._pack(codes.to_numpy()[valid], months[valid])
+            position = np.minimum(np.searchsorted(keys, packed), len(keys) - 1)
+            found[valid] = keys[position] == packed
+        return found
+
+
+class IntegrationStatsAccumulator:
+    """Acumula as estatísticas de validate_integration em uma única passada"""
+
+    def __init__(self):
+        self.total_records = 0
+        self.neighborhoods = set()
+        self.crime_types = Counter()
+        self.sources = Counter()
+        self.zones = Counter()
+        self.start = None
+        self.end = None
+
+    def add(self, row: Dict):
+        self.total_records += 1
+        if row.get('bairro'):
+            self.neighborhoods.add(row['bairro'])
+        if row.get('tipo_crime'):
+            self.crime_types[row['tipo_crime']] += 1
+        if row.get('fonte'):
+            self.sources[row['fonte']] += 1
+        if row.get('zona'):
+            self.zones[row['zona']] += 1
+        date = row.get('data')
+        if date:
+            self.start = date if self.start is None or date < self.start else self.start
+            self.end = date if self.end is None or date > self.end else self.end
+
+    def result(self) -> Dict:
+        if self.total_records == 0:
+            return {"error": "Dataset integrado está vazio"}
+        return {
+            "total_records": self.total_records,
+            "unique_neighborhoods": len(self.neighborhoods),
+            "unique_crime_types": len(self.crime_types),
+            "date_range": {"start": self.start, "end": self.end},
+            "sources": dict(self.sources.most_common()),
+            "zones": dict(self.zones.most_common()),
+            "crime_types": dict(self.crime_types.most_common())
+        }
 
 class CrimeDataIntegrator:
     def __init__(self):
@@ -86,39 +273,20 @@ class CrimeDataIntegrator:
         standardized['fonte'] = 'Dataset Original'
         
         # Zona (classificar)
-        standardized['zona'] = standardized['bairro'].apply(self.classify_neighborhood_zone)
+        standardized['zona'] = classify_zones(standardized['bairro'])
         
         print(f"📊 Dados atuais padronizados: {len(standardized)} registros")
         return standardized
     
     def classify_neighborhood_zone(self, neighborhood: str) -> str:
         """Classifica bairro por zona geográfica"""
-        zone_mapping = {
-            "Centro": ["Centro Histórico", "Cidade Baixa", "Floresta", "Marcílio Dias", 
-                      "Menino Deus", "Praia de Belas", "Santa Cecília", "Azenha"],
-            "Norte": ["Anchieta", "Auxiliadora", "Bom Fim", "Farroupilha", "Higienópolis", 
-                     "Independência", "Moinhos de Vento", "Mont'Serrat", "Rio Branco", "Santana",
-                     "Jardim Lindóia", "Jardim São Pedro", "Mapa", "Mathias Velho", "Passo d'Areia", 
-                     "Petrópolis", "Rubem Berta", "São Geraldo", "São João", "Sarandi", "Vila Ipiranga"],
-            "Sul": ["Aberta dos Morros", "Belém Novo", "Belém Velho", "Campo Novo", "Cavalhada", 
-                   "Chapéu do Sol", "Coronel Aparício Borges", "Espírito Santo", "Guarujá", 
-                   "Hípica", "Ipanema", "Lageado", "Lami", "Nonoai", "Pedra Redonda", 
-                   "Ponta Grossa", "Restinga", "Serraria", "Sétimo Céu", "Tristeza", 
-                   "Vila Assunção", "Vila Conceição", "Vila Nova"],
-            "Leste": ["Agronomia", "Bela Vista", "Boa Vista", "Camaquã", "Cascata", "Cristal", 
-                     "Glória", "Jardim Botânico", "Jardim do Salso", "Lomba do Pinheiro", 
-                     "Mário Quintana", "Medianeira", "Partenon", "Santo Antônio", "São José", 
-                     "Três Figueiras", "Vila João Pessoa", "Volta do Guerino"],
-            "Oeste": ["Arquipélago", "Humaitá", "Ilha da Pintada", "Ilha do Pavão", "Navegantes"]
-        }
-        
-        for zone, neighborhoods in zone_mapping.items():
-            if neighborhood in neighborhoods:
-                return zone
-        return "Norte"  # Default
+        return NEIGHBORHOOD_ZONES.get(neighborhood, DEFAULT_ZONE)
     
     def standardize_crime_types(self, df: pd.DataFrame) -> pd.DataFrame:
         """Padroniza tipos de crimes"""
+        if df.empty:
+            return df
+        
         crime_mapping = {
             # Mapeamento de crimes do dataset atual para tipos padronizados
             "ROUBO A TRANSEUNTE": "Roubo",
@@ -151,13 +319,14 @@ class CrimeDataIntegrator:
         if df.empty:
             return df
         
-        # Agrupar por data, bairro e tipo de crime
-        aggregated = df.groupby(['data', 'bairro', 'tipo_crime', 'zona', 'fonte']).agg({
-            'quantidade': 'sum',
-            'latitude': 'mean',
-            'longitude': 'mean',
-            'periodo_dia': lambda x: x.mode().iloc[0] if not x.empty else None
-        }).reset_index()
+        # Agrupar por data, bairro e tipo de crime (kernel vetorizado, sem função Python por grupo)
+        aggregated = aggregate_groups(
+            df,
+            AGGREGATION_KEYS,
+            sum_columns=['quantidade'],
+            mean_columns=[c for c in ['latitude', 'longitude'] if c in df.columns],
+            mode_columns=[c for c in ['periodo_dia'] if c in df.columns]
+        )
         
         print(f"📊 Dados atuais agregados: {len(aggregated)} registros únicos")
         return aggregated
@@ -167,30 +336,29 @@ class CrimeDataIntegrator:
         if current_df.empty or distributed_df.empty:
             return current_df, distributed_df
         
-        # Identificar bairros e períodos que já existem nos dados atuais
-        current_neighborhoods = set(current_df['bairro'].unique())
-        current_dates = set(pd.to_datetime(current_df['data']).dt.to_period('M'))
+        # Identificar os pares (bairro, mês) que já existem nos dados atuais
+        current_keys = MonthNeighborhoodKeys()
+        current_keys.add(current_df)
         
-        print(f"🏘️  Bairros nos dados atuais: {len(current_neighborhoods)}")
-        print(f"📅 Períodos nos dados atuais: {len(current_dates)}")
+        print(f"🏘️  Bairros nos dados atuais: {current_keys.neighborhood_count}")
+        print(f"📅 Períodos nos dados atuais: {current_keys.month_count}")
+        print(f"🔑 Pares (bairro, mês) nos dados atuais: {len(current_keys)}")
         
         # Filtrar dados distribuídos para evitar sobreposição
-        distributed_df['data_period'] = pd.to_datetime(distributed_df['data']).dt.to_period('M')
-        
-        # Manter apenas dados distribuídos para:
-        # 1. Bairros não cobertos pelos dados atuais
-        # 2. Períodos não cobertos pelos dados atuais para bairros existentes
         filtered_distributed = distributed_df[
-            (~distributed_df['bairro'].isin(current_neighborhoods)) |
-            (~distributed_df['data_period'].isin(current_dates))
+            self._keep_distributed_mask(distributed_df, current_keys)
         ].copy()
         
-        filtered_distributed = filtered_distributed.drop('data_period', axis=1)
-        
         print(f"📊 Dados distribuídos filtrados: {len(filtered_distributed)} registros (removidas sobreposições)")
         
         return current_df, filtered_distributed
     
+    def _keep_distributed_mask(self, distributed_df: pd.DataFrame, current_keys: MonthNeighborhoodKeys) -> np.ndarray:
+        """Máscara dos registros distribuídos que não se sobrepõem aos dados atuais"""
+        # Anti-join: os dados atuais têm precedência apenas no mesmo (bairro, mês);
+        # meses sem dados atuais de um bairro continuam vindo da fonte distribuída
+        return ~current_keys.contains(distributed_df)
+    
     def integrate_datasets(self, current_df: pd.DataFrame, distributed_df: pd.DataFrame) -> pd.DataFrame:
         """Integra datasets atual e distribuído"""
         if current_df.empty and distributed_df.empty:
@@ -206,7 +374,7 @@ class CrimeDataIntegrator:
             return current_df
         
         # Garantir que as colunas sejam compatíveis
-        common_columns = ['data', 'bairro', 'tipo_crime', 'quantidade', 'zona', 'fonte']
+        common_columns = COMMON_COLUMNS
         
         # Adicionar colunas faltantes com valores padrão
         for col in common_columns:
@@ -246,6 +414,13 @@ class CrimeDataIntegrator:
             "crime_types": integrated_df['tipo_crime'].value_counts().to_dict()
         }
         
+        return self.add_geographic_coverage(validation)
+    
+    def add_geographic_coverage(self, validation: Dict) -> Dict:
+        """Acrescenta a cobertura geográfica às estatísticas de validação"""
+        if "error" in validation:
+            return validation
+        
         # Verificar cobertura geográfica
         all_poa_neighborhoods = 94  # Total oficial
         coverage_percentage = (validation["unique_neighborhoods"] / all_poa_neighborhoods) * 100
@@ -322,6 +497,111 @@ class CrimeDataIntegrator:
         print()
         print("=" * 80)
     
+    # ------------------------------------------------------------------
+    # Modo em blocos (memória limitada)
+    # ------------------------------------------------------------------
+    
+    def _read_chunks(self, path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Lê um CSV em blocos (nenhum bloco se o arquivo não existir)"""
+        if not os.path.exists(path):
+            print(f"⚠️  Arquivo {path} não encontrado")
+            return iter(())
+        return pd.read_csv(path, chunksize=chunksize)
+    
+    def _write_run(self, df: pd.DataFrame, columns: List[str], sort_by: List[str], run_dir: str, prefix: str) -> str:
+        """Grava um bloco ordenado como parte temporária para a intercalação externa"""
+        path = os.path.join(run_dir, f"{prefix}_{len(os.listdir(run_dir)):05d}.csv")
+        df.sort_values(sort_by, kind='mergesort')[columns].to_csv(path, index=False, encoding='utf-8')
+        return path
+    
+    def _read_run(self, path: str) -> Iterator[Dict]:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    
+    def _partial_aggregate(self, standardized: pd.DataFrame) -> pd.DataFrame:
+        """Agregado parcial de um bloco, combinável com os demais blocos"""
+        for column in ['latitude', 'longitude', 'periodo_dia']:
+            if column not in standardized.columns:
+                standardized[column] = np.nan
+        grouped = standardized.groupby(AGGREGATION_KEYS + ['periodo_dia'], dropna=False, sort=False)
+        partial = grouped.agg(
+            quantidade=('quantidade', 'sum'),
+            lat_soma=('latitude', 'sum'),
+            lat_n=('latitude', 'count'),
+            lon_soma=('longitude', 'sum'),
+            lon_n=('longitude', 'count'),
+            n=('quantidade', 'size')
+        ).reset_index()
+        # Chaves nulas são descartadas, como no groupby do modo em memória
+        return partial.dropna(subset=AGGREGATION_KEYS)
+    
+    def _merge_partials(self, run_paths: List[str]) -> Iterator[Dict]:
+        """Intercala as partes parciais e combina cada grupo (soma, média e moda)"""
+        key = lambda row: tuple(row[column] for column in AGGREGATION_KEYS)
+        merged = heapq.merge(*[self._read_run(path) for path in run_paths], key=key)
+        for group_key, rows in groupby(merged, key=key):
+            quantidade = lat_soma = lon_soma = 0.0
+            lat_n = lon_n = 0
+            periodos = Counter()
+            for row in rows:
+                quantidade += float(row['quantidade'])
+                lat_soma += float(row['lat_soma'])
+                lat_n += int(row['lat_n'])
+                lon_soma += float(row['lon_soma'])
+                lon_n += int(row['lon_n'])
+                if row['periodo_dia']:
+                    periodos[row['periodo_dia']] += int(row['n'])
+            # Moda com desempate pelo menor valor, como Series.mode().iloc[0]
+            best = max(periodos.values()) if periodos else 0
+            result = dict(zip(AGGREGATION_KEYS, group_key))
+            result.update({
+                'quantidade': int(quantidade) if quantidade.is_integer() else quantidade,
+                'latitude': lat_soma / lat_n if lat_n else None,
+                'longitude': lon_soma / lon_n if lon_n else None,
+                'periodo_dia': min(p for p, c in periodos.items() if c == best) if periodos else None
+            })
+            yield result
+    
+    def integrate_chunked(self, chunksize: int = DEFAULT_CHUNK_SIZE) -> Dict:
+        """Executa toda a integração em blocos e retorna as estatísticas de validação"""
+        with tempfile.TemporaryDirectory(prefix='integracao_') as run_dir:
+            # 1ª passada: dados atuais -> agregados parciais ordenados + chaves de sobreposição
+            print("\n🔧 Padronizando e agregando dados atuais em blocos...")
+            current_runs, current_keys = [], MonthNeighborhoodKeys()
+            for chunk in self._read_chunks(self.current_data_file, chunksize):
+                standardized = self.standardize_crime_types(self.standardize_current_data(chunk))
+                partial = self._partial_aggregate(standardized)
+                current_keys.add(partial)
+                current_runs.append(self._write_run(partial, PARTIAL_COLUMNS, PARTIAL_COLUMNS[:6], run_dir, 'atual'))
+            
+            # 2ª passada: dados distribuídos -> filtro de sobreposição + partes ordenadas
+            print("\n🔍 Filtrando sobreposições dos dados distribuídos em blocos...")
+            distributed_runs, kept = [], 0
+            for chunk in self._read_chunks(self.distributed_data_file, chunksize):
+                chunk = self.standardize_crime_types(chunk)
+                if len(current_keys):
+                    chunk = chunk[self._keep_distributed_mask(chunk, current_keys)]
+                chunk = chunk.reindex(columns=COMMON_COLUMNS)
+                kept += len(chunk)
+                distributed_runs.append(self._write_run(chunk, COMMON_COLUMNS, SORT_COLUMNS, run_dir, 'distribuido'))
+            print(f"📊 Dados distribuídos filtrados: {kept} registros (removidas sobreposições)")
+            
+            # Intercalação final: ordem (data, bairro, tipo_crime) e estatísticas na mesma passada
+            print("\n🔗 Intercalando partes ordenadas...")
+            sort_key = lambda row: tuple(row[column] for column in SORT_COLUMNS)
+            streams = [self._merge_partials(current_runs)] + [self._read_run(path) for path in distributed_runs]
+            stats = IntegrationStatsAccumulator()
+            with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=COMMON_COLUMNS, extrasaction='ignore')
+                writer.writeheader()
+                for row in heapq.merge(*streams, key=sort_key):
+                    writer.writerow(row)
+                    stats.add(row)
+        
+        print(f"✅ Datasets integrados: {stats.total_records} registros totais")
+        print(f"💾 Dados integrados salvos em: {self.output_file}")
+        return self.add_geographic_coverage(stats.result())
+    
     def save_integrated_data(self, integrated_df: pd.DataFrame) -> str:
         """Salva dados integrados"""
         if integrated_df.empty:
@@ -380,8 +660,33 @@ class CrimeDataIntegrator:
         print(f"📋 Metadados salvos em: {metadata_file}")
         return metadata_file
 
+def main_chunked(chunksize: int):
+    """Integração em blocos (memória limitada)"""
+    print(f"🔄 Iniciando integração em blocos de {chunksize:,} registros...")
+    
+    integrator = CrimeDataIntegrator()
+    validation = integrator.integrate_chunked(chunksize)
+    integrator.generate_integration_report(validation)
+    
+    if "error" not in validation:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_file = f"integrated_crime_data_backup_{timestamp}.csv"
+        shutil.copyfile(integrator.output_file, backup_file)
+        print(f"💾 Backup salvo em: {backup_file}")
+    metadata_file = integrator.create_metadata_file(validation)
+    
+    print(f"\n✅ Integração concluída com sucesso!")
+    print(f"📁 Arquivo principal: {integrator.output_file}")
+    print(f"📋 Metadados: {metadata_file}")
+
 def main():
     """Função principal"""
+    if '--chunksize' in sys.argv:
+        position = sys.argv.index('--chunksize')
+        chunksize = int(sys.argv[position + 1]) if len(sys.argv) > position + 1 else DEFAULT_CHUNK_SIZE
+        main_chunked(chunksize)
+        return
+    
     print("🔄 Iniciando integração de dados de criminalidade...")
     
     # Criar integrador
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Artefato Binário de Modelo (arrays NumPy + manifesto versionado)
+
+Tabelas de consulta de um modelo (zona por bairro, fator populacional, matriz
+bairro x tipo de crime) ficam em arquivos .npy abertos com memory-map. O
+manifesto JSON guarda a versão do esquema, os rótulos de cada dimensão e o
+checksum de cada array; artefatos com versão ou checksum divergente são
+rejeitados na carga.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+MODEL_ARTIFACT_SCHEMA_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+
+def array_checksum(array):
+    """SHA-256 do dtype, do formato e do conteúdo do array"""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}:{array.shape}".encode('utf-8'))
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def write_model_artifact(directory, arrays, labels, metadata=None):
+    """Salva os arrays (.npy) e o manifesto; o manifesto é gravado por último, de forma atômica
+
+    arrays: nome -> ndarray; labels: dimensão -> lista de rótulos
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        path = os.path.join(directory, f'{name}.npy')
+        np.save(path + '.tmp.npy', np.ascontiguousarray(array))
+        os.replace(path + '.tmp.npy', path)
+
+    manifest = {
+        'schema_version': MODEL_ARTIFACT_SCHEMA_VERSION,
+        'arrays': {name: {'dtype': np.asarray(a).dtype.str, 'shape': list(np.shape(a)), 'checksum': array_checksum(a)}
+                   for name, a in arrays.items()},
+        'rotulos': {dim: [str(label) for label in values] for dim, values in labels.items()},
+        'metadata': metadata or {},
+        'generated_at': datetime.now().isoformat()
+    }
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return directory
+
+
+class ModelArtifact:
+    """Arrays do modelo (memory-mapped) com índice rótulo -> posição por dimensão"""
+
+    def __init__(self, arrays, manifest):
+        self.arrays = arrays
+        self.manifest = manifest
+        self.labels = manifest['rotulos']
+        self.metadata = manifest.get('metadata', {})
+        self._positions = {dim: {label: i for i, label in enumerate(values)} for dim, values in self.labels.items()}
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def index(self, dimension, label, default=-1):
+        """Posição do rótulo na dimensão (default se não existir)"""
+        return self._positions[dimension].get(label, default)
+
+
+@lru_cache(maxsize=8)
+def _load_cached(directory, mtime, verify):
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('schema_version') != MODEL_ARTIFACT_SCHEMA_VERSION:
+        raise ValueError(
+            f"Artefato de modelo em {directory} na versão {manifest.get('schema_version')}, "
+            f"esperado {MODEL_ARTIFACT_SCHEMA_VERSION}"
+        )
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        array = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        if verify and array_checksum(array) != spec['checksum']:
+            raise ValueError(f"Checksum divergente no array '{name}' do artefato {directory}")
+        arrays[name] = array
+    return ModelArtifact(arrays, manifest)
+
+
+def load_model_artifact(directory, verify=True):
+    """Abre o artefato com memory-map (verificado e cacheado enquanto o manifesto não mudar)"""
+    return _load_cached(directory, os.path.getmtime(os.path.join(directory, MANIFEST_FILE)), verify)
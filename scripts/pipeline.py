@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Executor do Pipeline de Dados (DAG com cache por estágio)
+
+Os scripts do pipeline trocam arquivos intermediários por caminhos relativos.
+Aqui cada estágio declara o script, as entradas (obrigatórias e opcionais) e
+as saídas; as dependências entre estágios são deduzidas das saídas que um
+consome do outro. Um estágio com entrada obrigatória ausente no momento de
+rodar falha sem ser executado.
+
+Cada estágio tem uma impressão digital: o hash do conteúdo do script, dos
+argumentos e de todas as entradas. Se a impressão digital e o hash das saídas
+batem com a última execução, o estágio é pulado. Como a comparação é por
+conteúdo, um estágio refeito que gera as mesmas saídas não força os
+seguintes. Estágios independentes rodam em paralelo.
+
+Uso (a partir da pasta scripts):
+    python pipeline.py [estagio ...] [--force] [--dry-run] [--jobs N]
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+CACHE_FILE = '.pipeline_cache.json'
+LOG_DIR = 'pipeline_logs'
+
+# Estágios em ordem topológica; caminhos relativos à pasta scripts
+STAGES = [
+    {
+        'nome': 'ufrgs',
+        'script': 'analyze_ufrgs_research.py',
+        'entradas': [],
+        'saidas': ['ufrgs_distribution_model.json']
+    },
+    {
+        'nome': 'calibracao',
+        'script': 'calibrate_distribution_model.py',
+        'entradas': ['crime_distribution_model.py', 'model_artifact.py', 'validation_rules.py',
+                     'update_crime_data_2024_2025.py'],
+        'saidas': ['calibrated_distribution_model/manifest.json']
+    },
+    {
+        'nome': 'distribuicao',
+        'script': 'crime_distribution_model.py',
+        'entradas': ['ufrgs_distribution_model.json', 'model_artifact.py',
+                     'calibrated_distribution_model/manifest.json'],
+        'saidas': ['distributed_crime_data.csv', 'compiled_distribution_model/manifest.json']
+    },
+    {
+        'nome': 'integracao',
+        'script': 'integrate_crime_data.py',
+        'entradas': ['distributed_crime_data.csv', 'compiled_distribution_model/manifest.json'],
+        'opcionais': ['../data/distributed_crime_data.csv'],
+        'saidas': ['integrated_crime_data.csv', 'integrated_crime_data_metadata.json']
+    },
+    {
+        'nome': 'expansao',
+        'script': 'expand_geographic_coverage.py',
+        'entradas': ['integrated_crime_data.csv', 'ufrgs_distribution_model.json'],
+        'saidas': ['expanded_crime_data.csv', 'expanded_crime_data_metadata.json']
+    },
+    {
+        'nome': 'atualizacao',
+        'script': 'update_crime_data_2024_2025.py',
+        'entradas': ['expanded_crime_data.csv'],
+        'saidas': ['../data/expanded_crime_data_updated.csv', '../data/update_report.json']
+    },
+    {
+        'nome': 'validacao',
+        'script': 'validate_crime_data.py',
+        'entradas': ['integrated_crime_data.csv', 'validation_rules.py'],
+        'saidas': []
+    },
+]
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 do conteúdo do arquivo (None se não existir)"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_fingerprint(stage):
+    """Hash do script, dos argumentos e do conteúdo de todas as entradas"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([stage['script'], stage.get('argumentos', [])]).encode('utf-8'))
+    for path in [stage['script']] + sorted(stage['entradas'] + stage.get('opcionais', [])):
+        digest.update(f"{path}:{file_hash(path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_dependencies(stages):
+    """Estágio -> estágios que produzem alguma de suas entradas"""
+    producers = {}
+    for stage in stages:
+        for path in stage['saidas']:
+            producers[os.path.normpath(path)] = stage['nome']
+    return {
+        stage['nome']: sorted({producers[os.path.normpath(path)]
+                               for path in stage['entradas'] + stage.get('opcionais', [])
+                               if os.path.normpath(path) in producers} - {stage['nome']})
+        for stage in stages
+    }
+
+
+def unresolved_inputs(stages):
+    """Estágio -> entradas obrigatórias que nenhum estágio produz e que não existem no disco"""
+    produced = {os.path.normpath(path) for stage in stages for path in stage['saidas']}
+    unresolved = {}
+    for stage in stages:
+        missing = [path for path in stage['entradas']
+                   if os.path.normpath(path) not in produced and not os.path.exists(path)]
+        if missing:
+            unresolved[stage['nome']] = missing
+    return unresolved
+
+
+def select_stages(stages, dependencies, targets):
+    """Estágios pedidos e todos os seus antecessores (todos se não houver alvo)"""
+    if not targets:
+        return [stage['nome'] for stage in stages]
+    unknown = set(targets) - {stage['nome'] for stage in stages}
+    if unknown:
+        raise ValueError(f"Estágios desconhecidos: {', '.join(sorted(unknown))}")
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dependencies[name])
+    return [stage['nome'] for stage in stages if stage['nome'] in selected]
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def is_up_to_date(stage, fingerprint, cache):
+    """Mesma impressão digital e saídas intactas desde a última execução"""
+    entry = cache.get(stage['nome'])
+    if not entry or entry.get('fingerprint') != fingerprint:
+        return False
+    return all(file_hash(path) == entry['saidas'].get(path) for path in stage['saidas'])
+
+
+def run_stage(stage):
+    """Executa o script do estágio e grava a saída em pipeline_logs/<estagio>.log"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage['nome']}.log")
+    with open(log_path, 'w', encoding='utf-8') as log:
+        completed = subprocess.run(
+            [sys.executable, stage['script']] + stage.get('argumentos', []),
+            stdout=log, stderr=subprocess.STDOUT
+        )
+    return completed.returncode, log_path
+
+
+def run_pipeline(stages=STAGES, targets=None, force=False, dry_run=False, jobs=None):
+    """Executa o DAG e retorna o status de cada estágio (executado, em_cache, falhou, bloqueado)"""
+    by_name = {stage['nome']: stage for stage in stages}
+    dependencies = build_dependencies(stages)
+    order = select_stages(stages, dependencies, targets)
+    cache = load_cache()
+    for name, missing in unresolved_inputs([by_name[name] for name in order]).items():
+        print(f"⚠️  {name}: entrada(s) sem estágio produtor e ausente(s) do disco: {', '.join(missing)}")
+    status = {}
+    pending = list(order)
+    running = {}
+
+    def dispatch(executor):
+        for name in list(pending):
+            upstream = [dep for dep in dependencies[name] if dep in order]
+            if any(status.get(dep) in ('falhou', 'bloqueado') for dep in upstream):
+                status[name] = 'bloqueado'
+                pending.remove(name)
+                print(f"⛔ {name}: bloqueado por falha em estágio anterior")
+                continue
+            if not all(dep in status for dep in upstream):
+                continue
+            pending.remove(name)
+            stage = by_name[name]
+            missing = [path for path in stage['entradas'] if not os.path.exists(path)]
+            if missing and not dry_run:
+                status[name] = 'falhou'
+                print(f"❌ {name}: entrada(s) ausente(s): {', '.join(missing)}")
+                continue
+            # A impressão digital é calculada só agora, com as entradas já produzidas
+            fingerprint = stage_fingerprint(stage)
+            if not force and is_up_to_date(stage, fingerprint, cache):
+                status[name] = 'em_cache'
+                print(f"⏭️  {name}: sem mudanças nas entradas, usando resultado em cache")
+            elif dry_run:
+                status[name] = 'pendente'
+                print(f"📝 {name}: seria executado ({stage['script']})")
+            else:
+                print(f"🚀 {name}: executando {stage['script']}...")
+                running[executor.submit(run_stage, stage)] = (name, fingerprint)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        dispatch(executor)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                returncode, log_path = future.result()
+                if returncode == 0:
+                    stage = by_name[name]
+                    status[name] = 'executado'
+                    cache[name] = {
+                        'fingerprint': fingerprint,
+                        'saidas': {path: file_hash(path) for path in stage['saidas']},
+                        'executado_em': datetime.now().isoformat()
+                    }
+                    save_cache(cache)
+                    print(f"✅ {name}: concluído (log em {log_path})")
+                else:
+                    status[name] = 'falhou'
+                    print(f"❌ {name}: falhou com código {returncode} (log em {log_path})")
+            dispatch(executor)
+
+    return {name: status[name] for name in order}
+
+
+def main():
+    """Função principal"""
+    args = sys.argv[1:]
+    jobs = None
+    if '--jobs' in args:
+        position = args.index('--jobs')
+        jobs = int(args[position + 1])
+        del args[position:position + 2]
+    force = '--force' in args
+    dry_run = '--dry-run' in args
+    targets = [arg for arg in args if not arg.startswith('--')]
+
+    print("🔧 PIPELINE DE DADOS DE CRIMINALIDADE")
+    print("=" * 50)
+    status = run_pipeline(targets=targets, force=force, dry_run=dry_run, jobs=jobs)
+
+    print("\n📋 Resumo:")
+    for name, result in status.items():
+        print(f"  - {name}: {result}")
+    if any(result in ('falhou', 'bloqueado') for result in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
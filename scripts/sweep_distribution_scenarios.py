@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Varredura de Cenários do Modelo de Distribuição
+
+Compara hipóteses alternativas de ponderação com os números oficiais usados
+na calibração (calibrate_distribution_model.py):
+- multiplicadores dos pesos de crime de cada zona
+- expoente dos fatores populacionais (1 = fatores atuais, total preservado)
+- base dos bairros faltantes em expand_geographic_coverage.py (BASE_BAIRROS_FALTANTES)
+
+As matrizes são montadas uma única vez: a previsão de um cenário é
+(pesos do cenário) x matriz de desenho + base x contribuição dos bairros
+faltantes, calculada em lote para muitos cenários por processo. Resultados
+ficam em cache pelo hash dos parâmetros e dos dados de entrada, e a saída é
+uma tabela ordenada pelo erro.
+
+Uso (a partir da pasta scripts):
+    python sweep_distribution_scenarios.py [--grade | --amostras N] [--jobs N] [--top N]
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calibrate_distribution_model import CITY_WIDE_NEIGHBORHOOD, build_design_matrix, collect_figures
+from crime_distribution_model import (MUNICIPAL_SAMPLE_SEED, CrimeDistributionModel, ZONE_MAPPING,
+                                      load_compiled_distribution_model)
+from expand_geographic_coverage import (BASE_BAIRROS_FALTANTES, TIPOS_SEMPRE_GERADOS,
+                                        ZONE_CRIME_WEIGHTS as MISSING_ZONE_WEIGHTS, classify_neighborhood_zone,
+                                        estimate_population_factor, load_official_neighborhoods)
+from validation_rules import normalize_text
+
+CACHE_FILE = 'sweep_cache.json'
+RESULTS_FILE = 'sweep_results.csv'
+INTEGRATED_DATA_FILE = 'integrated_crime_data.csv'
+
+# Ano dos registros gerados para bairros faltantes (datas uniformes no ano)
+MISSING_DATA_YEAR = 2024
+
+ZONES = list(ZONE_MAPPING)
+DEFAULT_GRID = {
+    **{f'mult_{zone}': [0.8, 1.0, 1.2] for zone in ZONES},
+    'expoente_populacional': [0.5, 1.0],
+    'base_faltantes': [0.5, BASE_BAIRROS_FALTANTES, 0.9]
+}
+DEFAULT_RANGES = {
+    **{f'mult_{zone}': (0.5, 1.5) for zone in ZONES},
+    'expoente_populacional': (0.0, 1.5),
+    'base_faltantes': (0.3, 1.0)
+}
+# Cenários avaliados por tarefa do pool
+SCENARIOS_PER_TASK = 256
+
+
+def grid_scenarios(grid=DEFAULT_GRID):
+    """Produto cartesiano dos valores de cada parâmetro"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def random_scenarios(n, ranges=DEFAULT_RANGES, seed=42):
+    """Amostra uniforme de n cenários dentro dos intervalos de cada parâmetro"""
+    rng = np.random.default_rng(seed)
+    draws = {name: rng.uniform(low, high, n) for name, (low, high) in ranges.items()}
+    return [{name: round(float(draws[name][i]), 4) for name in ranges} for i in range(n)]
+
+
+def _missing_contribution(figures, municipal_bairros):
+    """Previsão por número dos registros de bairros faltantes com base 1.0 (escala linear na base)
+
+    Aproximação pelo valor esperado de generate_missing_neighborhoods_data: mesmos
+    bairros, zonas, fatores populacionais e filtro de tipos, com o sorteio
+    uniform(0.5, 1.5) pela sua média 1. O arredondamento para baixo (int) e o
+    mínimo de um registro por tipo são ignorados, para a previsão ficar linear na base.
+    """
+    if not os.path.exists(INTEGRATED_DATA_FILE):
+        print(f"⚠️  {INTEGRATED_DATA_FILE} não encontrado: base_faltantes não terá efeito")
+        return np.zeros(len(figures))
+    current = pd.read_csv(INTEGRATED_DATA_FILE, usecols=['bairro', 'tipo_crime'])
+    current_bairros = set(current['bairro'].dropna().unique())
+    generated_types = set(current['tipo_crime'].dropna().unique()) | set(TIPOS_SEMPRE_GERADOS)
+    average = len(current) / max(len(current_bairros), 1)
+    missing = [b for b in load_official_neighborhoods() if b not in current_bairros and b not in municipal_bairros]
+
+    year_start, year_end = pd.Timestamp(MISSING_DATA_YEAR, 1, 1), pd.Timestamp(MISSING_DATA_YEAR, 12, 31)
+    year_days = (year_end - year_start).days + 1
+    contribution = np.zeros(len(figures))
+    for f, figure in enumerate(figures):
+        start, end = max(pd.Timestamp(figure['inicio']), year_start), min(pd.Timestamp(figure['fim']), year_end)
+        if end < start:
+            continue
+        fraction = ((end - start).days + 1) / year_days
+        names = None if figure.get('bairros') is None else {normalize_text(b) for b in figure['bairros']}
+        for bairro in missing:
+            if names is not None and normalize_text(bairro) not in names:
+                continue
+            zone = classify_neighborhood_zone(bairro)
+            shares = MISSING_ZONE_WEIGHTS.get(zone, MISSING_ZONE_WEIGHTS['Leste'])
+            for tipo, share in shares.items():
+                if tipo not in generated_types:
+                    continue
+                key = normalize_text(tipo)
+                if figure.get('tipos') is not None:
+                    selected = key in {normalize_text(t) for t in figure['tipos']}
+                else:
+                    patterns = [normalize_text(p) for p in figure.get('tipos_contem') or []]
+                    selected = not patterns or any(p in key for p in patterns)
+                if selected:
+                    contribution[f] += fraction * average * estimate_population_factor(bairro, zone) * share
+    return contribution
+
+
+def prepare_context():
+    """Matrizes compartilhadas por todos os cenários"""
+    base_model = CrimeDistributionModel(use_calibrated=False)
+    compiled = load_compiled_distribution_model(base_model.all_neighborhoods)
+    municipal_data = base_model.create_sample_municipal_data(MUNICIPAL_SAMPLE_SEED)
+
+    matrix, figures = build_design_matrix(collect_figures(), compiled, municipal_data)
+    bairros = set(compiled.labels['bairro']) | {CITY_WIDE_NEIGHBORHOOD}
+    return {
+        'matrix': matrix,
+        'targets': np.array([f['esperado'] for f in figures], dtype=np.float64),
+        'crime_weights': np.asarray(compiled['pesos_crime'], dtype=np.float64),
+        'population': np.asarray(compiled['fator_populacional'], dtype=np.float64),
+        'zone_index': np.asarray(compiled['zona'], dtype=np.int64),
+        'zones': compiled.labels['zona'],
+        'missing': _missing_contribution(figures, bairros),
+        'figures': [f['id'] for f in figures]
+    }
+
+
+def context_checksum(context):
+    """Hash dos dados de entrada: resultados em cache só valem para as mesmas matrizes"""
+    digest = hashlib.sha256()
+    for key in ('matrix', 'targets', 'crime_weights', 'population', 'zone_index', 'missing'):
+        digest.update(np.ascontiguousarray(context[key]).tobytes())
+    digest.update(json.dumps(context['zones']).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def scenario_key(scenario, checksum):
+    return hashlib.sha256((json.dumps(scenario, sort_keys=True) + checksum).encode('utf-8')).hexdigest()
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(context):
+    _WORKER_STATE.update(context)
+
+
+def _evaluate_batch(scenarios):
+    """Métricas de erro de um lote de cenários (previsões em uma multiplicação de matrizes)"""
+    state = _WORKER_STATE
+    multipliers = np.array([[s.get(f'mult_{zone}', 1.0) for zone in state['zones']] for s in scenarios])
+    exponent = np.array([s.get('expoente_populacional', 1.0) for s in scenarios])[:, None]
+    base = np.array([s.get('base_faltantes', BASE_BAIRROS_FALTANTES) for s in scenarios])[:, None]
+
+    population = state['population'][None, :] ** exponent
+    population *= state['population'].sum() / population.sum(axis=1, keepdims=True)
+    weights = multipliers[:, state['zone_index']][:, :, None] * state['crime_weights'][None] * population[:, :, None]
+    predicted = weights.reshape(len(scenarios), -1) @ state['matrix'].T + base * state['missing'][None, :]
+
+    targets = state['targets'][None, :]
+    predicted = np.maximum(predicted, 1e-9)
+    relative = np.abs(predicted - targets) / targets * 100
+    deviance = 2 * np.sum(targets * np.log(targets / predicted) - (targets - predicted), axis=1)
+    return [{'erro_medio_pct': float(relative[i].mean()),
+             'erro_maximo_pct': float(relative[i].max()),
+             'desvio_poisson': float(deviance[i])} for i in range(len(scenarios))]
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(path + '.tmp', path)
+
+
+def run_sweep(scenarios, n_jobs=None, context=None, cache_path=CACHE_FILE):
+    """Avalia os cenários (reaproveitando o cache) e retorna a tabela ordenada pelo erro médio"""
+    context = context or prepare_context()
+    checksum = context_checksum(context)
+    cache = load_cache(cache_path)
+
+    keys = [scenario_key(s, checksum) for s in scenarios]
+    pending = [(k, s) for k, s in dict(zip(keys, scenarios)).items() if k not in cache]
+    if pending:
+        batches = [pending[i:i + SCENARIOS_PER_TASK] for i in range(0, len(pending), SCENARIOS_PER_TASK)]
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(batches))
+        if n_jobs == 1:
+            _init_worker(context)
+            results = [_evaluate_batch([s for _, s in batch]) for batch in batches]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(context,)) as pool:
+                results = list(pool.map(_evaluate_batch, [[s for _, s in batch] for batch in batches]))
+        for batch, metrics in zip(batches, results):
+            for (key, _), metric in zip(batch, metrics):
+                cache[key] = metric
+        save_cache(cache, cache_path)
+
+    table = pd.DataFrame([{**scenario, **cache[key]} for key, scenario in zip(keys, scenarios)])
+    table = table.sort_values(['erro_medio_pct', 'desvio_poisson'], kind='stable').reset_index(drop=True)
+    table.insert(0, 'posicao', np.arange(1, len(table) + 1))
+    return table, len(pending)
+
+
+def main():
+    """Função principal"""
+    args = sys.argv[1:]
+
+    def option(name, default):
+        if name in args:
+            return int(args[args.index(name) + 1])
+        return default
+
+    if '--grade' in args:
+        scenarios = grid_scenarios()
+    else:
+        scenarios = random_scenarios(option('--amostras', 500))
+    # Cenário de referência (parâmetros atuais) sempre entra na comparação (a grade já o contém)
+    reference = {**{f'mult_{zone}': 1.0 for zone in ZONES}, 'expoente_populacional': 1.0,
+                 'base_faltantes': BASE_BAIRROS_FALTANTES}
+    if reference not in scenarios:
+        scenarios.append(reference)
+
+    print("🧪 VARREDURA DE CENÁRIOS DO MODELO DE DISTRIBUIÇÃO")
+    print("=" * 50)
+    table, evaluated = run_sweep(scenarios, n_jobs=option('--jobs', None))
+    print(f"📊 Cenários: {len(table)} ({evaluated} avaliados, {len(table) - evaluated} do cache)")
+
+    table.to_csv(RESULTS_FILE, index=False, encoding='utf-8')
+    print(table.head(option('--top', 10)).round(3).to_string(index=False))
+    reference = table[(table[[f'mult_{zone}' for zone in ZONES]] == 1.0).all(axis=1)
+                      & (table['expoente_populacional'] == 1.0) & (table['base_faltantes'] == BASE_BAIRROS_FALTANTES)]
+    if not reference.empty:
+        print(f"\n📌 Cenário atual: posição {int(reference['posicao'].iloc[0])}, "
+              f"erro médio {reference['erro_medio_pct'].iloc[0]:.1f}%")
+    print(f"💾 Tabela ordenada salva em: {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,8 @@ import json
 
 def load_current_data():
     """Carrega os dados atuais do sistema"""
-    data_path = '../data/expanded_crime_data.csv'
+    # Saída do estágio de expansão (expand_geographic_coverage.py, na pasta scripts)
+    data_path = 'expanded_crime_data.csv'
     if os.path.exists(data_path):
         return pd.read_csv(data_path)
     else:
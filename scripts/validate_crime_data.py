@@ -14,6 +14,9 @@ import pandas as pd
 import json
 from datetime import datetime
 import os
+import sys
+
+from validation_rules import aggregate_records, evaluate_rules, save_rule_results
 
 def load_integrated_data():
     """
@@ -27,158 +30,152 @@ def load_integrated_data():
         print("❌ Arquivo de dados integrados não encontrado")
         return None
 
-def validate_centro_historico(df):
+def open_store(path=None):
     """
-    Valida dados do Centro Histórico com informações das notícias.
-    
-    Dados das notícias (1º semestre 2024):
-    - Centro Histórico: 2.266 ocorrências (1.572 furtos + 645 roubos + 49 outros)
-    - Redução de 26% nos furtos vs 2023
-    - Redução de 66% nos roubos de veículos vs 2023
-    - Redução de 49% nos demais roubos vs 2023
+    Abre o banco SQLite analítico (src/crime_store.py) para consultas agregadas.
     """
-    print("\n🔍 VALIDAÇÃO - CENTRO HISTÓRICO")
-    print("=" * 50)
-    
-    centro_data = df[df['bairro'].str.contains('Centro', case=False, na=False)]
-    
-    if centro_data.empty:
-        print("❌ Dados do Centro Histórico não encontrados")
-        return
-    
-    # Análise por período (1º semestre 2024)
-    centro_2024 = centro_data[centro_data['data'].str.contains('2024', na=False)]
-    
-    print(f"📊 Registros do Centro Histórico em 2024: {len(centro_2024)}")
-    
-    if not centro_2024.empty:
-        # Análise por tipo de crime
-        crimes_centro = centro_2024['tipo_crime'].value_counts()
-        print("\n📈 Distribuição por tipo de crime:")
-        for crime, count in crimes_centro.head(10).items():
-            print(f"   • {crime}: {count} casos")
-        
-        # Comparação com dados das notícias
-        furtos = centro_2024[centro_2024['tipo_crime'].str.contains('Furto', case=False, na=False)]
-        roubos = centro_2024[centro_2024['tipo_crime'].str.contains('Roubo', case=False, na=False)]
-        
-        print(f"\n🔍 Comparação com dados oficiais (1º sem. 2024):")
-        print(f"   • Furtos modelo: {len(furtos)} vs Oficial: 1.572")
-        print(f"   • Roubos modelo: {len(roubos)} vs Oficial: 645")
-        print(f"   • Total modelo: {len(centro_2024)} vs Oficial: 2.266")
-        
-        # Cálculo de precisão
-        if len(centro_2024) > 0:
-            precisao = min(len(centro_2024) / 2266, 2266 / len(centro_2024)) * 100
-            print(f"   • Precisão estimada: {precisao:.1f}%")
-    
-    return centro_data
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.crime_store import DEFAULT_DB_PATH, open_crime_store
+    try:
+        store = open_crime_store(path or DEFAULT_DB_PATH)
+        print(f"✅ Banco analítico aberto: {store.path} ({store.count():,} registros)")
+        return store
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return None
+
+def load_summary(chunksize, path='integrated_crime_data.csv'):
+    """
+    Lê o CSV uma única vez em blocos e mantém apenas contagens agregadas
+    (mesma interface de consultas do banco analítico).
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.crime_store import CrimeSummary
+    try:
+        summary = CrimeSummary.from_csv(path, chunksize=chunksize)
+        print(f"✅ Dados integrados agregados em blocos de {chunksize:,}: {summary.count():,} registros")
+        return summary
+    except FileNotFoundError:
+        print("❌ Arquivo de dados integrados não encontrado")
+        return None
 
-def validate_top_neighborhoods(df):
+def validate_official_benchmarks(df, store=None):
     """
-    Valida os bairros com mais crimes segundo as notícias.
+    Compara o modelo com os números oficiais declarados em validation_rules.py.
     
-    Top 10 bairros com mais roubos a pedestres (1º sem. 2023):
-    1. Centro Histórico: 948 casos
-    2. Rubem Berta: 310 casos
-    3. Sarandi: casos não especificados
-    4. Cidade Baixa: 214 casos (aumento de 24,4%)
-    5. Restinga: 129 casos
+    Todas as regras são avaliadas em uma única passada sobre as contagens
+    agregadas (data, bairro, tipo), sem uma varredura por bairro ou por regra.
     """
-    print("\n🔍 VALIDAÇÃO - TOP BAIRROS VIOLENTOS")
+    print("\n🔍 VALIDAÇÃO - NÚMEROS OFICIAIS")
     print("=" * 50)
     
-    # Análise dos bairros mais mencionados nas notícias
-    bairros_validacao = {
-        'Centro Histórico': {'roubos_pedestres_2023': 948, 'furtos_2024_sem1': 1572},
-        'Rubem Berta': {'roubos_pedestres_2023': 310},
-        'Cidade Baixa': {'roubos_pedestres_2023': 214},
-        'Restinga': {'roubos_pedestres_2023': 129, 'homicidios_2017': 45},
-        'Vila Jardim': {'homicidios_2016': 34, 'homicidios_2017': 10},
-        'Praia de Belas': {'total_ocorrencias_2024_sem1': 558}
-    }
-    
-    print("📊 Comparação modelo vs dados oficiais:")
+    aggregated = store.aggregated_counts() if store is not None else aggregate_records(df)
+    results = evaluate_rules(aggregated)
     
-    for bairro, dados_oficiais in bairros_validacao.items():
-        bairro_data = df[df['bairro'].str.contains(bairro, case=False, na=False)]
-        
-        if not bairro_data.empty:
-            total_modelo = len(bairro_data)
-            print(f"\n🏘️  {bairro}:")
-            print(f"   • Total modelo: {total_modelo} registros")
-            
-            # Análise por tipo de crime se disponível
-            crimes = bairro_data['tipo_crime'].value_counts()
-            for crime, count in crimes.head(3).items():
-                print(f"   • {crime}: {count} casos")
-            
-            # Comparação com dados oficiais
-            for tipo, valor in dados_oficiais.items():
-                print(f"   • {tipo.replace('_', ' ').title()}: {valor} (oficial)")
+    icons = {'ok': '✅', 'divergente': '⚠️ ', 'sem_dados': '❌'}
+    for result in results:
+        print(f"\n{icons[result['status']]} {result['descricao']}")
+        if result['tipo'] == 'variacao':
+            if result['observado'] is None:
+                print(f"   • Sem dados no período base (oficial: {result['esperado']:+.0f}%)")
+            else:
+                print(f"   • Variação modelo: {result['observado']:+.1f}% vs Oficial: {result['esperado']:+.0f}%")
         else:
-            print(f"\n❌ {bairro}: Não encontrado no modelo")
+            print(f"   • Modelo: {result['observado']:.0f} vs Oficial: {result['esperado']:,}")
+            if 'precisao_pct' in result:
+                print(f"   • Precisão estimada: {result['precisao_pct']:.1f}%")
+    
+    results_file = save_rule_results(results)
+    print(f"\n💾 Resultados das regras salvos em: {results_file}")
+    return results
 
-def validate_crime_trends(df):
+def validate_crime_trends(df, store=None):
     """
     Valida tendências de criminalidade mencionadas nas notícias.
     """
     print("\n🔍 VALIDAÇÃO - TENDÊNCIAS DE CRIMINALIDADE")
     print("=" * 50)
     
+    if store is not None:
+        total_registros = store.count()
+        crimes_por_ano = store.counts_by_period('ano')
+        crimes_por_zona = store.counts_by('zona')
+        crimes_comuns = store.counts_by('tipo_crime', limit=10)
+    else:
+        total_registros = len(df)
+        crimes_por_ano = None
+        if 'data' in df.columns:
+            df['ano'] = pd.to_datetime(df['data'], errors='coerce').dt.year
+            crimes_por_ano = df.groupby('ano').size()
+        crimes_por_zona = df['zona'].value_counts() if 'zona' in df.columns else None
+        crimes_comuns = df['tipo_crime'].value_counts().head(10)
+    
     # Análise temporal
-    if 'data' in df.columns:
-        df['ano'] = pd.to_datetime(df['data'], errors='coerce').dt.year
-        crimes_por_ano = df.groupby('ano').size()
-        
+    if crimes_por_ano is not None:
         print("📈 Evolução temporal dos crimes:")
         for ano, total in crimes_por_ano.items():
             if pd.notna(ano):
                 print(f"   • {int(ano)}: {total} registros")
     
     # Análise por zona geográfica
-    if 'zona' in df.columns:
-        crimes_por_zona = df['zona'].value_counts()
+    if crimes_por_zona is not None:
         print("\n🗺️  Distribuição por zona:")
         for zona, total in crimes_por_zona.items():
-            percentual = (total / len(df)) * 100
+            percentual = (total / total_registros) * 100
             print(f"   • {zona}: {total} registros ({percentual:.1f}%)")
     
     # Tipos de crime mais comuns
-    crimes_comuns = df['tipo_crime'].value_counts().head(10)
     print("\n🎯 Top 10 tipos de crime:")
     for i, (crime, total) in enumerate(crimes_comuns.items(), 1):
-        percentual = (total / len(df)) * 100
+        percentual = (total / total_registros) * 100
         print(f"   {i:2d}. {crime}: {total} casos ({percentual:.1f}%)")
 
-def generate_validation_report(df):
+def generate_validation_report(df, store=None):
     """
     Gera relatório de validação completo.
     """
     print("\n📋 RELATÓRIO DE VALIDAÇÃO")
     print("=" * 60)
     
+    if store is not None:
+        total_registros = store.count()
+        bairros_unicos = store.count_distinct('bairro')
+        tipos_unicos = store.count_distinct('tipo_crime')
+        data_inicio, data_fim = store.date_range()
+        com_bairro = store.count_not_null('bairro')
+        com_tipo = store.count_not_null('tipo_crime')
+        fontes = store.counts_by('fonte')
+    else:
+        total_registros = len(df)
+        bairros_unicos = df['bairro'].nunique()
+        tipos_unicos = df['tipo_crime'].nunique()
+        data_inicio = data_fim = None
+        if 'data' in df.columns:
+            datas_validas = pd.to_datetime(df['data'], errors='coerce').dropna()
+            if not datas_validas.empty:
+                data_inicio, data_fim = datas_validas.min(), datas_validas.max()
+        com_bairro = df['bairro'].notna().sum()
+        com_tipo = df['tipo_crime'].notna().sum()
+        fontes = df['fonte'].value_counts() if 'fonte' in df.columns else None
+    
     # Estatísticas gerais
-    print(f"📊 Total de registros analisados: {len(df):,}")
-    print(f"📍 Bairros únicos: {df['bairro'].nunique()}")
-    print(f"🚨 Tipos de crime únicos: {df['tipo_crime'].nunique()}")
+    print(f"📊 Total de registros analisados: {total_registros:,}")
+    print(f"📍 Bairros únicos: {bairros_unicos}")
+    print(f"🚨 Tipos de crime únicos: {tipos_unicos}")
     
     # Período de dados
-    if 'data' in df.columns:
-        datas_validas = pd.to_datetime(df['data'], errors='coerce').dropna()
-        if not datas_validas.empty:
-            print(f"📅 Período: {datas_validas.min().strftime('%Y-%m-%d')} a {datas_validas.max().strftime('%Y-%m-%d')}")
+    if data_inicio is not None:
+        print(f"📅 Período: {data_inicio.strftime('%Y-%m-%d')} a {data_fim.strftime('%Y-%m-%d')}")
     
     # Qualidade dos dados
     print("\n🔍 Qualidade dos dados:")
-    print(f"   • Registros com bairro: {df['bairro'].notna().sum():,} ({(df['bairro'].notna().sum()/len(df)*100):.1f}%)")
-    print(f"   • Registros com tipo de crime: {df['tipo_crime'].notna().sum():,} ({(df['tipo_crime'].notna().sum()/len(df)*100):.1f}%)")
+    print(f"   • Registros com bairro: {com_bairro:,} ({(com_bairro/total_registros*100):.1f}%)")
+    print(f"   • Registros com tipo de crime: {com_tipo:,} ({(com_tipo/total_registros*100):.1f}%)")
     
-    if 'fonte' in df.columns:
-        fontes = df['fonte'].value_counts()
+    if fontes is not None:
         print("\n📚 Distribuição por fonte:")
         for fonte, total in fontes.items():
-            percentual = (total / len(df)) * 100
+            percentual = (total / total_registros) * 100
             print(f"   • {fonte}: {total:,} registros ({percentual:.1f}%)")
     
     # Limitações identificadas
@@ -196,11 +193,11 @@ def generate_validation_report(df):
     print("   • Monitorar tendências e ajustar pesos do modelo")
     
     return {
-        'total_registros': len(df),
-        'bairros_unicos': df['bairro'].nunique(),
-        'tipos_crime_unicos': df['tipo_crime'].nunique(),
-        'qualidade_bairro': (df['bairro'].notna().sum()/len(df)*100),
-        'qualidade_crime': (df['tipo_crime'].notna().sum()/len(df)*100)
+        'total_registros': int(total_registros),
+        'bairros_unicos': int(bairros_unicos),
+        'tipos_crime_unicos': int(tipos_unicos),
+        'qualidade_bairro': (com_bairro/total_registros*100),
+        'qualidade_crime': (com_tipo/total_registros*100)
     }
 
 def save_validation_results(validation_data):
@@ -241,18 +238,36 @@ def main():
     print("=" * 60)
     print(f"📅 Data: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Carregar dados
-    df = load_integrated_data()
-    if df is None:
-        return
+    # Carregar dados (--sqlite [caminho] consulta o banco analítico em vez do CSV;
+    # --chunksize N lê o CSV em blocos, acumulando só as contagens agregadas)
+    store = None
+    if '--chunksize' in sys.argv:
+        position = sys.argv.index('--chunksize')
+        store = load_summary(int(sys.argv[position + 1]) if len(sys.argv) > position + 1 else 100000)
+        if store is None:
+            return
+        df = None
+    elif '--sqlite' in sys.argv:
+        position = sys.argv.index('--sqlite')
+        store = open_store(sys.argv[position + 1] if len(sys.argv) > position + 1 else None)
+        if store is None:
+            return
+        df = None
+    else:
+        df = load_integrated_data()
+        if df is None:
+            return
     
     # Executar validações
-    validate_centro_historico(df)
-    validate_top_neighborhoods(df)
-    validate_crime_trends(df)
+    benchmark_results = validate_official_benchmarks(df, store)
+    validate_crime_trends(df, store)
     
     # Gerar relatório
-    validation_data = generate_validation_report(df)
+    validation_data = generate_validation_report(df, store)
+    validation_data['regras'] = {
+        status: sum(1 for r in benchmark_results if r['status'] == status)
+        for status in ('ok', 'divergente', 'sem_dados')
+    }
     
     # Salvar resultados
     save_validation_results(validation_data)
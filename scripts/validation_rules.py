@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regras de Validação Declarativas
+
+Os números oficiais (notícias, SSP-RS) ficam declarados como dados em
+VALIDATION_RULES. O motor compila todas as regras de uma vez: as linhas são
+reduzidas a um cubo (bairro x tipo de crime x segmento de tempo), em que os
+segmentos são delimitados pelas datas das regras, e cada regra vira uma soma
+de prefixos mascarada. O custo não cresce com o número de regras nem exige
+novas varreduras do DataFrame.
+
+Tipos de regra:
+- 'contagem': total observado na janela vs valor esperado
+- 'variacao': variação percentual entre a janela base e a janela da regra
+"""
+
+import json
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Tolerância padrão (%) para considerar um número do modelo compatível com o oficial
+DEFAULT_TOLERANCE_PCT = 25.0
+
+VALIDATION_RULES = [
+    {
+        'id': 'centro_historico_total_2024_s1',
+        'descricao': 'Ocorrências no Centro Histórico (1º semestre 2024)',
+        'bairros': ['Centro Histórico'],
+        'inicio': '2024-01-01', 'fim': '2024-06-30',
+        'esperado': 2266,
+        'fonte': 'GauchaZH - Centro Histórico furtos 2024'
+    },
+    {
+        'id': 'centro_historico_furtos_2024_s1',
+        'descricao': 'Furtos no Centro Histórico (1º semestre 2024)',
+        'bairros': ['Centro Histórico'], 'tipos_contem': ['furto'],
+        'inicio': '2024-01-01', 'fim': '2024-06-30',
+        'esperado': 1572,
+        'fonte': 'GauchaZH - Centro Histórico furtos 2024'
+    },
+    {
+        'id': 'centro_historico_roubos_2024_s1',
+        'descricao': 'Roubos no Centro Histórico (1º semestre 2024)',
+        'bairros': ['Centro Histórico'], 'tipos_contem': ['roubo'],
+        'inicio': '2024-01-01', 'fim': '2024-06-30',
+        'esperado': 645,
+        'fonte': 'GauchaZH - Centro Histórico furtos 2024'
+    },
+    {
+        'id': 'centro_historico_furtos_variacao_2024',
+        'tipo': 'variacao',
+        'descricao': 'Variação dos furtos no Centro Histórico (1º sem. 2024 vs 2023)',
+        'bairros': ['Centro Histórico'], 'tipos_contem': ['furto'],
+        'inicio_base': '2023-01-01', 'fim_base': '2023-06-30',
+        'inicio': '2024-01-01', 'fim': '2024-06-30',
+        'esperado': -26.0,
+        'fonte': 'GauchaZH - Centro Histórico furtos 2024'
+    },
+    {
+        'id': 'centro_historico_roubos_pedestres_2023_s1',
+        'descricao': 'Roubos a pedestres no Centro Histórico (1º semestre 2023)',
+        'bairros': ['Centro Histórico'], 'tipos_contem': ['pedestre', 'transeunte'],
+        'inicio': '2023-01-01', 'fim': '2023-06-30',
+        'esperado': 948,
+        'fonte': 'GauchaZH - Roubos a pedestres 2023'
+    },
+    {
+        'id': 'rubem_berta_roubos_pedestres_2023_s1',
+        'descricao': 'Roubos a pedestres no Rubem Berta (1º semestre 2023)',
+        'bairros': ['Rubem Berta'], 'tipos_contem': ['pedestre', 'transeunte'],
+        'inicio': '2023-01-01', 'fim': '2023-06-30',
+        'esperado': 310,
+        'fonte': 'GauchaZH - Roubos a pedestres 2023'
+    },
+    {
+        'id': 'cidade_baixa_roubos_pedestres_2023_s1',
+        'descricao': 'Roubos a pedestres na Cidade Baixa (1º semestre 2023)',
+        'bairros': ['Cidade Baixa'], 'tipos_contem': ['pedestre', 'transeunte'],
+        'inicio': '2023-01-01', 'fim': '2023-06-30',
+        'esperado': 214,
+        'fonte': 'GauchaZH - Roubos a pedestres 2023'
+    },
+    {
+        'id': 'restinga_roubos_pedestres_2023_s1',
+        'descricao': 'Roubos a pedestres na Restinga (1º semestre 2023)',
+        'bairros': ['Restinga'], 'tipos_contem': ['pedestre', 'transeunte'],
+        'inicio': '2023-01-01', 'fim': '2023-06-30',
+        'esperado': 129,
+        'fonte': 'GauchaZH - Roubos a pedestres 2023'
+    },
+    {
+        'id': 'restinga_homicidios_2017',
+        'descricao': 'Homicídios na Restinga (2017)',
+        'bairros': ['Restinga'], 'tipos_contem': ['homic'],
+        'inicio': '2017-01-01', 'fim': '2017-12-31',
+        'esperado': 45,
+        'fonte': 'GauchaZH - Bairros violentos 2017-2018'
+    },
+    {
+        'id': 'vila_jardim_homicidios_2016',
+        'descricao': 'Homicídios na Vila Jardim (2016)',
+        'bairros': ['Vila Jardim'], 'tipos_contem': ['homic'],
+        'inicio': '2016-01-01', 'fim': '2016-12-31',
+        'esperado': 34,
+        'fonte': 'GauchaZH - Bairros violentos 2017-2018'
+    },
+    {
+        'id': 'vila_jardim_homicidios_2017',
+        'descricao': 'Homicídios na Vila Jardim (2017)',
+        'bairros': ['Vila Jardim'], 'tipos_contem': ['homic'],
+        'inicio': '2017-01-01', 'fim': '2017-12-31',
+        'esperado': 10,
+        'fonte': 'GauchaZH - Bairros violentos 2017-2018'
+    },
+    {
+        'id': 'praia_de_belas_total_2024_s1',
+        'descricao': 'Ocorrências na Praia de Belas (1º semestre 2024)',
+        'bairros': ['Praia de Belas'],
+        'inicio': '2024-01-01', 'fim': '2024-06-30',
+        'esperado': 558,
+        'fonte': 'SSP-RS - Indicadores criminais'
+    },
+]
+
+
+def normalize_text(text):
+    """Texto sem acentos, em minúsculas e sem espaços nas pontas"""
+    text = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in text if not unicodedata.combining(c)).strip().lower()
+
+
+def aggregate_records(df, value_column='quantidade'):
+    """Reduz registros a contagens por (data, bairro, tipo_crime) - entrada do motor"""
+    frame = df.reindex(columns=['data', 'bairro', 'tipo_crime', value_column])
+    return frame.groupby(['data', 'bairro', 'tipo_crime'], dropna=False).agg(
+        ocorrencias=(value_column, 'size'),
+        quantidade=(value_column, 'sum')
+    ).reset_index()
+
+
+def _windows(rules):
+    """Janelas (início, fim) de todas as regras; regras de variação contribuem duas"""
+    windows = []
+    for rule in rules:
+        windows.append((rule['inicio'], rule['fim']))
+        if rule.get('tipo', 'contagem') == 'variacao':
+            windows.append((rule['inicio_base'], rule['fim_base']))
+    return windows
+
+
+def _compile_masks(rules, bairro_keys, tipo_keys):
+    """Máscaras (regra x bairro) e (regra x tipo) sobre as categorias presentes nos dados"""
+    bairro_mask = np.zeros((len(rules), len(bairro_keys)), dtype=np.float64)
+    tipo_mask = np.zeros((len(rules), len(tipo_keys)), dtype=np.float64)
+    bairro_position = {key: i for i, key in enumerate(bairro_keys)}
+    for r, rule in enumerate(rules):
+        if rule.get('bairros') is None:
+            bairro_mask[r] = 1.0
+        else:
+            for name in rule['bairros']:
+                if normalize_text(name) in bairro_position:
+                    bairro_mask[r, bairro_position[normalize_text(name)]] = 1.0
+        patterns = [normalize_text(p) for p in rule.get('tipos_contem') or []]
+        tipo_mask[r] = [1.0 if not patterns or any(p in key for p in patterns) else 0.0 for key in tipo_keys]
+    return bairro_mask, tipo_mask
+
+
+def evaluate_rules(aggregated, rules=None, value='ocorrencias'):
+    """Avalia todas as regras em uma única passada vetorizada
+
+    aggregated: DataFrame com data, bairro, tipo_crime e a coluna `value`
+    (ver aggregate_records, CrimeStore.aggregated_counts, CrimeSummary.aggregated_counts)
+    """
+    rules = VALIDATION_RULES if rules is None else rules
+    if not rules:
+        return []
+
+    bairro_codes, bairro_keys = pd.factorize(aggregated['bairro'].fillna('').map(normalize_text))
+    tipo_codes, tipo_keys = pd.factorize(aggregated['tipo_crime'].fillna('').map(normalize_text))
+    days = pd.to_datetime(aggregated['data'], errors='coerce').to_numpy(dtype='datetime64[D]')
+    weights = aggregated[value].fillna(0).to_numpy(dtype=np.float64)
+
+    # Segmentos de tempo delimitados pelos inícios e fins (+1 dia) de todas as janelas
+    windows = _windows(rules)
+    starts = np.array([np.datetime64(start, 'D') for start, _ in windows])
+    ends = np.array([np.datetime64(end, 'D') + np.timedelta64(1, 'D') for _, end in windows])
+    edges = np.unique(np.concatenate([starts, ends]))
+    n_segments = len(edges) + 1
+
+    valid = ~np.isnat(days)
+    segment = np.searchsorted(edges, days[valid], side='right')
+    flat = (bairro_codes[valid] * len(tipo_keys) + tipo_codes[valid]) * n_segments + segment
+    cube = np.bincount(flat, weights=weights[valid], minlength=len(bairro_keys) * len(tipo_keys) * n_segments)
+    cube = cube.reshape(len(bairro_keys), len(tipo_keys), n_segments)
+    prefix = np.concatenate([np.zeros(cube.shape[:2] + (1,)), np.cumsum(cube, axis=2)], axis=2)
+
+    # Totais (bairro x tipo) de cada janela e redução pelas máscaras de cada regra
+    first = np.searchsorted(edges, starts, side='right')
+    last = np.searchsorted(edges, ends, side='right')
+    window_totals = prefix[:, :, last] - prefix[:, :, first]          # (bairro, tipo, janela)
+
+    window_rule = []
+    for r, rule in enumerate(rules):
+        window_rule.append(r)
+        if rule.get('tipo', 'contagem') == 'variacao':
+            window_rule.append(r)
+    window_rule = np.array(window_rule)
+    bairro_mask, tipo_mask = _compile_masks(rules, list(bairro_keys), list(tipo_keys))
+    totals = np.einsum('wb,bcw,wc->w', bairro_mask[window_rule], window_totals, tipo_mask[window_rule])
+
+    results, w = [], 0
+    for rule in rules:
+        kind = rule.get('tipo', 'contagem')
+        tolerance = rule.get('tolerancia_pct', DEFAULT_TOLERANCE_PCT)
+        result = {
+            'id': rule['id'],
+            'descricao': rule['descricao'],
+            'tipo': kind,
+            'fonte': rule.get('fonte'),
+            'esperado': rule['esperado'],
+            'tolerancia_pct': tolerance
+        }
+        if kind == 'variacao':
+            current, base = totals[w], totals[w + 1]
+            w += 2
+            observed = (current - base) / base * 100 if base > 0 else None
+            result.update({'observado': observed, 'base': float(base), 'atual': float(current)})
+            if observed is None:
+                result['status'] = 'sem_dados'
+            else:
+                result['diferenca_pp'] = observed - rule['esperado']
+                result['status'] = 'ok' if abs(result['diferenca_pp']) <= tolerance else 'divergente'
+        else:
+            observed = float(totals[w])
+            w += 1
+            result['observado'] = observed
+            if observed == 0:
+                result['status'] = 'sem_dados'
+            else:
+                expected = rule['esperado']
+                result['diferenca_pct'] = (observed - expected) / expected * 100
+                result['precisao_pct'] = min(observed / expected, expected / observed) * 100
+                result['status'] = 'ok' if abs(result['diferenca_pct']) <= tolerance else 'divergente'
+        results.append(result)
+    return results
+
+
+def save_rule_results(results, path=None):
+    """Salva os resultados das regras em JSON estruturado"""
+    path = path or f"validation_rules_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    summary = {status: sum(1 for r in results if r['status'] == status) for status in ('ok', 'divergente', 'sem_dados')}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'validation_date': datetime.now().isoformat(),
+            'resumo': summary,
+            'regras': results
+        }, f, indent=2, ensure_ascii=False)
+    return path
@@ -51,23 +51,26 @@ APP_SUBTITLE = "### Análise Preditiva e Alertas em Tempo Real"
 # Caminhos dos arquivos de dados
 DATA_PATHS = {
     'csv_data': '../data/distributed_crime_data.csv',
-    'geojson_data': '../data/GeoJSON/bairros_poa.geojson'
-}
-
-# Coordenadas dos bairros de Porto Alegre
-BAIRROS_COORDS = {
-    "Centro": (-30.0277, -51.2287),
-    "Cidade Baixa": (-30.0346, -51.2146),
-    "Bom Fim": (-30.0346, -51.2087),
-    "Menino Deus": (-30.0500, -51.2200),
-    "Moinhos de Vento": (-30.0277, -51.2087),
-    "Floresta": (-30.0200, -51.2400),
-    "Santana": (-30.0400, -51.2300),
-    "Petrópolis": (-30.0500, -51.2400),
-    "Mont Serrat": (-30.0600, -51.2500),
-    "Farroupilha": (-30.0300, -51.2100),
-    "Praia de Belas": (-30.0400, -51.2400),
-    "Rio Branco": (-30.0100, -51.2200)
+    'geojson_data': '../data/GeoJSON/bairros_poa.geojson',
+    # Centróides, bboxes e adjacência pré-computados do arquivo de limites (src/geometry.py)
+    'geometry_metadata': '../data/bairros_geometry.npz',
+    # Raster (célula x hora) de risco para pontuação de trajetos (src/risk_grid.py)
+    'risk_grid': '../data/risk_grid.npy',
+    # Tensor denso de contagens diárias (data x bairro x tipo) (src/count_tensor.py)
+    'count_tensor': '../data/count_tensor',
+    # Agregações dia/semana/mês/trimestre/ano por (bairro, tipo) (src/rollups.py)
+    'rollups': '../data/rollups',
+    # Banco SQLite local com índices em (data, bairro, tipo_crime) (src/crime_store.py)
+    'crime_store': '../data/crime_data.sqlite',
+    # Intervalos de credibilidade (Monte Carlo) das contagens distribuídas (src/distribution_uncertainty.py)
+    'distribution_intervals': '../data/distribution_intervals.json',
+    # Feed de ocorrências só-de-acréscimo acompanhado em tempo real (src/streaming.py)
+    'incident_feed': '../data/incident_feed.csv',
+    # Assinaturas de alertas e caixa de saída das notificações (src/watchlist.py)
+    'watchlist': '../data/watchlist.json',
+    'alert_outbox': '../data/alert_outbox.jsonl',
+    # Cercas geográficas (círculos e polígonos) cruzadas com o feed ao vivo (src/geofences.py)
+    'geofences': '../data/geofences.json'
 }
 
 # Dados simulados para fallback
@@ -0,0 +1,182 @@
+"""
+Tensor Denso de Contagens (data x bairro x tipo de crime)
+Núcleo analítico do painel: as ocorrências viram um array NumPy de contagens
+diárias, salvo como .npy (memory-mapped) + dicionários de dimensões em JSON.
+Rankings, tendências e séries passam a ser reduções de array, e vários
+processos do Streamlit mapeiam o mesmo arquivo sem copiar os dados.
+
+Uso:
+    python -m src.count_tensor [caminho_csv] [diretorio_saida]
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.geometry import DATA_DIR
+
+TENSOR_SCHEMA_VERSION = 1
+
+DEFAULT_TENSOR_DIR = os.path.join(DATA_DIR, 'count_tensor')
+COUNTS_FILE = 'counts.npy'
+DIMS_FILE = 'dims.json'
+
+
+def _columns(df):
+    """Nomes das colunas no formato do painel ou do CSV bruto"""
+    date_col = 'Data Registro' if 'Data Registro' in df.columns else 'data'
+    bairro_col = 'Bairro' if 'Bairro' in df.columns else 'bairro'
+    crime_col = 'Descricao do Fato' if 'Descricao do Fato' in df.columns else 'tipo_crime'
+    return date_col, bairro_col, crime_col
+
+
+def tensor_from_dataframe(df, value_column=None):
+    """Monta o array (dias, bairros, tipos) e as dimensões a partir das linhas
+
+    value_column: None conta linhas (como o painel); 'quantidade' soma a coluna
+    """
+    date_col, bairro_col, crime_col = _columns(df)
+    days = pd.to_datetime(df[date_col]).dt.normalize()
+    dates = pd.date_range(days.min(), days.max(), freq='D')
+
+    day_index = (days - dates[0]).dt.days.to_numpy()
+    bairro_index, bairros = pd.factorize(df[bairro_col].astype(str), sort=True)
+    tipo_index, tipos = pd.factorize(df[crime_col].astype(str), sort=True)
+
+    if value_column is None:
+        weights = None
+    else:
+        weights = df[value_column].fillna(0).to_numpy(dtype=np.float64)
+
+    shape = (len(dates), len(bairros), len(tipos))
+    flat = (day_index * shape[1] + bairro_index) * shape[2] + tipo_index
+    counts = np.bincount(flat, weights=weights, minlength=int(np.prod(shape)))
+    counts = np.rint(counts).astype(np.int32).reshape(shape)
+
+    dims = {
+        'schema_version': TENSOR_SCHEMA_VERSION,
+        'start': dates[0].strftime('%Y-%m-%d'),
+        'days': len(dates),
+        'bairros': list(bairros),
+        'tipos': list(tipos),
+        'valor': value_column or 'ocorrencias'
+    }
+    return counts, dims
+
+
+def build_count_tensor(df, output_dir=DEFAULT_TENSOR_DIR, value_column=None):
+    """Gera o tensor e salva no diretório (escrita atômica: leitores nunca veem arquivo parcial)"""
+    counts, dims = tensor_from_dataframe(df, value_column)
+    dims['generated_at'] = datetime.now().isoformat()
+
+    os.makedirs(output_dir, exist_ok=True)
+    counts_path = os.path.join(output_dir, COUNTS_FILE)
+    dims_path = os.path.join(output_dir, DIMS_FILE)
+    np.save(counts_path + '.tmp.npy', counts)
+    with open(dims_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(dims, f, indent=2, ensure_ascii=False)
+    os.replace(dims_path + '.tmp', dims_path)
+    os.replace(counts_path + '.tmp.npy', counts_path)
+    return output_dir
+
+
+class CountTensor:
+    """Contagens diárias (data, bairro, tipo) com reduções nomeadas"""
+
+    def __init__(self, counts, dates, bairros, tipos):
+        self.counts = counts                  # (dias, bairros, tipos)
+        self.dates = dates                    # DatetimeIndex diário
+        self.bairros = np.asarray(bairros)
+        self.tipos = np.asarray(tipos)
+        self._bairro_index = {b: i for i, b in enumerate(self.bairros.tolist())}
+        self._tipo_index = {t: i for i, t in enumerate(self.tipos.tolist())}
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    def total(self):
+        return int(self.counts.sum())
+
+    def select(self, start=None, end=None, bairros=None, tipos=None):
+        """Subconjunto por período (fatia sem cópia), bairros e tipos"""
+        first = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start)))
+        last = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side='right'))
+        counts = self.counts[first:last]
+        selected_bairros, selected_tipos = self.bairros, self.tipos
+
+        if bairros is not None:
+            index = [self._bairro_index[b] for b in bairros if b in self._bairro_index]
+            counts, selected_bairros = counts[:, index], self.bairros[index]
+        if tipos is not None:
+            index = [self._tipo_index[t] for t in tipos if t in self._tipo_index]
+            counts, selected_tipos = counts[:, :, index], self.tipos[index]
+        return CountTensor(counts, self.dates[first:last], selected_bairros, selected_tipos)
+
+    def by_bairro(self):
+        return pd.Series(self.counts.sum(axis=(0, 2), dtype=np.int64), index=self.bairros)
+
+    def by_tipo(self):
+        return pd.Series(self.counts.sum(axis=(0, 1), dtype=np.int64), index=self.tipos)
+
+    def daily(self):
+        return pd.Series(self.counts.sum(axis=(1, 2), dtype=np.int64), index=self.dates)
+
+    def bairro_tipo(self):
+        """Matriz (bairro x tipo) do período"""
+        return pd.DataFrame(self.counts.sum(axis=0, dtype=np.int64), index=self.bairros, columns=self.tipos)
+
+    def by_weekday(self):
+        """Total por dia da semana (0 = segunda)"""
+        return np.bincount(self.dates.dayofweek, weights=self.daily().to_numpy(), minlength=7).astype(np.int64)
+
+    def by_period(self, freq='M', axis=None):
+        """Totais por período ('W', 'M', 'Q', 'Y') via somas em blocos contíguos
+
+        axis: None (total), 'bairro' ou 'tipo' para manter essa dimensão
+        """
+        if len(self.dates) == 0:
+            return pd.Series(dtype=np.int64)
+        periods = self.dates.to_period(freq)
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        keep = {None: (1, 2), 'bairro': (2,), 'tipo': (1,)}[axis]
+        blocks = np.add.reduceat(self.counts.sum(axis=keep, dtype=np.int64), starts, axis=0)
+        index = periods[starts]
+        if axis is None:
+            return pd.Series(blocks, index=index)
+        return pd.DataFrame(blocks, index=index, columns=self.bairros if axis == 'bairro' else self.tipos)
+
+
+@lru_cache(maxsize=4)
+def _load_cached(directory, mtime):
+    with open(os.path.join(directory, DIMS_FILE), 'r', encoding='utf-8') as f:
+        dims = json.load(f)
+    if dims.get('schema_version') != TENSOR_SCHEMA_VERSION:
+        raise ValueError(
+            f"Tensor de contagens em {directory} na versão {dims.get('schema_version')}, "
+            f"esperado {TENSOR_SCHEMA_VERSION}. Execute 'python -m src.count_tensor' para reconstruí-lo."
+        )
+    counts = np.load(os.path.join(directory, COUNTS_FILE), mmap_mode='r')
+    dates = pd.date_range(dims['start'], periods=dims['days'], freq='D')
+    return CountTensor(counts, dates, dims['bairros'], dims['tipos'])
+
+
+def load_count_tensor(directory=DEFAULT_TENSOR_DIR):
+    """Abre o tensor com memory-map (cacheado enquanto o arquivo não mudar)"""
+    return _load_cached(directory, os.path.getmtime(os.path.join(directory, COUNTS_FILE)))
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_TENSOR_DIR
+
+    build_count_tensor(pd.read_csv(csv_path), output)
+    tensor = load_count_tensor(output)
+    print(f"Tensor de contagens gerado: {output}")
+    print(f"- Dimensões: {tensor.shape[0]} dias x {tensor.shape[1]} bairros x {tensor.shape[2]} tipos")
+    print(f"- Ocorrências: {tensor.total()}")
@@ -0,0 +1,301 @@
+"""
+Armazenamento Analítico Local (SQLite)
+Backend opcional para o painel e os scripts: as ocorrências ficam em um banco
+SQLite com índices em (data, bairro, tipo_crime), e as perguntas agregadas
+(contagens, rankings, séries, modas) são resolvidas no próprio banco, sem
+carregar todas as linhas no pandas. Roda localmente (biblioteca padrão) e
+atende conjuntos de dados maiores que a memória. O banco guarda a origem
+(mtime + tamanho do CSV importado), para o painel saber se está desatualizado.
+
+CrimeSummary oferece as mesmas consultas sem banco: o CSV é lido uma única vez
+em blocos e reduzido a contagens por (data, bairro, tipo, zona, fonte).
+
+Uso:
+    python -m src.crime_store [caminho_csv] [caminho_banco]
+"""
+
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+
+from src.geometry import DATA_DIR
+
+DEFAULT_DB_PATH = os.path.join(DATA_DIR, 'crime_data.sqlite')
+IMPORT_CHUNK_SIZE = 50000
+
+COLUMNS = {
+    'data': 'TEXT',
+    'bairro': 'TEXT',
+    'tipo_crime': 'TEXT',
+    'quantidade': 'REAL',
+    'zona': 'TEXT',
+    'fonte': 'TEXT',
+    'latitude': 'REAL',
+    'longitude': 'REAL',
+    'observacoes': 'TEXT',
+}
+
+INDEXES = {
+    'idx_data_bairro_tipo': ('data', 'bairro', 'tipo_crime'),
+    'idx_bairro_data': ('bairro', 'data'),
+    'idx_tipo_data': ('tipo_crime', 'data'),
+}
+
+# Expressões de período sobre datas ISO (AAAA-MM-DD)
+PERIOD_EXPRESSIONS = {
+    'dia': 'data',
+    'mes': 'substr(data, 1, 7)',
+    'ano': 'substr(data, 1, 4)',
+}
+
+
+class CrimeStore:
+    """Consultas agregadas sobre a tabela `ocorrencias`"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        # Streamlit atende cada sessão em uma thread própria
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+    def close(self):
+        self.connection.close()
+
+    def import_csv(self, csv_path, chunksize=IMPORT_CHUNK_SIZE):
+        """Recria a tabela a partir do CSV, em blocos, e cria os índices ao final"""
+        cursor = self.connection.cursor()
+        cursor.execute("DROP TABLE IF EXISTS ocorrencias")
+        cursor.execute("CREATE TABLE ocorrencias ({})".format(
+            ', '.join(f"{name} {kind}" for name, kind in COLUMNS.items())
+        ))
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        total = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk = chunk.reindex(columns=list(COLUMNS))
+            chunk['data'] = pd.to_datetime(chunk['data'], errors='coerce').dt.strftime('%Y-%m-%d')
+            rows = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+            cursor.executemany(f"INSERT INTO ocorrencias VALUES ({placeholders})", rows)
+            total += len(chunk)
+        for name, columns in INDEXES.items():
+            cursor.execute(f"CREATE INDEX {name} ON ocorrencias ({', '.join(columns)})")
+        cursor.execute("ANALYZE")
+        stat = os.stat(csv_path)
+        cursor.execute("DROP TABLE IF EXISTS origem")
+        cursor.execute("CREATE TABLE origem (caminho TEXT, mtime_ns INTEGER, tamanho INTEGER)")
+        cursor.execute("INSERT INTO origem VALUES (?, ?, ?)",
+                       (os.path.abspath(csv_path), stat.st_mtime_ns, stat.st_size))
+        self.connection.commit()
+        return total
+
+    def source_matches(self, csv_path):
+        """True se o banco foi importado deste CSV e o arquivo não mudou desde então"""
+        try:
+            row = self.connection.execute("SELECT caminho, mtime_ns, tamanho FROM origem").fetchone()
+            if row is None:
+                return False
+            stat = os.stat(csv_path)
+            # Mesmo arquivo mesmo com grafias diferentes do caminho (relativo, barras, maiúsculas no Windows)
+            same_file = os.path.samefile(row[0], csv_path)
+        except (sqlite3.Error, OSError):
+            return False
+        return same_file and (row[1], row[2]) == (stat.st_mtime_ns, stat.st_size)
+
+    def _where(self, start=None, end=None, bairros=None, tipos=None, bairro_like=None, tipo_like=None):
+        """Cláusula WHERE parametrizada a partir dos filtros"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("data >= ?")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            clauses.append("data <= ?")
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        if bairros is not None:
+            bairros = list(bairros)
+            clauses.append(f"bairro IN ({', '.join('?' for _ in bairros)})" if bairros else "0")
+            params.extend(bairros)
+        if tipos is not None:
+            tipos = list(tipos)
+            clauses.append(f"tipo_crime IN ({', '.join('?' for _ in tipos)})" if tipos else "0")
+            params.extend(tipos)
+        if bairro_like is not None:
+            clauses.append("bairro LIKE ?")
+            params.append(f"%{bairro_like}%")
+        if tipo_like is not None:
+            clauses.append("tipo_crime LIKE ?")
+            params.append(f"%{tipo_like}%")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _value(self, value):
+        return "COUNT(*)" if value == 'ocorrencias' else "COALESCE(SUM(quantidade), 0)"
+
+    def count(self, value='ocorrencias', **filters):
+        """Total de registros (ou soma de `quantidade`) com os filtros"""
+        where, params = self._where(**filters)
+        return self.connection.execute(f"SELECT {self._value(value)} FROM ocorrencias{where}", params).fetchone()[0]
+
+    def count_not_null(self, column, **filters):
+        """Registros com a coluna preenchida"""
+        if column not in COLUMNS:
+            raise ValueError(f"Coluna desconhecida: {column}")
+        where, params = self._where(**filters)
+        return self.connection.execute(f"SELECT COUNT({column}) FROM ocorrencias{where}", params).fetchone()[0]
+
+    def count_distinct(self, column, **filters):
+        """Valores distintos de uma coluna"""
+        if column not in COLUMNS:
+            raise ValueError(f"Coluna desconhecida: {column}")
+        where, params = self._where(**filters)
+        return self.connection.execute(f"SELECT COUNT(DISTINCT {column}) FROM ocorrencias{where}", params).fetchone()[0]
+
+    def date_range(self, **filters):
+        """Primeira e última data (Timestamps ou None)"""
+        where, params = self._where(**filters)
+        first, last = self.connection.execute(f"SELECT MIN(data), MAX(data) FROM ocorrencias{where}", params).fetchone()
+        return (pd.Timestamp(first) if first else None, pd.Timestamp(last) if last else None)
+
+    def counts_by(self, column, value='ocorrencias', limit=None, **filters):
+        """Equivalente a value_counts(): contagens por coluna em ordem decrescente"""
+        if column not in COLUMNS:
+            raise ValueError(f"Coluna desconhecida: {column}")
+        where, params = self._where(**filters)
+        where += (" AND " if where else " WHERE ") + f"{column} IS NOT NULL"
+        query = (f"SELECT {column}, {self._value(value)} AS total FROM ocorrencias{where} "
+                 f"GROUP BY {column} ORDER BY total DESC, {column}")
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        rows = self.connection.execute(query, params).fetchall()
+        return pd.Series([total for _, total in rows], index=[key for key, _ in rows], name=column, dtype='int64'
+                         if value == 'ocorrencias' else 'float64')
+
+    def mode(self, column, **filters):
+        """Valor mais frequente da coluna (None se não houver registros)"""
+        top = self.counts_by(column, limit=1, **filters)
+        return top.index[0] if len(top) else None
+
+    def aggregated_counts(self, **filters):
+        """Contagens por (data, bairro, tipo_crime), entrada das regras de validação"""
+        where, params = self._where(**filters)
+        return pd.read_sql_query(
+            f"SELECT data, bairro, tipo_crime, COUNT(*) AS ocorrencias, COALESCE(SUM(quantidade), 0) AS quantidade "
+            f"FROM ocorrencias{where} GROUP BY data, bairro, tipo_crime", self.connection, params=params
+        )
+
+    def counts_by_period(self, period='mes', value='ocorrencias', **filters):
+        """Série por dia, mês ou ano (chaves como texto AAAA[-MM[-DD]])"""
+        expression = PERIOD_EXPRESSIONS[period]
+        where, params = self._where(**filters)
+        rows = self.connection.execute(
+            f"SELECT {expression} AS periodo, {self._value(value)} FROM ocorrencias{where} "
+            f"GROUP BY periodo ORDER BY periodo", params
+        ).fetchall()
+        return pd.Series([total for _, total in rows], index=[key for key, _ in rows], name=period)
+
+
+SUMMARY_KEYS = ['data', 'bairro', 'tipo_crime', 'zona', 'fonte']
+
+
+class CrimeSummary:
+    """Agregado compacto em memória com a mesma interface de consultas de CrimeStore"""
+
+    def __init__(self, aggregated, path=None):
+        self.aggregated = aggregated      # SUMMARY_KEYS + ocorrencias, quantidade
+        self.path = path
+
+    @classmethod
+    def from_csv(cls, csv_path, chunksize=IMPORT_CHUNK_SIZE):
+        """Uma passada em blocos; a memória depende das combinações distintas, não das linhas"""
+        partials = []
+        aggregated = None
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk = chunk.reindex(columns=SUMMARY_KEYS + ['quantidade'])
+            partials.append(chunk.groupby(SUMMARY_KEYS, dropna=False).agg(
+                ocorrencias=('quantidade', 'size'), quantidade=('quantidade', 'sum')
+            ))
+            # Consolidar periodicamente para manter a memória limitada
+            if len(partials) >= 8:
+                aggregated = cls._combine(partials if aggregated is None else [aggregated] + partials)
+                partials = []
+        if partials:
+            aggregated = cls._combine(partials if aggregated is None else [aggregated] + partials)
+        if aggregated is None:
+            aggregated = pd.DataFrame(columns=SUMMARY_KEYS + ['ocorrencias', 'quantidade'])
+        return cls(aggregated.reset_index() if aggregated.index.nlevels > 1 else aggregated, csv_path)
+
+    @staticmethod
+    def _combine(frames):
+        return pd.concat(frames).groupby(level=list(range(len(SUMMARY_KEYS))), dropna=False).sum()
+
+    def close(self):
+        pass
+
+    def _select(self, start=None, end=None, bairros=None, tipos=None, bairro_like=None, tipo_like=None):
+        frame = self.aggregated
+        mask = pd.Series(True, index=frame.index)
+        if start is not None:
+            mask &= frame['data'] >= pd.Timestamp(start).strftime('%Y-%m-%d')
+        if end is not None:
+            mask &= frame['data'] <= pd.Timestamp(end).strftime('%Y-%m-%d')
+        if bairros is not None:
+            mask &= frame['bairro'].isin(list(bairros))
+        if tipos is not None:
+            mask &= frame['tipo_crime'].isin(list(tipos))
+        if bairro_like is not None:
+            mask &= frame['bairro'].str.contains(bairro_like, case=False, regex=False, na=False)
+        if tipo_like is not None:
+            mask &= frame['tipo_crime'].str.contains(tipo_like, case=False, regex=False, na=False)
+        return frame[mask]
+
+    def count(self, value='ocorrencias', **filters):
+        return self._select(**filters)[value].sum()
+
+    def count_not_null(self, column, **filters):
+        frame = self._select(**filters)
+        return int(frame.loc[frame[column].notna(), 'ocorrencias'].sum())
+
+    def count_distinct(self, column, **filters):
+        return self._select(**filters)[column].nunique()
+
+    def date_range(self, **filters):
+        dates = pd.to_datetime(self._select(**filters)['data'], errors='coerce').dropna()
+        return (dates.min(), dates.max()) if not dates.empty else (None, None)
+
+    def counts_by(self, column, value='ocorrencias', limit=None, **filters):
+        totals = self._select(**filters).groupby(column)[value].sum()
+        totals = totals.sort_values(ascending=False, kind='mergesort')
+        totals.index.name = None
+        return (totals if limit is None else totals.head(limit)).rename(column)
+
+    def mode(self, column, **filters):
+        top = self.counts_by(column, limit=1, **filters)
+        return top.index[0] if len(top) else None
+
+    def aggregated_counts(self, **filters):
+        return self._select(**filters).groupby(['data', 'bairro', 'tipo_crime'], dropna=False)[
+            ['ocorrencias', 'quantidade']].sum().reset_index()
+
+    def counts_by_period(self, period='mes', value='ocorrencias', **filters):
+        frame = self._select(**filters)
+        dates = pd.to_datetime(frame['data'], errors='coerce')
+        keys = {'dia': dates.dt.strftime('%Y-%m-%d'), 'mes': dates.dt.strftime('%Y-%m'), 'ano': dates.dt.strftime('%Y')}[period]
+        return frame[value].groupby(keys).sum().rename(period)
+
+
+def open_crime_store(path=DEFAULT_DB_PATH):
+    """Abre o banco existente; FileNotFoundError se ainda não foi importado"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Banco {path} não encontrado. Execute 'python -m src.crime_store'.")
+    return CrimeStore(path)
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DB_PATH
+
+    store = CrimeStore(db_path)
+    imported = store.import_csv(csv_path)
+    first, last = store.date_range()
+    print(f"Banco analítico gerado: {db_path}")
+    print(f"- Registros: {imported:,}")
+    print(f"- Período: {first:%Y-%m-%d} a {last:%Y-%m-%d}")
+    store.close()
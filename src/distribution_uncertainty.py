@@ -0,0 +1,195 @@
+"""
+Faixas de Incerteza das Contagens Distribuídas (Monte Carlo)
+As linhas 'SSP-RS (distribuído)' são estimativas pontuais: cada total
+municipal (data, tipo de crime) foi repartido entre bairros pelos pesos do
+modelo UFRGS. Aqui cada total é realocado milhares de vezes por
+Dirichlet-multinomial em torno dessas proporções, e os quantis do total
+simulado de cada bairro viram intervalos de credibilidade.
+
+As simulações são vetorizadas por lote e distribuídas entre processos. A
+tabela de intervalos é salva em disco com o checksum das alocações de origem,
+para que o painel apenas a leia (nunca simula durante a navegação).
+
+Uso:
+    python -m src.distribution_uncertainty [caminho_csv] [n_simulacoes]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.geometry import DATA_DIR
+
+UNCERTAINTY_SCHEMA_VERSION = 1
+
+DEFAULT_UNCERTAINTY_PATH = os.path.join(DATA_DIR, 'distribution_intervals.json')
+DISTRIBUTED_SOURCE = 'SSP-RS (distribuído)'
+DEFAULT_SIMULATIONS = 2000
+# Concentração da Dirichlet: quanto maior, mais as realocações ficam próximas dos pesos do modelo
+DEFAULT_CONCENTRATION = 50.0
+DEFAULT_LEVEL = 0.9
+# Limite de elementos (simulação x grupo x bairro) gerados de uma vez por lote
+MAX_BATCH_ELEMENTS = 4_000_000
+# Lotes de simulação com sementes próprias; fixo para a tabela não mudar com o número de núcleos
+N_BATCHES = 32
+
+
+def _columns(df):
+    """Nomes das colunas no formato do painel ou do CSV bruto"""
+    date_col = 'Data Registro' if 'Data Registro' in df.columns else 'data'
+    bairro_col = 'Bairro' if 'Bairro' in df.columns else 'bairro'
+    crime_col = 'Descricao do Fato' if 'Descricao do Fato' in df.columns else 'tipo_crime'
+    return date_col, bairro_col, crime_col
+
+
+def allocation_matrix(df):
+    """Totais municipais (grupos) e proporções (grupo x bairro) das linhas distribuídas"""
+    date_col, bairro_col, crime_col = _columns(df)
+    if 'fonte' in df.columns:
+        df = df[df['fonte'] == DISTRIBUTED_SOURCE]
+    quantities = df['quantidade'].fillna(0).to_numpy(dtype=np.float64) if 'quantidade' in df.columns \
+        else np.ones(len(df))
+
+    group_keys = pd.to_datetime(df[date_col]).dt.strftime('%Y-%m-%d') + '|' + df[crime_col].astype(str)
+    group_index, _ = pd.factorize(group_keys, sort=True)
+    bairro_index, bairros = pd.factorize(df[bairro_col].astype(str), sort=True)
+
+    allocated = np.zeros((group_index.max() + 1 if len(df) else 0, len(bairros)))
+    np.add.at(allocated, (group_index, bairro_index), quantities)
+    totals = allocated.sum(axis=1)
+    keep = totals > 0
+    allocated, totals = allocated[keep], totals[keep]
+    return np.rint(totals).astype(np.int64), allocated / totals[:, None], np.asarray(bairros), allocated.sum(axis=0)
+
+
+def allocation_checksum(totals, proportions, bairros):
+    """Identifica as alocações de origem (detecta tabela de intervalos desatualizada)"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(totals).tobytes())
+    digest.update(np.ascontiguousarray(np.round(proportions, 12)).tobytes())
+    digest.update('\n'.join(bairros).encode('utf-8'))
+    return digest.hexdigest()
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(totals, alpha):
+    _WORKER_STATE.update(totals=totals, alpha=alpha)
+
+
+def _simulation_batch(seed, n_simulations):
+    """Totais por bairro de um lote de realocações Dirichlet-multinomial"""
+    totals, alpha = _WORKER_STATE['totals'], _WORKER_STATE['alpha']
+    n_groups, n_bairros = alpha.shape
+    rng = np.random.default_rng(seed)
+    result = np.zeros((n_simulations, n_bairros), dtype=np.int64)
+    # Os grupos também são fatiados quando uma única simulação de todos já passa do limite
+    group_step = max(1, min(n_groups, MAX_BATCH_ELEMENTS // max(n_bairros, 1)))
+    step = max(1, MAX_BATCH_ELEMENTS // max(group_step * n_bairros, 1))
+    for start in range(0, n_simulations, step):
+        size = min(step, n_simulations - start)
+        for first in range(0, n_groups, group_step):
+            block = alpha[first:first + group_step]
+            # Proporções sorteadas da Dirichlet (gammas normalizadas; alfa zero fica zero)
+            shares = rng.gamma(np.broadcast_to(block, (size,) + block.shape))
+            shares /= shares.sum(axis=2, keepdims=True)
+            result[start:start + size] += rng.multinomial(totals[first:first + group_step], shares).sum(axis=1)
+    return result
+
+
+def simulate_distribution_intervals(df, n_simulations=DEFAULT_SIMULATIONS,
+                                    concentration=DEFAULT_CONCENTRATION,
+                                    level=DEFAULT_LEVEL, n_jobs=None, seed=42):
+    """Intervalos de credibilidade por bairro para as contagens distribuídas
+
+    Colunas: bairro, estimado, media, inferior, mediana, superior
+    """
+    totals, proportions, bairros, point = allocation_matrix(df)
+    if len(totals) == 0:
+        return pd.DataFrame(columns=['bairro', 'estimado', 'media', 'inferior', 'mediana', 'superior'])
+
+    init_args = (totals, proportions * concentration)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_batches = max(1, min(N_BATCHES, n_simulations))
+    sizes = [n_simulations // n_batches + (1 if i < n_simulations % n_batches else 0) for i in range(n_batches)]
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        simulated = np.concatenate([_simulation_batch(s, size) for s, size in zip(seeds, sizes)])
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=init_args) as pool:
+            simulated = np.concatenate(list(pool.map(_simulation_batch, seeds, sizes)))
+
+    tail = (1 - level) / 2
+    lower, median, upper = np.quantile(simulated, [tail, 0.5, 1 - tail], axis=0)
+    table = pd.DataFrame({
+        'bairro': bairros,
+        'estimado': point,
+        'media': simulated.mean(axis=0),
+        'inferior': lower,
+        'mediana': median,
+        'superior': upper
+    })
+    return table.sort_values('estimado', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def build_distribution_intervals(df, output_path=DEFAULT_UNCERTAINTY_PATH, n_simulations=DEFAULT_SIMULATIONS,
+                                 concentration=DEFAULT_CONCENTRATION, level=DEFAULT_LEVEL, n_jobs=None, seed=42):
+    """Simula e salva a tabela de intervalos (escrita atômica)"""
+    checksum = allocation_checksum(*allocation_matrix(df)[:3])
+    table = simulate_distribution_intervals(df, n_simulations, concentration, level, n_jobs, seed)
+    payload = {
+        'schema_version': UNCERTAINTY_SCHEMA_VERSION,
+        'checksum': checksum,
+        'simulacoes': n_simulations,
+        'concentracao': concentration,
+        'nivel': level,
+        'generated_at': datetime.now().isoformat(),
+        'intervalos': table.to_dict(orient='records')
+    }
+    with open(output_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(output_path + '.tmp', output_path)
+    return output_path
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path, mtime):
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('schema_version') != UNCERTAINTY_SCHEMA_VERSION:
+        raise ValueError(
+            f"Intervalos em {path} na versão {payload.get('schema_version')}, "
+            f"esperado {UNCERTAINTY_SCHEMA_VERSION}. Execute 'python -m src.distribution_uncertainty'."
+        )
+    table = pd.DataFrame(payload.pop('intervalos'))
+    return table, payload
+
+
+def load_distribution_intervals(path=DEFAULT_UNCERTAINTY_PATH, df=None):
+    """Lê a tabela de intervalos (cacheada); None se não existir ou não corresponder aos dados de df"""
+    if not os.path.exists(path):
+        return None
+    table, metadata = _load_cached(path, os.path.getmtime(path))
+    if df is not None and allocation_checksum(*allocation_matrix(df)[:3]) != metadata['checksum']:
+        return None
+    return table
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    simulations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SIMULATIONS
+
+    output = build_distribution_intervals(pd.read_csv(csv_path), n_simulations=simulations)
+    table = load_distribution_intervals(output)
+    print(f"Intervalos gerados: {output} ({len(table)} bairros, {simulations} simulações)")
+    print(table.head(10).round(1).to_string(index=False))
@@ -0,0 +1,196 @@
+"""
+Cercas Geográficas (alertas por área de interesse dos usuários)
+Cada cerca é um círculo (centro + raio em metros) ou um polígono de
+coordenadas (latitude, longitude), opcionalmente restrita a tipos de crime.
+A cada atualização, as ocorrências novas são cruzadas com todas as cercas:
+- R-tree (shapely.STRtree) sobre os retângulos envolventes das cercas,
+  consultado com todos os pontos de uma vez -> pares candidatos
+- verificação exata vetorizada: distância ao centro nos círculos e
+  shapely.contains_xy nos polígonos
+
+Coordenadas são projetadas em metros (equiretangular em torno de Porto
+Alegre), então os raios valem em metros sem depender de pyproj. Milhares de
+cercas x milhares de ocorrências levam milissegundos.
+
+Uso:
+    python -m src.geofences [n_cercas_sinteticas] [n_ocorrencias_sinteticas]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.geometry import DATA_DIR
+
+DEFAULT_GEOFENCES_PATH = os.path.join(DATA_DIR, 'geofences.json')
+
+EARTH_RADIUS_M = 6371000.0
+# Latitude de referência da projeção (centro de Porto Alegre)
+REFERENCE_LATITUDE = -30.05
+# Retângulo aproximado do município (cercas e ocorrências sintéticas)
+CITY_BOUNDS = {'lat': (-30.27, -29.93), 'lon': (-51.27, -51.01)}
+
+
+def project_to_meters(latitudes, longitudes):
+    """(x, y) em metros: projeção equiretangular fixa (mesma para cercas e ocorrências)"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return EARTH_RADIUS_M * lon * np.cos(np.radians(REFERENCE_LATITUDE)), EARTH_RADIUS_M * lat
+
+
+def load_geofences(path=DEFAULT_GEOFENCES_PATH):
+    """Lista de cercas do arquivo JSON ([] se não existir)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class GeofenceIndex:
+    """R-tree das cercas com verificação exata de círculos e polígonos"""
+
+    def __init__(self, fences):
+        import shapely
+
+        self.fences = fences
+        n = len(fences)
+        self.is_circle = np.array([fence.get('tipo', 'circulo') == 'circulo' for fence in fences], dtype=bool)
+        self.centers = np.zeros((n, 2))
+        self.radii = np.zeros(n)
+        self.polygons = np.full(n, None, dtype=object)
+        envelopes = []
+        for i, fence in enumerate(fences):
+            if self.is_circle[i]:
+                x, y = project_to_meters([fence['latitude']], [fence['longitude']])
+                self.centers[i] = x[0], y[0]
+                self.radii[i] = fence['raio_m']
+                envelopes.append(shapely.box(x[0] - fence['raio_m'], y[0] - fence['raio_m'],
+                                             x[0] + fence['raio_m'], y[0] + fence['raio_m']))
+            else:
+                coordinates = np.asarray(fence['coordenadas'], dtype=np.float64)
+                x, y = project_to_meters(coordinates[:, 0], coordinates[:, 1])
+                self.polygons[i] = shapely.polygons(np.column_stack([x, y]))
+                envelopes.append(self.polygons[i].envelope)
+        shapely.prepare(self.polygons[~self.is_circle])
+        self.tree = shapely.STRtree(envelopes)
+
+        # Filtro por tipo de crime: conjunto normalizado por cerca (None = todos)
+        self.tipos = [None if not fence.get('tipos') else {t.strip().lower() for t in fence['tipos']}
+                      for fence in fences]
+        self.filtered = np.array([allowed is not None for allowed in self.tipos], dtype=bool)
+
+    def __len__(self):
+        return len(self.fences)
+
+    def match(self, latitudes, longitudes, tipos=None):
+        """Pares (ocorrência, cerca) com a ocorrência dentro da cerca
+
+        Retorna dois arrays de índices; tipos (opcional) aplica o filtro de tipo de cada cerca.
+        """
+        import shapely
+
+        x, y = project_to_meters(latitudes, longitudes)
+        valid = np.isfinite(x) & np.isfinite(y)
+        points = shapely.points(np.where(valid, x, 0.0), np.where(valid, y, 0.0))
+        points[~valid] = None
+        incidents, fences = self.tree.query(points)
+
+        inside = np.zeros(len(incidents), dtype=bool)
+        circles = self.is_circle[fences]
+        dx = x[incidents[circles]] - self.centers[fences[circles], 0]
+        dy = y[incidents[circles]] - self.centers[fences[circles], 1]
+        inside[circles] = dx * dx + dy * dy <= self.radii[fences[circles]] ** 2
+        polygons = ~circles
+        inside[polygons] = shapely.contains_xy(self.polygons[fences[polygons]],
+                                               x[incidents[polygons]], y[incidents[polygons]])
+        incidents, fences = incidents[inside], fences[inside]
+
+        if tipos is not None and self.filtered.any():
+            keys = np.asarray([str(t).strip().lower() for t in tipos], dtype=object)
+            keep = ~self.filtered[fences]
+            check = np.flatnonzero(~keep)
+            keep[check] = [keys[incidents[k]] in self.tipos[fences[k]] for k in check]
+            incidents, fences = incidents[keep], fences[keep]
+        return incidents, fences
+
+    def notifications(self, incidents):
+        """Uma notificação por cerca atingida, com as ocorrências novas dentro dela"""
+        if incidents.empty or 'latitude' not in incidents.columns:
+            return []
+        crime_col = 'Descricao do Fato' if 'Descricao do Fato' in incidents.columns else 'tipo_crime'
+        tipos = incidents[crime_col].to_numpy() if crime_col in incidents.columns else None
+        rows, fences = self.match(pd.to_numeric(incidents['latitude'], errors='coerce'),
+                                  pd.to_numeric(incidents['longitude'], errors='coerce'), tipos)
+        if len(rows) == 0:
+            return []
+
+        # Contagens (cerca, tipo) de todos os pares em uma única agregação
+        pairs = pd.DataFrame({'cerca': fences, 'tipo': tipos[rows] if tipos is not None else ''})
+        by_type = pairs.groupby(['cerca', 'tipo'], sort=False).size().sort_values(ascending=False, kind='stable')
+        summaries = {}
+        for (fence, tipo), count in by_type.items():
+            summaries.setdefault(fence, []).append(f"{tipo} ({count})" if tipo else None)
+
+        created = datetime.now().isoformat()
+        totals = np.bincount(fences, minlength=len(self.fences))
+        notifications = []
+        for position in np.flatnonzero(totals):
+            fence = self.fences[position]
+            detail = [text for text in summaries[position] if text]
+            notifications.append({
+                'assinante': fence.get('assinante', fence.get('id')),
+                'cerca': fence.get('id'),
+                'regra': 'cerca',
+                'mensagem': f"{totals[position]} ocorrência(s) na área '{fence.get('nome', fence.get('id'))}'"
+                            + (f": {', '.join(detail)}" if detail else ''),
+                'contagem': int(totals[position]),
+                'criado_em': created
+            })
+        return notifications
+
+
+def synthetic_geofences(n, seed=42):
+    """Cercas aleatórias no município (70% círculos de 200 m a 2 km, 30% polígonos)"""
+    rng = np.random.default_rng(seed)
+    fences = []
+    for i in range(n):
+        lat, lon = rng.uniform(*CITY_BOUNDS['lat']), rng.uniform(*CITY_BOUNDS['lon'])
+        if rng.random() < 0.7:
+            fences.append({'id': f'c{i}', 'assinante': f'u{i}', 'tipo': 'circulo',
+                           'latitude': lat, 'longitude': lon, 'raio_m': float(rng.uniform(200, 2000))})
+        else:
+            angles = np.sort(rng.uniform(0, 2 * np.pi, int(rng.integers(3, 8))))
+            radius = rng.uniform(0.002, 0.015)
+            fences.append({'id': f'p{i}', 'assinante': f'u{i}', 'tipo': 'poligono',
+                           'coordenadas': [[lat + radius * np.sin(a), lon + radius * np.cos(a)] for a in angles]})
+    return fences
+
+
+if __name__ == '__main__':
+    n_fences = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_incidents = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    fences = load_geofences() or synthetic_geofences(n_fences)
+    rng = np.random.default_rng(0)
+    incidents = pd.DataFrame({
+        'latitude': rng.uniform(*CITY_BOUNDS['lat'], n_incidents),
+        'longitude': rng.uniform(*CITY_BOUNDS['lon'], n_incidents),
+        'tipo_crime': rng.choice(['Roubo', 'Furto', 'Ameaça'], n_incidents)
+    })
+
+    started = time.perf_counter()
+    index = GeofenceIndex(fences)
+    built = time.perf_counter()
+    notifications = index.notifications(incidents)
+    matched = time.perf_counter()
+
+    print(f"Cercas: {len(index)} (R-tree em {(built - started) * 1000:.0f} ms)")
+    print(f"Ocorrências: {len(incidents)} cruzadas em {(matched - built) * 1000:.0f} ms")
+    print(f"Cercas atingidas: {len(notifications)}")
+    for notification in notifications[:5]:
+        print(f"- {notification['assinante']}: {notification['mensagem']}")
@@ -0,0 +1,181 @@
+"""
+Metadados Geométricos dos Bairros
+Pré-computa centróides, bounding boxes, áreas, perímetros e a matriz de
+adjacência dos bairros a partir do arquivo oficial de limites (GeoJSON) e
+salva tudo em um artefato binário compacto (.npz), carregado em milissegundos.
+
+Uso:
+    python -m src.geometry [caminho_geojson] [caminho_saida]
+"""
+
+import os
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+GEOMETRY_SCHEMA_VERSION = 1
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_BOUNDARY_PATH = os.path.join(DATA_DIR, 'GeoJSON', 'bairros_poa.geojson')
+DEFAULT_METADATA_PATH = os.path.join(DATA_DIR, 'bairros_geometry.npz')
+
+# SIRGAS 2000 / UTM zona 22S - projeção métrica oficial de Porto Alegre
+METRIC_CRS = 'EPSG:31982'
+
+# Tolerância (em metros) para considerar dois bairros vizinhos
+ADJACENCY_TOLERANCE_M = 5.0
+
+# Grafias alternativas encontradas nos dados (chave normalizada -> chave oficial)
+NAME_ALIASES = {
+    'PASSODAREIA': 'PASSODAAREIA',
+    'CENTRO': 'CENTROHISTORICO',
+}
+
+
+def _display_name(name):
+    """Converte nome em caixa alta do arquivo de limites para a grafia usada nos dados"""
+    words = re.sub(r'\s+', ' ', str(name).strip()).title().split(' ')
+    particles = {'Da', 'Das', 'De', 'Do', 'Dos', 'E'}
+    return ' '.join(w.lower() if i > 0 and w in particles else w for i, w in enumerate(words))
+
+
+def normalize_bairro_name(name):
+    """Normaliza nome de bairro para comparação (sem acentos, espaços ou pontuação)"""
+    if name is None:
+        return ''
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    key = re.sub(r'[^A-Z0-9]', '', text.upper())
+    return NAME_ALIASES.get(key, key)
+
+
+class NeighborhoodGeometry:
+    """Acesso somente-leitura aos arrays pré-computados dos bairros"""
+
+    def __init__(self, arrays):
+        self.names = arrays['names']
+        self.keys = arrays['keys']
+        self.centroids = arrays['centroids']          # (n, 2) latitude, longitude
+        self.centroids_m = arrays['centroids_m']      # (n, 2) x, y em metros (UTM 22S)
+        self.bboxes = arrays['bboxes']                # (n, 4) lat_min, lon_min, lat_max, lon_max
+        self.areas_m2 = arrays['areas_m2']
+        self.perimeters_m = arrays['perimeters_m']
+        self.adjacency_indptr = arrays['adjacency_indptr']
+        self.adjacency_indices = arrays['adjacency_indices']
+        self._index = {key: i for i, key in enumerate(self.keys.tolist())}
+        self._adjacency = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def index_of(self, name):
+        """Retorna o índice do bairro ou -1 se não existir no arquivo de limites"""
+        return self._index.get(normalize_bairro_name(name), -1)
+
+    def indices_of(self, names):
+        """Versão vetorizada de index_of para uma sequência de nomes"""
+        return np.array([self.index_of(name) for name in names], dtype=np.int64)
+
+    def neighbors(self, index):
+        """Índices dos bairros vizinhos de um bairro"""
+        start, end = self.adjacency_indptr[index], self.adjacency_indptr[index + 1]
+        return self.adjacency_indices[start:end]
+
+    def adjacency_matrix(self):
+        """Matriz de adjacência esparsa (CSR, binária e simétrica)"""
+        if self._adjacency is None:
+            from scipy import sparse
+            n = len(self)
+            data = np.ones(len(self.adjacency_indices), dtype=np.float64)
+            self._adjacency = sparse.csr_matrix(
+                (data, self.adjacency_indices, self.adjacency_indptr), shape=(n, n)
+            )
+        return self._adjacency
+
+
+def _adjacency_csr(left, right, n):
+    """Monta índices CSR simétricos a partir de pares (i, j) de vizinhos"""
+    mask = left != right
+    rows = np.concatenate([left[mask], right[mask]])
+    cols = np.concatenate([right[mask], left[mask]])
+    pairs = np.unique(rows.astype(np.int64) * n + cols)
+    rows, cols = pairs // n, pairs % n
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols.astype(np.int32)
+
+
+def build_geometry_metadata(boundary_path=DEFAULT_BOUNDARY_PATH,
+                            output_path=DEFAULT_METADATA_PATH,
+                            name_field='NOME'):
+    """Deriva os metadados geométricos do arquivo de limites e salva o artefato binário"""
+    import geopandas as gpd
+
+    gdf = gpd.read_file(boundary_path)
+    if gdf.crs is None:
+        gdf = gdf.set_crs('EPSG:4326')
+
+    # Unificar partes com o mesmo nome (ex.: bairros com ilhas ou registros duplicados)
+    gdf['key'] = gdf[name_field].map(normalize_bairro_name)
+    gdf = gdf[gdf['key'] != ''].dissolve(by='key', aggfunc='first').reset_index()
+    gdf = gdf.sort_values('key').reset_index(drop=True)
+
+    metric = gdf.to_crs(METRIC_CRS)
+    geographic = gdf.to_crs('EPSG:4326')
+
+    centroids_m = metric.geometry.centroid
+    centroids = gpd.GeoSeries(centroids_m, crs=METRIC_CRS).to_crs('EPSG:4326')
+    bounds = geographic.geometry.bounds
+
+    left, right = metric.sindex.query(
+        metric.geometry.buffer(ADJACENCY_TOLERANCE_M), predicate='intersects'
+    )
+    indptr, indices = _adjacency_csr(np.asarray(left), np.asarray(right), len(gdf))
+
+    arrays = {
+        'schema_version': np.int32(GEOMETRY_SCHEMA_VERSION),
+        'names': np.array([_display_name(name) for name in gdf[name_field]]),
+        'keys': np.array(gdf['key'].tolist()),
+        'centroids': np.column_stack([centroids.y, centroids.x]).astype(np.float64),
+        'centroids_m': np.column_stack([centroids_m.x, centroids_m.y]).astype(np.float64),
+        'bboxes': bounds[['miny', 'minx', 'maxy', 'maxx']].to_numpy(dtype=np.float64),
+        'areas_m2': metric.geometry.area.to_numpy(dtype=np.float64),
+        'perimeters_m': metric.geometry.length.to_numpy(dtype=np.float64),
+        'adjacency_indptr': indptr,
+        'adjacency_indices': indices,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    np.savez(output_path, **arrays)
+    return output_path
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path, mtime):
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    version = int(arrays.pop('schema_version'))
+    if version != GEOMETRY_SCHEMA_VERSION:
+        raise ValueError(
+            f"Artefato geométrico {path} na versão {version}, esperado {GEOMETRY_SCHEMA_VERSION}. "
+            f"Execute 'python -m src.geometry' para reconstruí-lo."
+        )
+    return NeighborhoodGeometry(arrays)
+
+
+def load_geometry_metadata(path=DEFAULT_METADATA_PATH):
+    """Carrega o artefato geométrico (cacheado enquanto o arquivo não mudar)"""
+    return _load_cached(path, os.path.getmtime(path))
+
+
+if __name__ == '__main__':
+    boundary = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BOUNDARY_PATH
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_METADATA_PATH
+    build_geometry_metadata(boundary, output)
+    geometry = load_geometry_metadata(output)
+    print(f"Metadados geométricos gerados: {output}")
+    print(f"- Bairros: {len(geometry)}")
+    print(f"- Pares de vizinhos: {len(geometry.adjacency_indices) // 2}")
@@ -0,0 +1,218 @@
+"""
+Top-k Aproximado em Fluxos (Space-Saving + Count-Min)
+Rankings de bairros e tipos de crime mantidos em memória fixa sobre fluxos sem
+fim, sem reagregar o histórico:
+- SpaceSaving: guarda no máximo `capacity` chaves candidatas; uma chave nova
+  substitui a de menor contagem e herda essa contagem como erro máximo
+- CountMinSketch: matriz (profundidade x largura) de contadores com hashes
+  independentes; a estimativa (mínimo das linhas) nunca subestima
+- WindowedHeavyHitters: um resumo Space-Saving e uma tabela Count-Min por
+  intervalo da janela deslizante; candidatos vêm dos resumos e as contagens
+  da soma das tabelas da janela
+
+Cada classe tem a variante exata (ExactCounter, exact=True) com a mesma
+interface, para verificar as aproximações.
+
+Uso:
+    python -m src.heavy_hitters [caminho_csv] [k]
+"""
+
+import heapq
+import os
+import sys
+import zlib
+from collections import Counter
+from itertools import count
+from operator import itemgetter
+
+import numpy as np
+
+# Acima do número de bairros da cidade: o ranking de bairros fica exato e o de (bairro, tipo) aproximado
+DEFAULT_CAPACITY = 256
+DEFAULT_WIDTH = 2048
+DEFAULT_DEPTH = 4
+# Primo de Mersenne dos hashes universais (a*h + b) mod p: produtos cabem em int64
+_HASH_PRIME = (1 << 31) - 1
+
+
+def top_k(counts, k):
+    """Top-k exato de um dicionário chave -> contagem, em O(n log k) (mesma ordem de sorted)"""
+    return heapq.nlargest(k, counts.items(), key=itemgetter(1))
+
+
+class ExactCounter:
+    """Contagens exatas com a interface do SpaceSaving (memória cresce com as chaves)"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, key, amount=1):
+        self.counts[key] += amount
+
+    def estimate(self, key):
+        return self.counts.get(key, 0)
+
+    def top(self, k):
+        return top_k(self.counts, k)
+
+    def keys(self):
+        return self.counts.keys()
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class SpaceSaving:
+    """Top-k aproximado com no máximo `capacity` contadores (Metwally et al.)
+
+    Toda chave com frequência > total / capacity está garantidamente no resumo;
+    a contagem de uma chave superestima a real em no máximo errors[chave].
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._heap = []             # (contagem, ordem, chave); entradas desatualizadas são descartadas ao sair
+        self._order = count()
+
+    def _push(self, key):
+        heapq.heappush(self._heap, (self.counts[key], next(self._order), key))
+        if len(self._heap) > 4 * self.capacity:
+            # Limita a memória do heap preguiçoso reconstruindo-o só com as entradas atuais
+            self._heap = [(c, next(self._order), k) for k, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_minimum(self):
+        while True:
+            value, _, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == value:
+                return key, value
+
+    def add(self, key, amount=1):
+        if key in self.counts:
+            self.counts[key] += amount
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = amount
+            self.errors[key] = 0
+        else:
+            victim, minimum = self._pop_minimum()
+            del self.counts[victim], self.errors[victim]
+            self.counts[key] = minimum + amount
+            self.errors[key] = minimum
+        self._push(key)
+
+    def estimate(self, key):
+        return self.counts.get(key, 0)
+
+    def top(self, k):
+        return top_k(self.counts, k)
+
+    def keys(self):
+        return self.counts.keys()
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class CountMinSketch:
+    """Contagens aproximadas de qualquer chave em (depth x width) contadores"""
+
+    def __init__(self, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH, seed=0):
+        rng = np.random.default_rng(seed)
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._a = rng.integers(1, _HASH_PRIME, depth, dtype=np.int64)
+        self._b = rng.integers(0, _HASH_PRIME, depth, dtype=np.int64)
+        self.rows = np.arange(depth)
+
+    def columns(self, key):
+        """Coluna da chave em cada linha (hash estável entre processos)"""
+        h = zlib.crc32(repr(key).encode('utf-8'))
+        return (self._a * h + self._b) % _HASH_PRIME % self.width
+
+    def add(self, key, amount=1):
+        self.table[self.rows, self.columns(key)] += amount
+
+    def estimate(self, key):
+        return int(self.table[self.rows, self.columns(key)].min())
+
+
+class WindowedHeavyHitters:
+    """Top-k dos últimos `n_buckets` intervalos em memória fixa (exact=True para verificação)"""
+
+    def __init__(self, n_buckets, capacity=DEFAULT_CAPACITY, width=DEFAULT_WIDTH,
+                 depth=DEFAULT_DEPTH, exact=False, seed=0):
+        self.n_buckets = n_buckets
+        self.capacity = capacity
+        self.exact = exact
+        self.slot_buckets = [None] * n_buckets
+        self.summaries = [self._new_summary() for _ in range(n_buckets)]
+        self.now = None
+        if not exact:
+            self.sketch = CountMinSketch(width, depth, seed)
+            self.slot_tables = np.zeros((n_buckets,) + self.sketch.table.shape, dtype=np.int64)
+
+    def _new_summary(self):
+        return ExactCounter() if self.exact else SpaceSaving(self.capacity)
+
+    def _reset_slot(self, slot, bucket=None):
+        self.slot_buckets[slot] = bucket
+        self.summaries[slot] = self._new_summary()
+        if not self.exact:
+            # A tabela da janela é a soma das tabelas dos intervalos: retirar um intervalo é exato
+            self.sketch.table -= self.slot_tables[slot]
+            self.slot_tables[slot] = 0
+
+    def _advance(self, bucket):
+        self.now = bucket
+        for slot, slot_bucket in enumerate(self.slot_buckets):
+            if slot_bucket is not None and slot_bucket <= bucket - self.n_buckets:
+                self._reset_slot(slot)
+
+    def add(self, key, bucket, amount=1):
+        """Soma `amount` à chave no intervalo `bucket`; retorna False se o evento já saiu da janela"""
+        if self.now is None or bucket > self.now:
+            self._advance(bucket)
+        if bucket <= self.now - self.n_buckets:
+            return False
+        slot = bucket % self.n_buckets
+        if self.slot_buckets[slot] != bucket:
+            self._reset_slot(slot, bucket)
+        self.summaries[slot].add(key, amount)
+        if not self.exact:
+            columns = self.sketch.columns(key)
+            self.sketch.table[self.sketch.rows, columns] += amount
+            self.slot_tables[slot, self.sketch.rows, columns] += amount
+        return True
+
+    def estimate(self, key):
+        """Contagem da chave na janela (exata ou limite superior do Count-Min)"""
+        if self.exact:
+            return sum(summary.estimate(key) for summary in self.summaries)
+        return self.sketch.estimate(key)
+
+    def top(self, k):
+        """[(chave, contagem)] das k chaves mais frequentes na janela"""
+        candidates = set()
+        for summary in self.summaries:
+            candidates.update(summary.keys())
+        return top_k({key: self.estimate(key) for key in candidates}, k)
+
+
+if __name__ == '__main__':
+    import pandas as pd
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    df = pd.read_csv(csv_path)
+
+    approximate, exact = SpaceSaving(), ExactCounter()
+    for bairro in df['bairro'].astype(str):
+        approximate.add(bairro)
+        exact.add(bairro)
+    print(f"Top {k} bairros ({len(df)} ocorrências, {approximate.capacity} contadores):")
+    for bairro, estimate in approximate.top(k):
+        print(f"- {bairro}: {estimate} (exato: {exact.estimate(bairro)}, erro máx.: {approximate.errors[bairro]})")
+    overlap = {b for b, _ in approximate.top(k)} & {b for b, _ in exact.top(k)}
+    print(f"Coincidência com o top {k} exato: {len(overlap)}/{k}")
@@ -0,0 +1,153 @@
+"""
+Análise de Repetição Próxima (Near-Repeat / Teste de Knox)
+Mede se ocorrências georreferenciadas próximas no espaço (X metros) também
+acontecem próximas no tempo (Y dias) com frequência maior do que o acaso.
+
+Os pares candidatos vêm de uma KD-tree (apenas pares dentro da maior faixa de
+distância, sem enumeração O(n²)). Como as permutações de Knox embaralham só as
+datas, o conjunto de pares espaciais é calculado uma vez e cada permutação
+apenas reclassifica as diferenças de tempo desses pares.
+
+Uso:
+    python -m src.near_repeat [caminho_csv] [n_permutacoes]
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6371000.0
+
+# Limites superiores (inclusivos) das faixas
+DEFAULT_DISTANCE_BANDS_M = (0, 100, 200, 400, 800)
+DEFAULT_TIME_BANDS_DAYS = (7, 14, 21, 28)
+DEFAULT_PERMUTATIONS = 999
+# Número de lotes de permutações, independente de n_jobs (p-valores reprodutíveis)
+N_BATCHES = 32
+
+
+def project_to_meters(latitudes, longitudes):
+    """Projeção equiretangular local (suficiente na escala de um município)"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    lat0 = lat.mean() if len(lat) else 0.0
+    return np.column_stack([EARTH_RADIUS_M * lon * np.cos(lat0), EARTH_RADIUS_M * lat])
+
+
+def _band_labels(edges, unit):
+    labels, lower = [], 0
+    for upper in edges:
+        labels.append(f"{upper}{unit}" if upper == lower else f"{lower}-{upper}{unit}")
+        lower = upper + 1
+    return labels
+
+
+def _spatial_pairs(points, distance_bands):
+    """Pares de ocorrências dentro da maior faixa de distância e a faixa de cada par"""
+    from scipy.spatial import cKDTree
+
+    tree = cKDTree(points)
+    pairs = tree.query_pairs(r=float(distance_bands[-1]), output_type='ndarray')
+    distances = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+    band = np.searchsorted(np.asarray(distance_bands, dtype=np.float64), distances)
+    return pairs[:, 0], pairs[:, 1], np.minimum(band, len(distance_bands) - 1)
+
+
+def _knox_table(days, first, second, distance_band, time_bands, n_distance):
+    """Contagem de pares por (faixa de distância, faixa de tempo)"""
+    gaps = np.abs(days[first] - days[second])
+    time_band = np.searchsorted(np.asarray(time_bands), gaps)
+    inside = time_band < len(time_bands)
+    flat = distance_band[inside] * len(time_bands) + time_band[inside]
+    return np.bincount(flat, minlength=n_distance * len(time_bands)).reshape(n_distance, len(time_bands))
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(days, first, second, distance_band, time_bands, n_distance):
+    _WORKER_STATE.update(days=days, first=first, second=second, distance_band=distance_band,
+                         time_bands=time_bands, n_distance=n_distance)
+
+
+def _permutation_batch(seed, n_permutations):
+    """Tabelas de Knox para um lote de permutações das datas"""
+    state = _WORKER_STATE
+    rng = np.random.default_rng(seed)
+    tables = np.empty((n_permutations, state['n_distance'], len(state['time_bands'])), dtype=np.int64)
+    for i in range(n_permutations):
+        tables[i] = _knox_table(rng.permutation(state['days']), state['first'], state['second'],
+                                state['distance_band'], state['time_bands'], state['n_distance'])
+    return tables
+
+
+def near_repeat_analysis(latitudes, longitudes, dates,
+                         distance_bands=DEFAULT_DISTANCE_BANDS_M,
+                         time_bands=DEFAULT_TIME_BANDS_DAYS,
+                         n_permutations=DEFAULT_PERMUTATIONS,
+                         n_jobs=None,
+                         seed=42):
+    """Executa o teste de Knox e retorna a tabela (formato longo) para o mapa de calor
+
+    Colunas: distancia, tempo, observado, esperado, razao_knox, p_valor
+    """
+    points = project_to_meters(latitudes, longitudes)
+    days = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int64)
+    n_distance = len(distance_bands)
+
+    first, second, distance_band = _spatial_pairs(points, distance_bands)
+    observed = _knox_table(days, first, second, distance_band, time_bands, n_distance)
+
+    init_args = (days, first, second, distance_band, tuple(time_bands), n_distance)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_batches = max(1, min(N_BATCHES, n_permutations))
+    sizes = [n_permutations // n_batches + (1 if i < n_permutations % n_batches else 0) for i in range(n_batches)]
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        simulated = np.concatenate([_permutation_batch(s, size) for s, size in zip(seeds, sizes)])
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=init_args) as pool:
+            simulated = np.concatenate(list(pool.map(_permutation_batch, seeds, sizes)))
+
+    expected = simulated.mean(axis=0)
+    p_values = (1 + (simulated >= observed).sum(axis=0)) / (1 + len(simulated))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(expected > 0, observed / expected, np.nan)
+
+    distance_labels = _band_labels(distance_bands, 'm')
+    time_labels = _band_labels(time_bands, 'd')
+    rows = []
+    for d, distance_label in enumerate(distance_labels):
+        for t, time_label in enumerate(time_labels):
+            rows.append({
+                'distancia': distance_label,
+                'tempo': time_label,
+                'observado': int(observed[d, t]),
+                'esperado': float(expected[d, t]),
+                'razao_knox': float(ratio[d, t]),
+                'p_valor': float(p_values[d, t])
+            })
+    table = pd.DataFrame(rows)
+    table['distancia'] = pd.Categorical(table['distancia'], categories=distance_labels, ordered=True)
+    table['tempo'] = pd.Categorical(table['tempo'], categories=time_labels, ordered=True)
+    return table
+
+
+def near_repeat_from_dataframe(df, **kwargs):
+    """Atalho para DataFrames do projeto (usa apenas ocorrências georreferenciadas)"""
+    date_col = 'Data Registro' if 'Data Registro' in df.columns else 'data'
+    geocoded = df.dropna(subset=['latitude', 'longitude'])
+    return near_repeat_analysis(geocoded['latitude'], geocoded['longitude'], geocoded[date_col], **kwargs)
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    permutations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PERMUTATIONS
+
+    table = near_repeat_from_dataframe(pd.read_csv(csv_path), n_permutations=permutations)
+    print(table.pivot(index='distancia', columns='tempo', values='razao_knox').round(2))
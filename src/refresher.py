@@ -0,0 +1,218 @@
+"""
+Atualização dos Dados em Segundo Plano (troca atômica de versão)
+Uma thread observa os arquivos de origem (mtime + tamanho) e, quando mudam,
+reconstrói os dados e todas as estruturas derivadas fora das requisições.
+A nova versão só fica visível quando está completa: o identificador aponta
+para ela em uma única atribuição de referência. Quem já pegou a versão
+anterior continua com ela até o fim da execução; nenhuma execução do painel
+espera uma recarga (exceto a primeira, quando ainda não há versão alguma).
+
+Falhas na reconstrução mantêm a versão atual e ficam em `last_error`; a mesma
+origem não é tentada de novo até mudar outra vez. Tarefas que devem rodar uma
+vez por versão (ex.: notificações) entram como `on_swap`, chamado na thread do
+atualizador logo após cada troca.
+
+Artefatos em disco (tensor, agregações, grade de risco) de cada versão vão
+para um diretório próprio em data/versions, nunca sobrescrito. A versão é
+publicada trocando o ponteiro data/versions/CURRENT em um único os.replace;
+leitores em outros processos nunca combinam arquivos de versões diferentes, e
+nenhum arquivo ainda mapeado em memória é substituído (o que falha no Windows).
+
+Uso:
+    python -m src.refresher [caminho_csv] [intervalo_segundos]
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from src.geometry import DATA_DIR
+
+DEFAULT_REFRESH_INTERVAL_S = 30.0
+DEFAULT_VERSIONS_DIR = os.path.join(DATA_DIR, 'versions')
+CURRENT_POINTER = 'CURRENT'
+# Diretórios de versões mantidos no disco (além do publicado)
+DEFAULT_KEEP_VERSIONS = 3
+
+
+def source_fingerprint(paths):
+    """(caminho, mtime_ns, tamanho) de cada arquivo de origem (None se ausente)"""
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+
+def new_version_directory(fingerprint=None, root=DEFAULT_VERSIONS_DIR):
+    """Diretório novo e exclusivo para os artefatos de uma versão (ainda não publicado)"""
+    digest = hashlib.sha256(repr(fingerprint).encode('utf-8')).hexdigest()[:10]
+    os.makedirs(root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f"{datetime.now():%Y%m%d%H%M%S}-{digest}-", dir=root)
+
+
+def publish_version_directory(directory, root=DEFAULT_VERSIONS_DIR):
+    """Aponta CURRENT para o diretório da versão com uma única troca atômica"""
+    pointer = os.path.join(root, CURRENT_POINTER)
+    tmp_path = f"{pointer}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(directory))
+    os.replace(tmp_path, pointer)
+    return directory
+
+
+def current_version_directory(root=DEFAULT_VERSIONS_DIR):
+    """Diretório da versão publicada (None se nenhuma foi publicada)"""
+    try:
+        with open(os.path.join(root, CURRENT_POINTER), 'r', encoding='utf-8') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(root, name) if name else None
+
+
+def prune_version_directories(root=DEFAULT_VERSIONS_DIR, keep=DEFAULT_KEEP_VERSIONS, protect=()):
+    """Remove os diretórios de versões mais antigos, exceto o publicado e os protegidos
+
+    Arquivos ainda mapeados por algum leitor (Windows) impedem a remoção; o
+    diretório fica para a próxima limpeza.
+    """
+    if not os.path.isdir(root):
+        return
+    current = current_version_directory(root)
+    keep_paths = {os.path.abspath(path) for path in (current, *protect) if path}
+    directories = sorted((entry for entry in os.scandir(root) if entry.is_dir()),
+                         key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in directories[keep:]:
+        if os.path.abspath(entry.path) not in keep_paths:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class DatasetVersion:
+    """Uma versão completa e imutável dos dados e das estruturas derivadas"""
+
+    def __init__(self, number, fingerprint, data, build_seconds):
+        self.number = number
+        self.fingerprint = fingerprint
+        self.data = data
+        self.build_seconds = build_seconds
+        self.loaded_at = datetime.now()
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
+class DatasetHandle:
+    """Referência para a versão atual; leitura sem bloqueio, troca atômica"""
+
+    def __init__(self):
+        self._version = None
+        self._ready = threading.Event()
+
+    def current(self):
+        return self._version
+
+    def swap(self, version):
+        self._version = version
+        self._ready.set()
+
+    def wait(self, timeout=None):
+        """Versão atual, esperando a primeira ficar pronta se necessário"""
+        self._ready.wait(timeout)
+        return self._version
+
+
+class BackgroundRefresher:
+    """Reconstrói os dados quando os arquivos de origem mudam e troca a versão do identificador"""
+
+    def __init__(self, paths, build, interval=DEFAULT_REFRESH_INTERVAL_S, handle=None, on_swap=None):
+        self.paths = list(paths)
+        self.build = build
+        self.interval = interval
+        self.handle = handle or DatasetHandle()
+        self.on_swap = on_swap
+        self.last_error = None
+        self._failed_fingerprint = None
+        self._lock = threading.Lock()        # uma reconstrução (e um on_swap) por vez
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self, force=False):
+        """Reconstrói se a origem mudou desde a versão atual; retorna True se trocou a versão"""
+        with self._lock:
+            return self._refresh(force)
+
+    def _refresh(self, force):
+        current = self.handle.current()
+        fingerprint = source_fingerprint(self.paths)
+        if not force and current is not None and fingerprint in (current.fingerprint, self._failed_fingerprint):
+            return False
+        started = time.perf_counter()
+        try:
+            data = self.build()
+        except Exception as exc:  # mantém a versão atual; o erro fica visível em last_error
+            self.last_error = exc
+            self._failed_fingerprint = fingerprint
+            if current is None:
+                # Sem versão anterior: libera quem espera a primeira carga
+                self.handle.swap(DatasetVersion(0, None, {'erro': str(exc)}, time.perf_counter() - started))
+            return False
+        self.last_error = self._failed_fingerprint = None
+        number = current.number + 1 if current is not None else 1
+        version = DatasetVersion(number, fingerprint, data, time.perf_counter() - started)
+        self.handle.swap(version)
+        if self.on_swap is not None:
+            try:
+                self.on_swap(version)
+            except Exception as exc:  # a versão nova continua valendo
+                self.last_error = exc
+        return True
+
+    def _run(self):
+        self.refresh()
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='dataset-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+if __name__ == '__main__':
+    import pandas as pd
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    refresher = BackgroundRefresher([csv_path], lambda: {'df': pd.read_csv(csv_path)}, interval).start()
+    print(f"Observando {csv_path} (Ctrl+C para sair)")
+    seen = None
+    try:
+        while True:
+            version = refresher.handle.wait()
+            if version is not seen:
+                seen = version
+                print(f"Versão {version.number}: {len(version.get('df', []))} linhas "
+                      f"(construída em {version.build_seconds * 1000:.0f} ms)")
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        refresher.stop()
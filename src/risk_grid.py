@@ -0,0 +1,299 @@
+"""
+Grade de Risco por Hora e Pontuação de Trajetos
+Pré-computa um raster (célula x hora) de risco a partir das ocorrências e o
+salva como .npy + cabeçalho .json. O raster é aberto com memory-map, então
+vários processos do painel compartilham a mesma cópia em memória.
+
+Um trajeto (polilinha de coordenadas + horário de partida) é reamostrado a
+cada poucos metros; cada amostra consulta a célula e a hora em que será
+atingida. Lotes de trajetos são avaliados de uma vez, sem laços por ponto.
+
+Uso:
+    python -m src.risk_grid [caminho_csv] [tamanho_celula_m]
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.geometry import DATA_DIR
+
+RISK_GRID_SCHEMA_VERSION = 1
+
+DEFAULT_RISK_GRID_PATH = os.path.join(DATA_DIR, 'risk_grid.npy')
+DEFAULT_CELL_SIZE_M = 250.0
+DEFAULT_SMOOTHING_CELLS = 2.0
+DEFAULT_STEP_M = 25.0
+DEFAULT_WALKING_SPEED_KMH = 5.0
+
+# Limites aproximados de Porto Alegre (lat_min, lon_min, lat_max, lon_max)
+DEFAULT_BOUNDS = (-30.27, -51.31, -29.93, -51.01)
+
+# Distribuição horária de referência (mesma usada para simular a hora no painel)
+DEFAULT_HOURLY_PROFILE = np.array([
+    0.02, 0.01, 0.01, 0.01, 0.02, 0.03, 0.04, 0.05,
+    0.06, 0.07, 0.08, 0.09, 0.10, 0.11, 0.12, 0.11,
+    0.10, 0.09, 0.08, 0.07, 0.06, 0.05, 0.04, 0.03
+])
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+def _header_path(grid_path):
+    return os.path.splitext(grid_path)[0] + '.json'
+
+
+def _incident_points(df, geometry):
+    """Coordenadas das ocorrências (centróide do bairro quando não georreferenciadas)"""
+    bairro_col = 'Bairro' if 'Bairro' in df.columns else 'bairro'
+    if 'latitude' in df.columns:
+        lat = df['latitude'].to_numpy(dtype=np.float64)
+        lon = df['longitude'].to_numpy(dtype=np.float64)
+    else:
+        lat = np.full(len(df), np.nan)
+        lon = np.full(len(df), np.nan)
+
+    missing = np.isnan(lat) | np.isnan(lon)
+    if geometry is not None and missing.any():
+        names, inverse = np.unique(df.loc[missing, bairro_col].astype(str).to_numpy(), return_inverse=True)
+        index = geometry.indices_of(names)[inverse]
+        known = index >= 0
+        rows = np.flatnonzero(missing)[known]
+        lat[rows] = geometry.centroids[index[known], 0]
+        lon[rows] = geometry.centroids[index[known], 1]
+
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    return lat[valid], lon[valid], valid
+
+
+def _hourly_profile(df, valid):
+    """Peso relativo de cada hora (1.0 = hora mais crítica)"""
+    if 'Hora' in df.columns:
+        hours = df['Hora'].to_numpy()[valid].astype(np.int64) % 24
+        profile = np.bincount(hours, minlength=24).astype(np.float64)
+    else:
+        profile = DEFAULT_HOURLY_PROFILE.copy()
+    return profile / profile.max() if profile.max() > 0 else np.ones(24)
+
+
+def build_risk_grid(df, geometry=None,
+                    output_path=DEFAULT_RISK_GRID_PATH,
+                    cell_size_m=DEFAULT_CELL_SIZE_M,
+                    smoothing_cells=DEFAULT_SMOOTHING_CELLS):
+    """Gera o raster (linha, coluna, hora) de risco em [0, 1] e salva no disco"""
+    from scipy.ndimage import gaussian_filter
+
+    if geometry is not None and len(geometry):
+        lat_min, lon_min = geometry.bboxes[:, 0].min(), geometry.bboxes[:, 1].min()
+        lat_max, lon_max = geometry.bboxes[:, 2].max(), geometry.bboxes[:, 3].max()
+    else:
+        lat_min, lon_min, lat_max, lon_max = DEFAULT_BOUNDS
+
+    cell_lat = cell_size_m / METERS_PER_DEGREE_LAT
+    cell_lon = cell_size_m / (METERS_PER_DEGREE_LAT * np.cos(np.radians((lat_min + lat_max) / 2)))
+    n_rows = int(np.ceil((lat_max - lat_min) / cell_lat)) + 1
+    n_cols = int(np.ceil((lon_max - lon_min) / cell_lon)) + 1
+
+    lat, lon, valid = _incident_points(df, geometry)
+    rows = np.clip(((lat - lat_min) / cell_lat).astype(np.int64), 0, n_rows - 1)
+    cols = np.clip(((lon - lon_min) / cell_lon).astype(np.int64), 0, n_cols - 1)
+    density = np.bincount(rows * n_cols + cols, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+    density = gaussian_filter(density.astype(np.float64), sigma=smoothing_cells)
+    if density.max() > 0:
+        density /= density.max()
+
+    # Risco da hora h na célula = densidade espacial x peso da hora
+    raster = (density[:, :, None] * _hourly_profile(df, valid)[None, None, :]).astype(np.float32)
+
+    # Escrita atômica: processos com a versão anterior mapeada continuam válidos
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + '.tmp.npy'
+    np.save(tmp_path, raster)
+    header = {
+        'schema_version': RISK_GRID_SCHEMA_VERSION,
+        'origin': [float(lat_min), float(lon_min)],
+        'cell_size_deg': [float(cell_lat), float(cell_lon)],
+        'cell_size_m': float(cell_size_m),
+        'shape': list(raster.shape),
+        'incidents': int(valid.sum()),
+        'generated_at': datetime.now().isoformat()
+    }
+    with open(_header_path(output_path) + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+    os.replace(_header_path(output_path) + '.tmp', _header_path(output_path))
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class RiskGrid:
+    """Raster de risco (memory-mapped) com consulta vetorizada por coordenada"""
+
+    def __init__(self, values, header):
+        self.values = values                          # (linhas, colunas, 24) float32
+        self.origin = np.asarray(header['origin'])    # lat_min, lon_min
+        self.cell_size_deg = np.asarray(header['cell_size_deg'])
+        self.header = header
+
+    @property
+    def shape(self):
+        return self.values.shape[:2]
+
+    def cells_of(self, latitudes, longitudes):
+        """Linha, coluna e máscara de pontos dentro da grade"""
+        rows = np.floor((np.asarray(latitudes) - self.origin[0]) / self.cell_size_deg[0]).astype(np.int64)
+        cols = np.floor((np.asarray(longitudes) - self.origin[1]) / self.cell_size_deg[1]).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        return np.where(inside, rows, 0), np.where(inside, cols, 0), inside
+
+    def risk_at(self, latitudes, longitudes, hours):
+        """Risco em cada ponto/hora (0 fora da grade)"""
+        rows, cols, inside = self.cells_of(latitudes, longitudes)
+        hours = np.asarray(hours, dtype=np.int64) % 24
+        return np.where(inside, self.values[rows, cols, hours], 0.0)
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path, mtime):
+    with open(_header_path(path), 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    if header.get('schema_version') != RISK_GRID_SCHEMA_VERSION:
+        raise ValueError(
+            f"Grade de risco {path} na versão {header.get('schema_version')}, "
+            f"esperado {RISK_GRID_SCHEMA_VERSION}. Execute 'python -m src.risk_grid' para reconstruí-la."
+        )
+    return RiskGrid(np.load(path, mmap_mode='r'), header)
+
+
+def load_risk_grid(path=DEFAULT_RISK_GRID_PATH):
+    """Abre a grade de risco com memory-map (cacheada enquanto o arquivo não mudar)"""
+    return _load_cached(path, os.path.getmtime(path))
+
+
+def _departure_hours(departures, n_routes):
+    """Converte horários de partida (datetime, Timestamp ou hora decimal) em horas decimais"""
+    if departures is None:
+        now = datetime.now()
+        return np.full(n_routes, now.hour + now.minute / 60)
+    if np.isscalar(departures) or isinstance(departures, datetime):
+        departures = [departures] * n_routes
+    hours = []
+    for departure in departures:
+        if isinstance(departure, datetime):
+            hours.append(departure.hour + departure.minute / 60 + departure.second / 3600)
+        else:
+            hours.append(float(departure))
+    return np.asarray(hours, dtype=np.float64)
+
+
+def score_routes(routes, departures=None, grid=None,
+                 speed_kmh=DEFAULT_WALKING_SPEED_KMH,
+                 step_m=DEFAULT_STEP_M):
+    """Pontua um lote de trajetos
+
+    routes: sequência de polilinhas, cada uma um array (k, 2) de (latitude, longitude)
+    departures: horário de partida por trajeto (ou um único para todos); None = agora
+    Retorna DataFrame com risco acumulado (risco x km), pico e sua localização/hora.
+    """
+    grid = grid or load_risk_grid()
+    routes = [np.asarray(route, dtype=np.float64).reshape(-1, 2) for route in routes]
+    if not routes or any(len(route) == 0 for route in routes):
+        raise ValueError("Todo trajeto precisa de ao menos um ponto (latitude, longitude)")
+    n_routes = len(routes)
+    start_hours = _departure_hours(departures, n_routes)
+
+    # Vértices de todos os trajetos concatenados; segmentos entre trajetos são descartados
+    vertices = np.concatenate(routes)
+    route_of_vertex = np.repeat(np.arange(n_routes), [len(r) for r in routes])
+    lat_scale = METERS_PER_DEGREE_LAT
+    lon_scale = METERS_PER_DEGREE_LAT * np.cos(np.radians(vertices[:, 0]))
+    segment = np.hypot(np.diff(vertices[:, 0]) * lat_scale, np.diff(vertices[:, 1]) * lon_scale[:-1])
+    segment[route_of_vertex[1:] != route_of_vertex[:-1]] = 0.0
+    distance = np.concatenate([[0.0], np.cumsum(segment)])
+
+    first_vertex = np.concatenate([[0], np.cumsum([len(r) for r in routes])[:-1]])
+    route_start = distance[first_vertex]
+    route_length = np.bincount(route_of_vertex[1:], weights=segment, minlength=n_routes)
+
+    # Amostras a cada step_m metros (ao menos o ponto inicial de cada trajeto)
+    n_samples = np.floor(route_length / step_m).astype(np.int64) + 1
+    route_of_sample = np.repeat(np.arange(n_routes), n_samples)
+    offset = np.arange(n_samples.sum()) - np.repeat(np.cumsum(n_samples) - n_samples, n_samples)
+    along = np.minimum(offset * step_m, route_length[route_of_sample])
+
+    # Interpolação dentro do próprio trajeto: o segmento é buscado na distância acumulada
+    # e limitado aos vértices do trajeto (nas fronteiras a distância global se repete)
+    position = route_start[route_of_sample] + along
+    first = first_vertex[route_of_sample]
+    last = first + np.array([len(r) for r in routes])[route_of_sample] - 1
+    k = np.clip(np.searchsorted(distance, position, side='right') - 1, first, np.maximum(last - 1, first))
+    k_next = np.minimum(k + 1, last)
+    length = distance[k_next] - distance[k]
+    fraction = np.clip(np.divide(position - distance[k], length, out=np.zeros_like(length), where=length > 0), 0.0, 1.0)
+    sample_lat = vertices[k, 0] + fraction * (vertices[k_next, 0] - vertices[k, 0])
+    sample_lon = vertices[k, 1] + fraction * (vertices[k_next, 1] - vertices[k, 1])
+    sample_hour = start_hours[route_of_sample] + along / (speed_kmh * 1000.0)
+
+    risk = grid.risk_at(sample_lat, sample_lon, np.floor(sample_hour))
+    weight = np.diff(np.concatenate([along, [0.0]]))
+    weight = np.where(np.r_[route_of_sample[1:] == route_of_sample[:-1], False], weight, 0.0)
+
+    cumulative = np.bincount(route_of_sample, weights=risk * weight / 1000.0, minlength=n_routes)
+    sample_start = np.cumsum(n_samples) - n_samples
+    peak = np.maximum.reduceat(risk, sample_start)
+    order = np.lexsort((-risk, route_of_sample))
+    peak_sample = order[sample_start]
+
+    return pd.DataFrame({
+        'distancia_m': route_length,
+        'duracao_min': route_length / (speed_kmh * 1000.0) * 60,
+        'risco_acumulado': cumulative,
+        'risco_medio': np.divide(cumulative * 1000.0, route_length,
+                                 out=risk[sample_start].astype(np.float64), where=route_length > 0),
+        'risco_pico': peak,
+        'pico_latitude': sample_lat[peak_sample],
+        'pico_longitude': sample_lon[peak_sample],
+        'pico_hora': np.floor(sample_hour[peak_sample]).astype(np.int64) % 24
+    })
+
+
+def score_route(route, departure=None, grid=None, **kwargs):
+    """Atalho para um único trajeto (retorna dicionário)"""
+    return score_routes([route], None if departure is None else [departure], grid, **kwargs).iloc[0].to_dict()
+
+
+if __name__ == '__main__':
+    from src.geometry import load_geometry_metadata
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    cell_size = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CELL_SIZE_M
+
+    try:
+        geometry = load_geometry_metadata()
+    except FileNotFoundError:
+        geometry = None
+        print("⚠️ Metadados geométricos ausentes: usando apenas ocorrências georreferenciadas")
+
+    output = build_risk_grid(pd.read_csv(csv_path), geometry, cell_size_m=cell_size)
+    grid = load_risk_grid(output)
+    print(f"Grade de risco gerada: {output}")
+    print(f"- Células: {grid.shape[0]} x {grid.shape[1]} ({grid.header['cell_size_m']:.0f} m), 24 horas")
+    print(f"- Ocorrências posicionadas: {grid.header['incidents']}")
+
+    # Verificação: o lote deve pontuar cada trajeto como se fosse avaliado sozinho
+    rng = np.random.default_rng(0)
+    lat_min, lon_min = grid.origin
+    lat_max = lat_min + grid.shape[0] * grid.cell_size_deg[0]
+    lon_max = lon_min + grid.shape[1] * grid.cell_size_deg[1]
+    routes = [np.column_stack([rng.uniform(lat_min, lat_max, n), rng.uniform(lon_min, lon_max, n)])
+              for n in rng.integers(1, 8, 50)]
+    departures = rng.uniform(0, 24, len(routes))
+    batch = score_routes(routes, departures, grid)
+    single = pd.concat([score_routes([route], [hour], grid) for route, hour in zip(routes, departures)],
+                       ignore_index=True)
+    matches = np.allclose(batch.to_numpy(dtype=np.float64), single.to_numpy(dtype=np.float64))
+    print(f"- Lote de {len(routes)} trajetos igual à avaliação individual: {'sim' if matches else 'NÃO'}")
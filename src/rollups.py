@@ -0,0 +1,274 @@
+"""
+Pirâmide de Agregações Temporais (dia / semana / mês / trimestre / ano)
+Pré-computa, a partir do tensor de contagens (src/count_tensor.py), os totais
+por (período, bairro, tipo) em cada granularidade e os salva ao lado do
+conjunto de dados. Séries de tendência e variações ano a ano passam a ser
+consultas diretas, sem reagrupar o histórico inteiro a cada execução.
+
+Novos dias são incorporados de forma incremental: apenas os períodos tocados
+pelos dias novos são somados (ou criados). `appended_days` confere se os dias
+já agregados continuam iguais no tensor antes de aceitar a atualização.
+
+Comparações entre duas janelas quaisquer (A vs B) usam somas acumuladas do
+nível diário: o total de uma janela é uma subtração, sem varrer os dias.
+
+Uso:
+    python -m src.rollups [diretorio_tensor] [diretorio_saida]
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.count_tensor import DEFAULT_TENSOR_DIR, load_count_tensor
+from src.geometry import DATA_DIR
+
+ROLLUP_SCHEMA_VERSION = 1
+
+DEFAULT_ROLLUP_DIR = os.path.join(DATA_DIR, 'rollups')
+ROLLUP_INDEX_FILE = 'rollups.json'
+
+# Granularidade -> frequência de período do pandas
+GRANULARITIES = {
+    'dia': 'D',
+    'semana': 'W',
+    'mes': 'M',
+    'trimestre': 'Q',
+    'ano': 'Y',
+}
+
+
+def _aggregate(counts, dates, freq):
+    """Soma as linhas diárias de `counts` por período (blocos contíguos)"""
+    periods = dates.to_period(freq)
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    return np.add.reduceat(np.asarray(counts, dtype=np.int64), starts, axis=0), periods[starts]
+
+
+def _align(values, labels, target_labels, axis):
+    """Reindexa `values` ao longo de `axis` para `target_labels` (zeros onde não existir)"""
+    position = pd.Index(labels).get_indexer(target_labels)
+    shape = list(values.shape)
+    shape[axis] = len(target_labels)
+    aligned = np.zeros(shape, dtype=np.int64)
+    found = position >= 0
+    source = np.take(values, position[found], axis=axis)
+    index = [slice(None)] * values.ndim
+    index[axis] = np.flatnonzero(found)
+    aligned[tuple(index)] = source
+    return aligned
+
+
+class Rollups:
+    """Conjunto de níveis (período, bairro, tipo) com consultas de série e ano a ano"""
+
+    def __init__(self, levels, periods, bairros, tipos, last_date):
+        self.levels = levels                  # granularidade -> array (períodos, bairros, tipos)
+        self.periods = periods                # granularidade -> PeriodIndex
+        self.bairros = np.asarray(bairros)
+        self.tipos = np.asarray(tipos)
+        self.last_date = pd.Timestamp(last_date)
+        self._bairro_index = {b: i for i, b in enumerate(self.bairros.tolist())}
+        self._tipo_index = {t: i for i, t in enumerate(self.tipos.tolist())}
+        self._totals = {}
+        self._prefix = None
+
+    def _level(self, granularity, bairros=None, tipos=None):
+        """Array (períodos,) já reduzido para os bairros/tipos pedidos"""
+        if bairros is None and tipos is None:
+            if granularity not in self._totals:
+                self._totals[granularity] = self.levels[granularity].sum(axis=(1, 2), dtype=np.int64)
+            return self._totals[granularity]
+        values = self.levels[granularity]
+        if bairros is not None:
+            values = values[:, [self._bairro_index[b] for b in bairros if b in self._bairro_index]]
+        if tipos is not None:
+            values = values[:, :, [self._tipo_index[t] for t in tipos if t in self._tipo_index]]
+        return values.sum(axis=(1, 2), dtype=np.int64)
+
+    def series(self, granularity='mes', bairros=None, tipos=None):
+        """Série temporal na granularidade pedida"""
+        return pd.Series(self._level(granularity, bairros, tipos), index=self.periods[granularity])
+
+    def window(self, start, end):
+        """Totais (bairro, tipo) entre duas datas inclusivas, via somas acumuladas diárias"""
+        if self._prefix is None:
+            daily = np.asarray(self.levels['dia'], dtype=np.int64)
+            self._prefix = np.concatenate([np.zeros((1,) + daily.shape[1:], dtype=np.int64),
+                                           np.cumsum(daily, axis=0)])
+        days = self.periods['dia'].start_time
+        first = days.searchsorted(pd.Timestamp(start))
+        last = days.searchsorted(pd.Timestamp(end), side='right')
+        return self._prefix[max(last, first)] - self._prefix[first]
+
+    def compare(self, period_a, period_b, by='bairro', bairros=None, tipos=None):
+        """Compara duas janelas (início, fim) por bairro ou tipo, ordenado pelas maiores variações
+
+        period_a é a janela de referência e period_b a janela comparada.
+        """
+        a, b = self.window(*period_a), self.window(*period_b)
+        bairro_mask = np.ones(len(self.bairros), dtype=bool) if bairros is None else np.isin(self.bairros, list(bairros))
+        tipo_mask = np.ones(len(self.tipos), dtype=bool) if tipos is None else np.isin(self.tipos, list(tipos))
+        a, b = a[bairro_mask][:, tipo_mask], b[bairro_mask][:, tipo_mask]
+
+        if by == 'bairro':
+            keys, a, b = self.bairros[bairro_mask], a.sum(axis=1), b.sum(axis=1)
+        elif by == 'tipo':
+            keys, a, b = self.tipos[tipo_mask], a.sum(axis=0), b.sum(axis=0)
+        else:
+            raise ValueError(f"Dimensão de comparação inválida: {by} (use 'bairro' ou 'tipo')")
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(a > 0, (b - a) / a * 100, np.nan)
+        table = pd.DataFrame({
+            by: keys,
+            'periodo_a': a,
+            'periodo_b': b,
+            'variacao': b - a,
+            'variacao_pct': change
+        })
+        table = table[(table['periodo_a'] > 0) | (table['periodo_b'] > 0)]
+        order = np.argsort(-np.abs(table['variacao'].to_numpy()), kind='stable')
+        return table.iloc[order].reset_index(drop=True)
+
+    def year_over_year(self, granularity='mes', bairros=None, tipos=None):
+        """Cada período comparado com o mesmo período do ano anterior"""
+        return year_over_year_table(self.series(granularity, bairros, tipos))
+
+
+def year_over_year_table(series):
+    """Tabela ano a ano de uma série indexada por PeriodIndex (períodos ausentes contam como sem dado)"""
+    labels = series.index
+    current = np.asarray(series, dtype=np.int64)
+    previous_labels = (labels.start_time - pd.DateOffset(years=1)).to_period(labels.freq)
+    position = labels.get_indexer(previous_labels)
+    previous = np.where(position >= 0, current[np.maximum(position, 0)], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+    return pd.DataFrame({
+        'periodo': labels.astype(str),
+        'valor': current,
+        'valor_ano_anterior': previous,
+        'variacao_pct': change
+    }, index=labels)
+
+
+def _write(directory, levels, periods, bairros, tipos, last_date):
+    """Salva os níveis (.npy) e o índice JSON de forma atômica"""
+    os.makedirs(directory, exist_ok=True)
+    for granularity, values in levels.items():
+        path = os.path.join(directory, f'{granularity}.npy')
+        np.save(path + '.tmp.npy', values)
+        os.replace(path + '.tmp.npy', path)
+    index = {
+        'schema_version': ROLLUP_SCHEMA_VERSION,
+        'bairros': [str(b) for b in bairros],
+        'tipos': [str(t) for t in tipos],
+        'last_date': pd.Timestamp(last_date).strftime('%Y-%m-%d'),
+        'periods': {g: [p.start_time.strftime('%Y-%m-%d') for p in periods[g]] for g in levels},
+        'generated_at': datetime.now().isoformat()
+    }
+    index_path = os.path.join(directory, ROLLUP_INDEX_FILE)
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(index_path + '.tmp', index_path)
+    return directory
+
+
+def build_rollups(tensor, output_dir=DEFAULT_ROLLUP_DIR):
+    """Gera todos os níveis a partir de um CountTensor"""
+    levels, periods = {}, {}
+    for granularity, freq in GRANULARITIES.items():
+        levels[granularity], periods[granularity] = _aggregate(tensor.counts, tensor.dates, freq)
+    return _write(output_dir, levels, periods, tensor.bairros, tensor.tipos, tensor.dates[-1])
+
+
+def update_rollups(new_tensor, directory=DEFAULT_ROLLUP_DIR, output_dir=None):
+    """Incorpora dias novos (CountTensor só com as datas novas) aos níveis existentes
+
+    Bairros ou tipos ainda não vistos ampliam as dimensões; somente os períodos
+    tocados pelos dias novos são alterados. Com `output_dir`, o resultado vai para
+    outro diretório e as agregações de `directory` ficam intactas.
+    """
+    current = load_rollups(directory)
+    bairros = pd.Index(current.bairros).union(pd.Index(new_tensor.bairros))
+    tipos = pd.Index(current.tipos).union(pd.Index(new_tensor.tipos))
+
+    levels, periods = {}, {}
+    for granularity, freq in GRANULARITIES.items():
+        old = _align(np.asarray(current.levels[granularity]), current.bairros, bairros, axis=1)
+        old = _align(old, current.tipos, tipos, axis=2)
+        new, new_periods = _aggregate(new_tensor.counts, new_tensor.dates, freq)
+        new = _align(_align(new, new_tensor.bairros, bairros, axis=1), new_tensor.tipos, tipos, axis=2)
+
+        labels = current.periods[granularity].union(new_periods)
+        merged = _align(old, current.periods[granularity], labels, axis=0)
+        merged[labels.get_indexer(new_periods)] += new
+        levels[granularity], periods[granularity] = merged, labels
+
+    last_date = max(current.last_date, new_tensor.dates[-1])
+    return _write(output_dir or directory, levels, periods, bairros, tipos, last_date)
+
+
+def appended_days(tensor, directory=DEFAULT_ROLLUP_DIR):
+    """Dias de `tensor` posteriores às agregações em `directory` (CountTensor), ou None
+
+    None quando as agregações não existem ou quando os dias já agregados não
+    coincidem com o tensor (dados corrigidos ou removidos): nesse caso é preciso
+    reconstruir tudo com build_rollups.
+    """
+    try:
+        current = load_rollups(directory)
+    except (FileNotFoundError, ValueError):
+        return None
+    if len(tensor.dates) == 0 or current.last_date > tensor.dates[-1]:
+        return None
+
+    known = tensor.select(end=current.last_date)
+    bairros = pd.Index(current.bairros).union(pd.Index(known.bairros))
+    tipos = pd.Index(current.tipos).union(pd.Index(known.tipos))
+    stored = _align(_align(np.asarray(current.levels['dia']), current.bairros, bairros, axis=1),
+                    current.tipos, tipos, axis=2)
+    daily, days = _aggregate(known.counts, known.dates, GRANULARITIES['dia'])
+    daily = _align(_align(daily, known.bairros, bairros, axis=1), known.tipos, tipos, axis=2)
+    stored = _align(stored, current.periods['dia'], days, axis=0)
+    if not days.equals(current.periods['dia']) or not np.array_equal(stored, daily):
+        return None
+    return tensor.select(start=current.last_date + pd.Timedelta(days=1))
+
+
+@lru_cache(maxsize=4)
+def _load_cached(directory, mtime):
+    with open(os.path.join(directory, ROLLUP_INDEX_FILE), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if index.get('schema_version') != ROLLUP_SCHEMA_VERSION:
+        raise ValueError(
+            f"Agregações em {directory} na versão {index.get('schema_version')}, "
+            f"esperado {ROLLUP_SCHEMA_VERSION}. Execute 'python -m src.rollups' para reconstruí-las."
+        )
+    levels, periods = {}, {}
+    for granularity, freq in GRANULARITIES.items():
+        levels[granularity] = np.load(os.path.join(directory, f'{granularity}.npy'), mmap_mode='r')
+        periods[granularity] = pd.DatetimeIndex(index['periods'][granularity]).to_period(freq)
+    return Rollups(levels, periods, index['bairros'], index['tipos'], index['last_date'])
+
+
+def load_rollups(directory=DEFAULT_ROLLUP_DIR):
+    """Abre as agregações com memory-map (cacheadas enquanto o índice não mudar)"""
+    return _load_cached(directory, os.path.getmtime(os.path.join(directory, ROLLUP_INDEX_FILE)))
+
+
+if __name__ == '__main__':
+    tensor_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TENSOR_DIR
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ROLLUP_DIR
+
+    build_rollups(load_count_tensor(tensor_dir), output)
+    rollups = load_rollups(output)
+    print(f"Agregações geradas: {output}")
+    for granularity in GRANULARITIES:
+        print(f"- {granularity}: {len(rollups.periods[granularity])} períodos")
@@ -0,0 +1,93 @@
+"""
+Bairros Mais Próximos e Mais Seguros
+Dado um ponto e um horário, retorna os k bairros mais próximos com o nível de
+segurança daquela hora, para escolher um ponto de encontro mais seguro.
+
+Os centróides vêm do artefato geométrico (src/geometry.py) e ficam em uma
+KD-tree; as taxas e níveis por (bairro, hora) são pré-computados, então cada
+consulta é uma busca na árvore mais indexação de arrays (microssegundos).
+"""
+
+import numpy as np
+
+from src.risk_grid import DEFAULT_HOURLY_PROFILE
+
+EARTH_RADIUS_M = 6371000.0
+DEFAULT_POPULATION = 30000
+
+# Mesmos limites do painel (crimes por 100 mil habitantes)
+SAFETY_LEVELS = ('muito_seguro', 'seguro', 'perigoso', 'muito_perigoso')
+DEFAULT_TIER_THRESHOLDS = (50, 150, 400)
+
+
+def build_hourly_rate_table(df, geometry, population=None):
+    """Taxa por 100 mil habitantes de cada (bairro, hora), como se o dia todo fosse igual àquela hora"""
+    bairro_col = 'Bairro' if 'Bairro' in df.columns else 'bairro'
+    n = len(geometry)
+
+    names, inverse = np.unique(df[bairro_col].astype(str).to_numpy(), return_inverse=True)
+    index = geometry.indices_of(names)[inverse]
+    valid = index >= 0
+
+    if 'Hora' in df.columns:
+        hours = df['Hora'].to_numpy()[valid].astype(np.int64) % 24
+        counts = np.bincount(index[valid] * 24 + hours, minlength=n * 24).reshape(n, 24).astype(np.float64)
+    else:
+        totals = np.bincount(index[valid], minlength=n).astype(np.float64)
+        counts = totals[:, None] * (DEFAULT_HOURLY_PROFILE / DEFAULT_HOURLY_PROFILE.sum())[None, :]
+
+    if population is None:
+        population = np.full(n, DEFAULT_POPULATION, dtype=np.float64)
+    population = np.where(np.asarray(population, dtype=np.float64) > 0, population, DEFAULT_POPULATION)
+    return counts * 24 / population[:, None] * 100000
+
+
+class NearestNeighborhoodIndex:
+    """KD-tree sobre os centróides + tabela pré-computada de níveis por hora"""
+
+    def __init__(self, geometry, hourly_rates, thresholds=DEFAULT_TIER_THRESHOLDS):
+        from scipy.spatial import cKDTree
+
+        self.names = geometry.names
+        self.hourly_rates = np.asarray(hourly_rates, dtype=np.float64)
+        self.tiers = np.searchsorted(np.asarray(thresholds), self.hourly_rates, side='right').astype(np.int8)
+
+        # Projeção equiretangular local: consultas sem depender de pyproj
+        self._lat0 = np.radians(geometry.centroids[:, 0].mean())
+        self._tree = cKDTree(self._project(geometry.centroids[:, 0], geometry.centroids[:, 1]))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _project(self, latitudes, longitudes):
+        lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+        lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+        return np.column_stack([EARTH_RADIUS_M * lon * np.cos(self._lat0), EARTH_RADIUS_M * lat])
+
+    def nearest(self, latitude, longitude, hour, k=5, max_level=None):
+        """k bairros mais próximos do ponto com nível de segurança na hora informada
+
+        max_level: se informado (ex.: 'seguro'), retorna apenas bairros até esse nível
+        """
+        hour = int(hour) % 24
+        point = self._project([latitude], [longitude])[0]
+        limit = len(self) if max_level is None else SAFETY_LEVELS.index(max_level)
+
+        n_candidates = min(k if max_level is None else k * 4, len(self))
+        while True:
+            distances, indices = self._tree.query(point, k=n_candidates)
+            distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+            keep = self.tiers[indices, hour] <= limit
+            if keep.sum() >= k or n_candidates == len(self):
+                break
+            n_candidates = len(self)
+
+        return [
+            {
+                'bairro': str(self.names[i]),
+                'distancia_m': float(d),
+                'nivel': SAFETY_LEVELS[self.tiers[i, hour]],
+                'taxa': float(self.hourly_rates[i, hour])
+            }
+            for d, i in zip(distances[keep][:k], indices[keep][:k])
+        ]
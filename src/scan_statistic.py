@@ -0,0 +1,280 @@
+"""
+Estatística de Varredura Espaço-Temporal (Space-Time Permutation Scan)
+Detecta aglomerados de ocorrências estatisticamente significativos usando
+cilindros: base = bairro central + k vizinhos mais próximos (centróides de
+src/geometry.py), altura = janela de dias. A significância é obtida por Monte
+Carlo, permutando as datas das ocorrências entre os bairros.
+
+Otimizações:
+- contagens dos cilindros via somas acumuladas (vizinhos x tempo), sem laços por zona
+- razão de verossimilhança avaliada vetorizada para todas as zonas de cada janela
+- permutações distribuídas em lotes por um pool de processos
+
+Uso:
+    python -m src.scan_statistic [caminho_csv] [n_permutacoes]
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_NEIGHBORS = 10
+DEFAULT_MAX_RADIUS_M = 3000.0
+DEFAULT_MAX_DAYS = 14
+DEFAULT_PERMUTATIONS = 999
+# Lotes de permutações (sementes derivadas de `seed`), fixo: os p-valores não dependem da máquina
+N_BATCHES = 32
+SIGNIFICANCE_LEVEL = 0.05
+
+
+def build_case_cube(df, geometry, crime_types=None, value_column='quantidade'):
+    """Agrega ocorrências em uma matriz (bairro x dia) alinhada aos bairros do artefato geométrico"""
+    date_col = 'Data Registro' if 'Data Registro' in df.columns else 'data'
+    bairro_col = 'Bairro' if 'Bairro' in df.columns else 'bairro'
+    crime_col = 'Descricao do Fato' if 'Descricao do Fato' in df.columns else 'tipo_crime'
+
+    if crime_types is not None:
+        df = df[df[crime_col].isin(crime_types)]
+    if df.empty:
+        return np.zeros((len(geometry), 0), dtype=np.int64), pd.DatetimeIndex([])
+
+    days = pd.to_datetime(df[date_col]).dt.normalize()
+    dates = pd.date_range(days.min(), days.max(), freq='D')
+    day_index = (days - dates[0]).dt.days.to_numpy()
+
+    # Mapear nomes únicos uma única vez (bairros fora do arquivo de limites são descartados)
+    names, inverse = np.unique(df[bairro_col].astype(str).to_numpy(), return_inverse=True)
+    space_index = geometry.indices_of(names)[inverse]
+
+    if value_column in df.columns:
+        values = np.rint(df[value_column].fillna(1).to_numpy()).astype(np.int64)
+    else:
+        values = np.ones(len(df), dtype=np.int64)
+
+    valid = space_index >= 0
+    T = len(dates)
+    flat = space_index[valid] * T + day_index[valid]
+    counts = np.bincount(flat, weights=values[valid], minlength=len(geometry) * T)
+    return counts.reshape(len(geometry), T).astype(np.int64), dates
+
+
+def candidate_zones(geometry, max_neighbors=DEFAULT_MAX_NEIGHBORS, max_radius_m=DEFAULT_MAX_RADIUS_M):
+    """Bases dos cilindros: para cada centro, os k bairros mais próximos (incluindo ele mesmo)
+
+    Retorna (order, valid): order[c, k] é o k-ésimo vizinho do centro c e valid[c, k]
+    indica se a zona com k+1 bairros respeita o raio máximo.
+    """
+    from scipy.spatial import cKDTree
+
+    k = min(max_neighbors + 1, len(geometry))
+    tree = cKDTree(geometry.centroids_m)
+    distances, order = tree.query(geometry.centroids_m, k=k)
+    order = np.asarray(order).reshape(len(geometry), k)
+    distances = np.asarray(distances).reshape(len(geometry), k)
+    return order, distances <= max_radius_m
+
+
+def _log_likelihood_ratio(observed, expected, total):
+    """Razão de verossimilhança de Poisson, considerando apenas excessos (observado > esperado)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        llr = observed * np.log(observed / expected)
+        outside = total - observed
+        llr += np.where(outside > 0, outside * np.log(outside / (total - expected)), 0.0)
+    return np.where((observed > expected) & (expected > 0), llr, 0.0)
+
+
+def _cylinder_tables(counts, order):
+    """Tabelas de somas acumuladas (vizinhos ordenados x tempo) compartilhadas por todas as janelas"""
+    n, T = counts.shape
+    K = order.shape[1]
+    zone_counts = np.cumsum(counts[order], axis=1, dtype=np.float64)          # (n, K, T)
+    zone_prefix = np.zeros((n, K, T + 1))
+    np.cumsum(zone_counts, axis=2, out=zone_prefix[:, :, 1:])                 # (n, K, T+1)
+    time_prefix = np.concatenate([[0.0], np.cumsum(counts.sum(axis=0), dtype=np.float64)])
+    return zone_prefix, time_prefix
+
+
+def _windows(T, length, prospective):
+    ends = np.array([T]) if prospective else np.arange(length, T + 1)
+    return ends - length, ends
+
+
+def _max_llr(counts, order, valid, max_days, prospective):
+    """Apenas o maior llr entre todos os cilindros (usado nas permutações)"""
+    n, T = counts.shape
+    total = float(counts.sum())
+    if total == 0 or T == 0:
+        return 0.0
+    zone_prefix, time_prefix = _cylinder_tables(counts, order)
+    space_totals = zone_prefix[:, :, -1][valid]                               # (Z,)
+    zone_prefix = zone_prefix[valid]                                          # (Z, T+1)
+    best = 0.0
+    for length in range(1, min(max_days, T) + 1):
+        starts, ends = _windows(T, length, prospective)
+        observed = zone_prefix[:, ends] - zone_prefix[:, starts]
+        expected = np.multiply.outer(space_totals, (time_prefix[ends] - time_prefix[starts]) / total)
+        # O llr só é calculado onde há excesso de ocorrências
+        excess = observed > expected
+        if excess.any():
+            best = max(best, float(_log_likelihood_ratio(observed[excess], expected[excess], total).max()))
+    return best
+
+
+def _scan(counts, order, valid, max_days, prospective):
+    """Avalia todos os cilindros e retorna, por zona (centro, k), a melhor janela
+
+    Retorna dicionário com arrays (n, K): llr, start, end, observed e expected.
+    """
+    n, T = counts.shape
+    K = order.shape[1]
+    best = {
+        'llr': np.zeros((n, K)), 'start': np.zeros((n, K), dtype=np.int64),
+        'end': np.zeros((n, K), dtype=np.int64),
+        'observed': np.zeros((n, K)), 'expected': np.zeros((n, K))
+    }
+    total = float(counts.sum())
+    if total == 0 or T == 0:
+        return best
+
+    zone_prefix, time_prefix = _cylinder_tables(counts, order)
+    space_totals = zone_prefix[:, :, -1]                                      # (n, K)
+
+    for length in range(1, min(max_days, T) + 1):
+        starts, ends = _windows(T, length, prospective)
+
+        observed = zone_prefix[:, :, ends] - zone_prefix[:, :, starts]        # (n, K, W)
+        time_totals = time_prefix[ends] - time_prefix[starts]                 # (W,)
+        expected = space_totals[:, :, None] * time_totals[None, None, :] / total
+
+        llr = _log_likelihood_ratio(observed, expected, total)
+        window = llr.argmax(axis=2)
+        window_llr = np.take_along_axis(llr, window[:, :, None], axis=2)[:, :, 0]
+        improved = (window_llr > best['llr']) & valid
+        if improved.any():
+            best['llr'][improved] = window_llr[improved]
+            best['start'][improved] = starts[window[improved]]
+            best['end'][improved] = ends[window[improved]]
+            best['observed'][improved] = np.take_along_axis(observed, window[:, :, None], axis=2)[:, :, 0][improved]
+            best['expected'][improved] = np.take_along_axis(expected, window[:, :, None], axis=2)[:, :, 0][improved]
+    return best
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(space_cases, time_cases, shape, order, valid, max_days, prospective):
+    _WORKER_STATE.update(
+        space_cases=space_cases, time_cases=time_cases, shape=shape, order=order,
+        valid=valid, max_days=max_days, prospective=prospective
+    )
+
+
+def _permutation_batch(seed, n_permutations):
+    """Executa um lote de permutações e retorna o máximo de llr de cada uma"""
+    state = _WORKER_STATE
+    n, T = state['shape']
+    rng = np.random.default_rng(seed)
+    maxima = np.empty(n_permutations)
+    for i in range(n_permutations):
+        # Permutar as datas entre as ocorrências preserva os totais por bairro e por dia
+        shuffled = rng.permutation(state['time_cases'])
+        counts = np.bincount(state['space_cases'] * T + shuffled, minlength=n * T).reshape(n, T)
+        maxima[i] = _max_llr(counts, state['order'], state['valid'], state['max_days'], state['prospective'])
+    return maxima
+
+
+def _null_distribution(counts, order, valid, max_days, prospective, n_permutations, n_jobs, seed):
+    """Distribuição nula do llr máximo, com lotes de permutação em paralelo"""
+    n, T = counts.shape
+    flat = np.repeat(np.arange(n * T), counts.ravel())
+    init_args = (flat // T, flat % T, (n, T), order, valid, max_days, prospective)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_batches = max(1, min(N_BATCHES, n_permutations))
+    sizes = np.full(n_batches, n_permutations // n_batches)
+    sizes[:n_permutations % n_batches] += 1
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        return np.concatenate([_permutation_batch(s, int(size)) for s, size in zip(seeds, sizes)])
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=init_args) as pool:
+        results = pool.map(_permutation_batch, seeds, [int(size) for size in sizes])
+        return np.concatenate(list(results))
+
+
+def detect_space_time_clusters(counts, dates, geometry,
+                               max_neighbors=DEFAULT_MAX_NEIGHBORS,
+                               max_radius_m=DEFAULT_MAX_RADIUS_M,
+                               max_days=DEFAULT_MAX_DAYS,
+                               prospective=True,
+                               n_permutations=DEFAULT_PERMUTATIONS,
+                               n_jobs=None,
+                               max_clusters=5,
+                               seed=42):
+    """Detecta aglomerados espaço-temporais e calcula p-valores por Monte Carlo
+
+    prospective=True avalia apenas janelas que terminam no último dia (aglomerados
+    emergentes); False varre todo o histórico.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    order, valid = candidate_zones(geometry, max_neighbors, max_radius_m)
+    scan = _scan(counts, order, valid, max_days, prospective)
+    if scan['llr'].max() <= 0:
+        return []
+
+    null_maxima = np.sort(_null_distribution(
+        counts, order, valid, max_days, prospective, n_permutations, n_jobs, seed
+    ))
+
+    # Aglomerado principal e secundários: zonas em ordem decrescente de llr sem sobreposição
+    clusters = []
+    used = np.zeros(len(geometry), dtype=bool)
+    for flat in np.argsort(scan['llr'], axis=None)[::-1]:
+        if len(clusters) >= max_clusters:
+            break
+        c, k = np.unravel_index(flat, scan['llr'].shape)
+        llr = float(scan['llr'][c, k])
+        if llr <= 0:
+            break
+        members = order[c, :k + 1]
+        if used[members].any():
+            continue
+        used[members] = True
+
+        observed, expected = float(scan['observed'][c, k]), float(scan['expected'][c, k])
+        exceed = len(null_maxima) - np.searchsorted(null_maxima, llr, side='left')
+        p_value = (1 + exceed) / (1 + len(null_maxima))
+        clusters.append({
+            'centro': str(geometry.names[c]),
+            'bairros': [str(name) for name in geometry.names[members]],
+            'inicio': dates[scan['start'][c, k]],
+            'fim': dates[scan['end'][c, k] - 1],
+            'observado': int(observed),
+            'esperado': expected,
+            'risco_relativo': observed / expected,
+            'llr': llr,
+            'p_valor': float(p_value),
+            'significativo': bool(p_value < SIGNIFICANCE_LEVEL)
+        })
+    return clusters
+
+
+if __name__ == '__main__':
+    from src.geometry import load_geometry_metadata
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    permutations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PERMUTATIONS
+
+    geometry = load_geometry_metadata()
+    cube, cube_dates = build_case_cube(pd.read_csv(csv_path), geometry)
+    found = detect_space_time_clusters(cube, cube_dates, geometry,
+                                       prospective=False, n_permutations=permutations)
+    for cluster in found:
+        print(f"{cluster['centro']}: {cluster['observado']} ocorrências "
+              f"({cluster['inicio']:%d/%m/%Y} a {cluster['fim']:%d/%m/%Y}), "
+              f"RR={cluster['risco_relativo']:.2f}, p={cluster['p_valor']:.3f}")
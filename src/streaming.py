@@ -0,0 +1,363 @@
+"""
+Feed de Ocorrências em Tempo Real (janelas deslizantes + alertas)
+Consome uma fonte de eventos só-de-acréscimo (um CSV que cresce, lido como
+`tail`, ou linhas JSON por socket) e mantém contagens em janela deslizante por
+bairro e por (bairro, tipo de crime).
+
+Cada chave ocupa uma linha de um buffer circular (chave x intervalo). Os
+intervalos vencidos são zerados de forma preguiçosa quando a chave é tocada,
+então o custo por evento é O(1) e não depende do histórico. O número de chaves
+é limitado (as menos recentes são descartadas, junto com o estado das suas
+regras), mantendo a memória fixa independentemente do tempo de execução.
+
+Os rankings dos bairros e tipos mais frequentes na janela vêm de resumos
+Space-Saving/Count-Min (src/heavy_hitters.py), também em memória fixa.
+
+Alertas disparam quando a contagem de uma janela cruza o limite de uma regra
+(uma vez por cruzamento; a regra é rearmada quando a contagem volta a ficar
+abaixo do limite).
+
+FeedWorker acompanha o feed em uma thread própria, independente de haver
+alguém olhando o painel; quem exibe os alertas só lê o resultado.
+
+Uso:
+    python -m src.streaming [caminho_feed] [intervalo_segundos]
+"""
+
+import csv
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+import numpy as np
+
+from src.geometry import DATA_DIR
+from src.heavy_hitters import WindowedHeavyHitters
+
+DEFAULT_FEED_PATH = os.path.join(DATA_DIR, 'incident_feed.csv')
+DEFAULT_BUCKET_SECONDS = 86400          # intervalos de um dia
+DEFAULT_WINDOW_BUCKETS = 7              # janela de 7 dias
+DEFAULT_MAX_KEYS = 4096
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_RECENT_ALERTS = 20
+
+# escopo: 'bairro' ou 'bairro_tipo'; limite: ocorrências na janela
+DEFAULT_RULES = [
+    {'escopo': 'bairro', 'limite': 10, 'nivel': 'high'},
+    {'escopo': 'bairro_tipo', 'limite': 5, 'nivel': 'medium'},
+]
+
+
+class SlidingWindowCounter:
+    """Contagens por chave em janela deslizante de `n_buckets` intervalos (memória fixa)"""
+
+    def __init__(self, n_buckets=DEFAULT_WINDOW_BUCKETS, max_keys=DEFAULT_MAX_KEYS, on_evict=None):
+        self.n_buckets = n_buckets
+        self.on_evict = on_evict                                # chamado com a chave descartada
+        self.ring = np.zeros((max_keys, n_buckets), dtype=np.int64)
+        self.last = np.full(max_keys, -1, dtype=np.int64)      # último intervalo aplicado à linha
+        self.totals = np.zeros(max_keys, dtype=np.int64)
+        self.rows = OrderedDict()                               # chave -> linha (ordem de uso)
+        self.free = list(range(max_keys - 1, -1, -1))
+        self.now = None
+
+    def _row(self, key):
+        row = self.rows.get(key)
+        if row is not None:
+            self.rows.move_to_end(key)
+            return row
+        if not self.free:
+            # Limite de chaves atingido: descarta a chave usada há mais tempo
+            evicted, victim = self.rows.popitem(last=False)
+            self.free.append(victim)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+        row = self.free.pop()
+        self.ring[row] = 0
+        self.totals[row] = 0
+        self.last[row] = self.now
+        self.rows[key] = row
+        return row
+
+    def _expire(self, row):
+        """Zera os intervalos que saíram da janela desde o último acesso à linha"""
+        gap = self.now - self.last[row]
+        if gap <= 0:
+            return
+        if gap >= self.n_buckets:
+            self.ring[row] = 0
+            self.totals[row] = 0
+        else:
+            for bucket in range(self.last[row] + 1, self.now + 1):
+                slot = bucket % self.n_buckets
+                self.totals[row] -= self.ring[row, slot]
+                self.ring[row, slot] = 0
+        self.last[row] = self.now
+
+    def add(self, key, bucket, amount=1):
+        """Soma um evento no intervalo `bucket`; retorna a contagem da janela (None se atrasado demais)"""
+        if self.now is None or bucket > self.now:
+            self.now = bucket
+        if bucket <= self.now - self.n_buckets:
+            return None
+        row = self._row(key)
+        self._expire(row)
+        self.ring[row, bucket % self.n_buckets] += amount
+        self.totals[row] += amount
+        return int(self.totals[row])
+
+    def count(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            return 0
+        self._expire(row)
+        return int(self.totals[row])
+
+    def snapshot(self):
+        """Contagens atuais de todas as chaves com ocorrências na janela"""
+        result = {}
+        for key, row in self.rows.items():
+            self._expire(row)
+            if self.totals[row] > 0:
+                result[key] = int(self.totals[row])
+        return result
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def _event_time(value):
+    """Data/hora ISO do evento ('2024-05-01' ou '2024-05-01 13:45:00') em segundos"""
+    return datetime.fromisoformat(str(value).strip()[:19]).timestamp()
+
+
+def _event_amount(value):
+    """Quantidade do evento (ausente ou inválida conta como 1 ocorrência)"""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 1
+    return int(amount) if np.isfinite(amount) and amount > 0 else 1
+
+
+class StreamMonitor:
+    """Janelas deslizantes por bairro e por (bairro, tipo) com regras de alerta por limite"""
+
+    def __init__(self, rules=DEFAULT_RULES, window_buckets=DEFAULT_WINDOW_BUCKETS,
+                 bucket_seconds=DEFAULT_BUCKET_SECONDS, max_keys=DEFAULT_MAX_KEYS, exact_rankings=False):
+        self.rules = rules
+        self.window_buckets = window_buckets
+        self.bucket_seconds = bucket_seconds
+        # Regras disparadas por escopo: chave -> limites (some junto com a chave descartada do contador)
+        self._fired = {'bairro': {}, 'bairro_tipo': {}}
+        self.counters = {
+            scope: SlidingWindowCounter(window_buckets, max_keys,
+                                        on_evict=lambda key, fired=self._fired[scope]: fired.pop(key, None))
+            for scope in ('bairro', 'bairro_tipo')
+        }
+        self.rankings = {
+            'bairro': WindowedHeavyHitters(window_buckets, exact=exact_rankings),
+            'tipo_crime': WindowedHeavyHitters(window_buckets, exact=exact_rankings),
+        }
+        self.processed = 0
+        self.late = 0
+
+    @property
+    def window_label(self):
+        days = self.window_buckets * self.bucket_seconds / 86400
+        return f"{days:g} dias" if days >= 1 else f"{self.window_buckets * self.bucket_seconds / 3600:g} h"
+
+    def process(self, event):
+        """Atualiza as janelas com um evento (data, bairro, tipo_crime) e retorna os alertas disparados"""
+        bairro, tipo = event.get('bairro'), event.get('tipo_crime')
+        if not bairro or not event.get('data'):
+            return []
+        bucket = int(_event_time(event['data']) // self.bucket_seconds)
+        amount = _event_amount(event.get('quantidade'))
+        counts = {
+            'bairro': self.counters['bairro'].add(bairro, bucket, amount),
+            'bairro_tipo': self.counters['bairro_tipo'].add((bairro, tipo), bucket, amount),
+        }
+        self.rankings['bairro'].add(bairro, bucket, amount)
+        self.rankings['tipo_crime'].add(tipo, bucket, amount)
+        self.processed += 1
+        if counts['bairro'] is None:
+            self.late += 1
+            return []
+
+        alerts = []
+        for rule in self.rules:
+            scope = rule['escopo']
+            key = bairro if scope == 'bairro' else (bairro, tipo)
+            fired = self._fired[scope].get(key)
+            if counts[scope] >= rule['limite']:
+                if fired is None or rule['limite'] not in fired:
+                    self._fired[scope].setdefault(key, set()).add(rule['limite'])
+                    alerts.append(self._alert(rule, bairro, tipo, counts[scope]))
+            elif fired is not None:
+                fired.discard(rule['limite'])
+                if not fired:
+                    del self._fired[scope][key]
+        return alerts
+
+    def process_many(self, events):
+        alerts = []
+        for event in events:
+            alerts.extend(self.process(event))
+        return alerts
+
+    def _alert(self, rule, bairro, tipo, count):
+        subject = bairro if rule['escopo'] == 'bairro' else f"{tipo} em {bairro}"
+        return {
+            'level': rule.get('nivel', 'medium'),
+            'title': '📡 FEED AO VIVO',
+            'message': f"{subject}: {count} ocorrências nos últimos {self.window_label} (limite {rule['limite']})",
+            'escopo': rule['escopo'],
+            'bairro': bairro,
+            'tipo_crime': tipo if rule['escopo'] == 'bairro_tipo' else None,
+            'contagem': count,
+            'limite': rule['limite']
+        }
+
+    def counts(self, scope='bairro'):
+        return self.counters[scope].snapshot()
+
+    def top(self, scope='bairro', k=5):
+        """[(chave, contagem)] das k chaves mais frequentes na janela ('bairro' ou 'tipo_crime')"""
+        return self.rankings[scope].top(k)
+
+
+class FileTail:
+    """Lê apenas as linhas novas de um CSV que cresce (recomeça se o arquivo for truncado)"""
+
+    def __init__(self, path=DEFAULT_FEED_PATH, from_start=True):
+        self.path = path
+        self.offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+        self.header = None if from_start else self._read_header()
+        self._partial = b''
+
+    def _read_header(self):
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            return next(csv.reader(f), None)
+
+    def read_new(self):
+        """Eventos (dicts) acrescentados desde a última leitura"""
+        if not os.path.exists(self.path):
+            return []
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            self.offset, self.header, self._partial = 0, None, b''
+        if size == self.offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset = size
+
+        lines = (self._partial + chunk).split(b'\n')
+        self._partial = lines.pop()            # linha incompleta fica para a próxima leitura
+        events = []
+        for row in csv.reader(line.decode('utf-8').rstrip('\r') for line in lines if line.strip()):
+            if self.header is None:
+                self.header = row
+                continue
+            events.append(dict(zip(self.header, row)))
+        return events
+
+
+class FeedWorker:
+    """Lê o feed continuamente em segundo plano e mantém os alertas recentes
+
+    on_events(eventos) recebe cada lote novo na thread do feed (ex.: cruzamento
+    com as cercas geográficas). Leituras pela interface usam alerts() e top().
+    """
+
+    def __init__(self, tail=None, monitor=None, interval=DEFAULT_POLL_SECONDS, on_events=None,
+                 keep=DEFAULT_RECENT_ALERTS):
+        self.tail = tail or FileTail()
+        self.monitor = monitor or StreamMonitor()
+        self.interval = interval
+        self.on_events = on_events
+        self.recent = deque(maxlen=keep)
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Processa as linhas novas do feed; retorna os alertas disparados"""
+        events = self.tail.read_new()
+        if not events:
+            return []
+        with self._lock:
+            alerts = self.monitor.process_many(events)
+            self.recent.extend(alerts)
+        if self.on_events is not None:
+            self.on_events(events)
+        return alerts
+
+    def alerts(self):
+        """Alertas recentes, do mais novo para o mais antigo"""
+        with self._lock:
+            return list(reversed(self.recent))
+
+    def top(self, scope='bairro', k=5):
+        with self._lock:
+            return self.monitor.top(scope, k)
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as exc:  # o feed segue na próxima leitura; o erro fica em last_error
+                self.last_error = exc
+            if self._stop.wait(self.interval):
+                break
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='incident-feed', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def socket_events(host, port):
+    """Eventos em linhas JSON recebidos por socket TCP (substituto de uma fila de mensagens)"""
+    with socket.create_connection((host, port)) as connection:
+        buffer = b''
+        while True:
+            data = connection.recv(65536)
+            if not data:
+                break
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+
+if __name__ == '__main__':
+    feed_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FEED_PATH
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    monitor, tail = StreamMonitor(), FileTail(feed_path)
+    print(f"Acompanhando {feed_path} (Ctrl+C para sair)")
+    try:
+        while True:
+            for alert in monitor.process_many(tail.read_new()):
+                print(f"{alert['title']} {alert['message']}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print(f"\nEventos processados: {monitor.processed} (atrasados: {monitor.late})")
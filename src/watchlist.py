@@ -0,0 +1,280 @@
+"""
+Listas de Observação (assinaturas de alertas para muitos usuários)
+Cada assinatura escolhe bairros, tipos de crime e períodos do dia (ausente =
+qualquer) e uma regra:
+- 'pico': pelo menos `limite` ocorrências correspondentes no lote avaliado
+- 'nivel': o nível de risco de um dos bairros sobe e alcança `nivel`
+
+As assinaturas são compiladas em um índice invertido esparso (chave ->
+assinantes), em que a chave é (bairro, tipo, período) com "qualquer" em cada
+posição. Cada ocorrência alimenta as 8 chaves que a cobrem, e os totais de
+todas as assinaturas saem de um único produto esparso. Sem laço por usuário,
+dezenas de milhares de assinaturas são avaliadas em milissegundos.
+
+Cada regra dispara uma vez por cruzamento do limite (rearmada quando volta a
+ficar abaixo). As notificações vão para uma caixa de saída JSONL local, que
+substitui uma fila de mensagens.
+
+Uso:
+    python -m src.watchlist [caminho_csv] [n_assinaturas_sinteticas]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.geometry import DATA_DIR, normalize_bairro_name
+
+DEFAULT_WATCHLIST_PATH = os.path.join(DATA_DIR, 'watchlist.json')
+DEFAULT_OUTBOX_PATH = os.path.join(DATA_DIR, 'alert_outbox.jsonl')
+
+# Níveis de risco em ordem crescente (mesmos rótulos de classify_safety_level do painel)
+RISK_TIERS = ['muito_seguro', 'seguro', 'perigoso', 'muito_perigoso']
+
+
+def _columns(df):
+    """Nomes das colunas no formato do painel ou do CSV bruto"""
+    bairro_col = 'Bairro' if 'Bairro' in df.columns else 'bairro'
+    crime_col = 'Descricao do Fato' if 'Descricao do Fato' in df.columns else 'tipo_crime'
+    period_col = 'Periodo do Dia' if 'Periodo do Dia' in df.columns else 'periodo'
+    return bairro_col, crime_col, period_col
+
+
+def _key(value):
+    return str(value).strip().lower()
+
+
+def load_subscriptions(path=DEFAULT_WATCHLIST_PATH):
+    """Lista de assinaturas do arquivo JSON ([] se não existir)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class Outbox:
+    """Caixa de saída só-de-acréscimo (uma notificação JSON por linha)"""
+
+    def __init__(self, path=DEFAULT_OUTBOX_PATH):
+        self.path = path
+
+    def publish(self, notifications):
+        """Acrescenta o lote inteiro em uma única escrita"""
+        if not notifications:
+            return 0
+        payload = ''.join(json.dumps(n, ensure_ascii=False, default=str) + '\n' for n in notifications)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(payload)
+        return len(notifications)
+
+    def read(self, offset=0):
+        """Notificações a partir do byte `offset`; retorna (notificações, novo_offset)"""
+        if not os.path.exists(self.path):
+            return [], offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        return [json.loads(line) for line in complete.splitlines() if line.strip()], offset + len(complete)
+
+
+class WatchlistEngine:
+    """Avaliação em lote de todas as assinaturas por atualização"""
+
+    def __init__(self, subscriptions, tiers=RISK_TIERS):
+        from scipy import sparse
+
+        self.tiers = list(tiers)
+        self.subscriptions = subscriptions
+        # Vocabulários (código 0 = qualquer); valores fora deles só casam com "qualquer"
+        self.bairros = {}
+        self.tipos = {}
+        self.periodos = {}
+        for sub in subscriptions:
+            for name in sub.get('bairros') or []:
+                self.bairros.setdefault(normalize_bairro_name(name), len(self.bairros) + 1)
+            for name in sub.get('tipos') or []:
+                self.tipos.setdefault(_key(name), len(self.tipos) + 1)
+            for name in sub.get('periodos') or []:
+                self.periodos.setdefault(_key(name), len(self.periodos) + 1)
+        self.n_keys = (len(self.bairros) + 1) * (len(self.tipos) + 1) * (len(self.periodos) + 1)
+
+        spikes = [i for i, sub in enumerate(subscriptions) if sub.get('regra', 'pico') == 'pico']
+        keys, owners = [], []
+        for position, i in enumerate(spikes):
+            sub = subscriptions[i]
+            for b in self._codes(sub.get('bairros'), self.bairros, normalize_bairro_name):
+                for t in self._codes(sub.get('tipos'), self.tipos, _key):
+                    for p in self._codes(sub.get('periodos'), self.periodos, _key):
+                        keys.append(self._flat(b, t, p))
+                        owners.append(position)
+        # Índice invertido: linha = chave (bairro, tipo, período), colunas = assinaturas de pico
+        self.spike_subscriptions = np.array(spikes, dtype=np.int64)
+        self.spike_index = sparse.csr_matrix(
+            (np.ones(len(keys)), (np.array(keys, dtype=np.int64), np.array(owners, dtype=np.int64))),
+            shape=(self.n_keys, len(spikes))
+        )
+        self.spike_limits = np.array([subscriptions[i].get('limite', 1) for i in spikes], dtype=np.float64)
+        self.spike_active = np.zeros(len(spikes), dtype=bool)
+
+        # Regras de nível: uma entrada por (assinatura, bairro)
+        levels = [(i, self.bairros[normalize_bairro_name(name)], self._tier(sub.get('nivel', 'perigoso')))
+                  for i, sub in enumerate(subscriptions) if sub.get('regra') == 'nivel'
+                  for name in sub.get('bairros') or []]
+        self.level_entries = np.array(levels, dtype=np.int64).reshape(-1, 3)
+        self.previous_tiers = np.full(len(self.bairros) + 1, -1, dtype=np.int64)
+
+    @staticmethod
+    def _codes(values, vocabulary, normalize):
+        return [0] if not values else sorted({vocabulary[normalize(v)] for v in values})
+
+    def _flat(self, b, t, p):
+        return (b * (len(self.tipos) + 1) + t) * (len(self.periodos) + 1) + p
+
+    def _tier(self, level):
+        return level if isinstance(level, (int, np.integer)) else self.tiers.index(level)
+
+    def subscribers_for(self, bairro=None, tipo=None, periodo=None):
+        """IDs das assinaturas de pico que uma ocorrência (bairro, tipo, período) alimenta"""
+        codes = (self.bairros.get(normalize_bairro_name(bairro), 0) if bairro else 0,
+                 self.tipos.get(_key(tipo), 0) if tipo else 0,
+                 self.periodos.get(_key(periodo), 0) if periodo else 0)
+        owners = set()
+        for key in np.concatenate(self._covering_keys(*(np.array([c]) for c in codes))):
+            row = self.spike_index.indices[self.spike_index.indptr[key]:self.spike_index.indptr[key + 1]]
+            owners.update(self.subscriptions[i]['id'] for i in self.spike_subscriptions[row])
+        return sorted(owners)
+
+    def _covering_keys(self, b, t, p):
+        """Chaves das 8 combinações específico/qualquer (códigos desconhecidos só entram como qualquer)"""
+        keys = []
+        for use_b in (False, True):
+            for use_t in (False, True):
+                for use_p in (False, True):
+                    valid = np.ones(len(b), dtype=bool)
+                    for use, codes in ((use_b, b), (use_t, t), (use_p, p)):
+                        if use:
+                            valid &= codes > 0
+                    keys.append(self._flat(b * use_b, t * use_t, p * use_p)[valid])
+        return keys
+
+    def key_counts(self, incidents):
+        """Ocorrências do lote por chave (bairro, tipo, período), incluindo as chaves com "qualquer" """
+        bairro_col, crime_col, period_col = _columns(incidents)
+        amount = len(incidents)
+
+        def codes(column, vocabulary, normalize):
+            if not vocabulary or column not in incidents.columns:
+                return np.zeros(amount, dtype=np.int64)
+            values = pd.Series(incidents[column].astype(str).unique())
+            mapping = dict(zip(values, values.map(lambda v: vocabulary.get(normalize(v), 0))))
+            return incidents[column].astype(str).map(mapping).to_numpy(dtype=np.int64)
+
+        keys = self._covering_keys(codes(bairro_col, self.bairros, normalize_bairro_name),
+                                   codes(crime_col, self.tipos, _key),
+                                   codes(period_col, self.periodos, _key))
+        return np.bincount(np.concatenate(keys), minlength=self.n_keys).astype(np.float64)
+
+    def evaluate(self, incidents, risk_levels=None):
+        """Avalia todas as assinaturas; retorna as notificações novas
+
+        incidents: ocorrências do lote (ex.: últimos 7 dias ou novas linhas do feed)
+        risk_levels: bairro -> nível de risco atual (rótulo de RISK_TIERS ou índice)
+        """
+        created = datetime.now().isoformat()
+        notifications = []
+
+        if len(self.spike_subscriptions) and len(incidents):
+            totals = self.spike_index.T @ self.key_counts(incidents)
+        else:
+            totals = np.zeros(len(self.spike_subscriptions))
+        over = totals >= self.spike_limits
+        fired = np.flatnonzero(over & ~self.spike_active)
+        self.spike_active = over
+        for position in fired:
+            sub = self.subscriptions[self.spike_subscriptions[position]]
+            notifications.append({
+                'assinante': sub['id'],
+                'regra': 'pico',
+                'mensagem': f"Novo pico: {int(totals[position])} ocorrências{self._scope(sub)} (limite {sub.get('limite', 1)})",
+                'contagem': int(totals[position]),
+                'criado_em': created
+            })
+
+        if risk_levels is not None and len(self.level_entries):
+            tiers = np.full(len(self.bairros) + 1, -1, dtype=np.int64)
+            for bairro, level in risk_levels.items():
+                code = self.bairros.get(normalize_bairro_name(bairro))
+                if code is not None:
+                    tiers[code] = self._tier(level)
+            subs, codes, targets = self.level_entries.T
+            crossed = np.flatnonzero((tiers[codes] >= targets) & (self.previous_tiers[codes] < targets)
+                                     & (self.previous_tiers[codes] >= 0))
+            self.previous_tiers = tiers
+            names = {code: name for name, code in self.bairros.items()}
+            for entry in crossed:
+                sub = self.subscriptions[subs[entry]]
+                bairro = next((b for b in sub['bairros'] if normalize_bairro_name(b) == names[codes[entry]]), '')
+                notifications.append({
+                    'assinante': sub['id'],
+                    'regra': 'nivel',
+                    'mensagem': f"Risco em {bairro} subiu para {self.tiers[tiers[codes[entry]]].replace('_', ' ')}",
+                    'bairro': bairro,
+                    'nivel': self.tiers[tiers[codes[entry]]],
+                    'criado_em': created
+                })
+        return notifications
+
+    @staticmethod
+    def _scope(sub):
+        parts = [', '.join(sub[k]) for k in ('tipos', 'bairros', 'periodos') if sub.get(k)]
+        return f" ({' | '.join(parts)})" if parts else ''
+
+
+def synthetic_subscriptions(df, n, seed=42):
+    """Assinaturas aleatórias sobre os bairros e tipos do CSV (teste de carga)"""
+    rng = np.random.default_rng(seed)
+    bairro_col, crime_col, _ = _columns(df)
+    bairros, tipos = df[bairro_col].dropna().unique(), df[crime_col].dropna().unique()
+    periods = ['Manhã', 'Tarde', 'Noite']
+    subscriptions = []
+    for i in range(n):
+        if rng.random() < 0.2:
+            subscriptions.append({'id': f'u{i}', 'regra': 'nivel', 'bairros': [str(rng.choice(bairros))],
+                                  'nivel': str(rng.choice(RISK_TIERS[1:]))})
+            continue
+        sub = {'id': f'u{i}', 'regra': 'pico', 'limite': int(rng.integers(1, 6))}
+        if rng.random() < 0.9:
+            sub['bairros'] = [str(b) for b in rng.choice(bairros, rng.integers(1, 4), replace=False)]
+        if rng.random() < 0.5:
+            sub['tipos'] = [str(t) for t in rng.choice(tipos, rng.integers(1, 3), replace=False)]
+        if rng.random() < 0.3:
+            sub['periodos'] = [str(rng.choice(periods))]
+        subscriptions.append(sub)
+    return subscriptions
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('data', 'crime_data.csv')
+    n_subscriptions = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    df = pd.read_csv(csv_path)
+    dates = pd.to_datetime(df['data'])
+    recent = df[dates > dates.max() - pd.Timedelta(days=7)]
+
+    subscriptions = load_subscriptions() or synthetic_subscriptions(df, n_subscriptions)
+    started = time.perf_counter()
+    engine = WatchlistEngine(subscriptions)
+    compiled = time.perf_counter()
+    notifications = engine.evaluate(recent)
+    evaluated = time.perf_counter()
+
+    print(f"Assinaturas: {len(subscriptions)} (índice compilado em {(compiled - started) * 1000:.0f} ms)")
+    print(f"Ocorrências avaliadas: {len(recent)} em {(evaluated - compiled) * 1000:.1f} ms")
+    print(f"Notificações: {len(notifications)}")
+    for notification in notifications[:5]:
+        print(f"- {notification['assinante']}: {notification['mensagem']}")